@@ -0,0 +1,99 @@
+"""
+Benchmarks internal link generation (prez.services.link_generation._add_prez_links) for listing pages of 20, 100 and
+500 items, comparing strictly sequential generation (a concurrency cap of 1) with the configured concurrency cap.
+
+A synthetic vocabulary is loaded into an in-memory pyoxigraph store, and a fixed latency is added to every query to
+approximate a remote triplestore.
+
+Usage (from the repository root): PYTHONPATH=. python dev/benchmark_link_generation.py [--latency-ms 5] [--concurrency 16]
+"""
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from pyoxigraph import Store
+from rdflib import Graph, URIRef, SKOS, RDF
+
+from prez.cache import endpoints_graph_cache, links_ids_graph_cache
+from prez.config import settings
+from prez.services.endpoint_index import rebuild_endpoint_index
+from prez.services.link_generation import _add_prez_links
+from prez.sparql.methods import PyoxigraphRepo
+
+SCHEME = URIRef("https://example.com/vocab")
+PAGE_SIZES = [20, 100, 500]
+
+
+class LatencyRepo(PyoxigraphRepo):
+    """A PyoxigraphRepo which waits a fixed time before each query, approximating a remote triplestore."""
+
+    def __init__(self, pyoxi_store: Store, latency: float):
+        super().__init__(pyoxi_store)
+        self.latency = latency
+
+    async def tabular_query_to_table(self, query: str, context: URIRef = None):
+        await asyncio.sleep(self.latency)
+        return await super().tabular_query_to_table(query, context)
+
+
+def create_store(n_concepts: int) -> Store:
+    g = Graph()
+    g.add((SCHEME, RDF.type, SKOS.ConceptScheme))
+    for i in range(n_concepts):
+        concept = URIRef(f"https://example.com/vocab/concept-{i}")
+        g.add((concept, RDF.type, SKOS.Concept))
+        g.add((concept, SKOS.inScheme, SCHEME))
+    store = Store()
+    store.load(g.serialize(format="nt", encoding="utf-8"), "application/n-triples")
+    return store
+
+
+def listing_page(n_items: int) -> Graph:
+    g = Graph()
+    for i in range(n_items):
+        g.add(
+            (
+                SCHEME,
+                SKOS.hasTopConcept,
+                URIRef(f"https://example.com/vocab/concept-{i}"),
+            )
+        )
+    return g
+
+
+async def time_link_generation(repo, n_items: int, concurrency: int) -> float:
+    settings.link_generation_concurrency = concurrency
+    links_ids_graph_cache.clear()
+    graph = listing_page(n_items)
+    start = time.perf_counter()
+    await _add_prez_links(graph, repo, repo)
+    return time.perf_counter() - start
+
+
+async def main(latency_ms: float, concurrency: int):
+    for f in (Path(__file__).parent.parent / "prez/reference_data/endpoints").glob(
+        "*.ttl"
+    ):
+        endpoints_graph_cache.parse(f)
+    rebuild_endpoint_index()
+    repo = LatencyRepo(create_store(max(PAGE_SIZES)), latency_ms / 1000)
+
+    print(f"latency per query: {latency_ms}ms, concurrency cap: {concurrency}")
+    print(f"{'items':>6} {'sequential (s)':>15} {'concurrent (s)':>15} {'speedup':>8}")
+    for n_items in PAGE_SIZES:
+        sequential = await time_link_generation(repo, n_items, 1)
+        concurrent = await time_link_generation(repo, n_items, concurrency)
+        print(
+            f"{n_items:>6} {sequential:>15.3f} {concurrent:>15.3f} {sequential / concurrent:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.link_generation_concurrency
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.latency_ms, args.concurrency))
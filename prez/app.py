@@ -1,6 +1,8 @@
+import asyncio
 import logging
 import os
 from textwrap import dedent
+from time import perf_counter
 
 import uvicorn
 from fastapi import FastAPI
@@ -15,12 +17,12 @@ from prez.dependencies import (
     load_local_data_to_oxigraph,
     get_oxrdflib_store,
     get_system_store,
-    load_system_data_to_oxigraph,
 )
 from prez.models.model_exceptions import (
     ClassNotFoundException,
     URINotFoundException,
     NoProfilesException,
+    InvalidIRIException,
 )
 from prez.routers.catprez import router as catprez_router
 from prez.routers.cql import router as cql_router
@@ -40,6 +42,10 @@ from prez.services.app_service import (
     add_prefixes_to_prefix_graph,
     add_common_context_ontologies_to_tbox_cache,
 )
+from prez.services.cache_policy import CachePolicyMiddleware
+from prez.services.compression import CompressionMiddleware
+from prez.services.conditional_requests import ConditionalRequestMiddleware
+from prez.services.event_loop_lag import event_loop_lag
 from prez.services.exception_catchers import (
     catch_400,
     catch_404,
@@ -47,10 +53,19 @@ from prez.services.exception_catchers import (
     catch_class_not_found_exception,
     catch_uri_not_found_exception,
     catch_no_profiles_exception,
+    catch_invalid_iri_exception,
 )
 from prez.services.generate_profiles import create_profiles_graph
+from prez.services.link_materialization import materialize_links
 from prez.services.prez_logging import setup_logger
+from prez.services.request_timing import (
+    log_timings,
+    request_timings,
+    server_timing_header,
+)
 from prez.services.search_methods import get_all_search_methods
+from prez.services.system_reload import poll_system_definitions
+from prez.services.worker_pool import shutdown_executors
 from prez.sparql.methods import RemoteSparqlRepo, PyoxigraphRepo, OxrdflibRepo
 
 app = FastAPI(
@@ -61,6 +76,7 @@ app = FastAPI(
         ClassNotFoundException: catch_class_not_found_exception,
         URINotFoundException: catch_uri_not_found_exception,
         NoProfilesException: catch_no_profiles_exception,
+        InvalidIRIException: catch_invalid_iri_exception,
     }
 )
 
@@ -80,6 +96,32 @@ if "SpacePrez" in settings.prez_flavours:
 app.include_router(identifier_router)
 
 
+@app.middleware("http")
+async def add_server_timing_header(request, call_next):
+    """
+    Reports the time spent in parts of a request in the Server-Timing header. The header is sent before a streamed
+    body is produced, so only covers the time to the response's headers ("response-start"). The full breakdown,
+    including the serialization of streamed bodies and the total time, is logged once the body has been sent (see
+    log_timings).
+    """
+    timings = {}
+    token = request_timings.set(timings)
+    start = perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+    timings["response-start"] = perf_counter() - start
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    response.body_iterator = log_timings(
+        response.body_iterator,
+        f"{request.method} {request.url.path}",
+        timings,
+        start,
+    )
+    return response
+
+
 @app.middleware("http")
 async def add_cors_headers(request, call_next):
     response = await call_next(request)
@@ -98,6 +140,11 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+# inside compression and conditional requests, so its Vary header is merged with theirs and cached with validators
+app.add_middleware(CachePolicyMiddleware)
+app.add_middleware(CompressionMiddleware)
+# outermost, so the validators it caches are the ETags of compressed responses
+app.add_middleware(ConditionalRequestMiddleware)
 
 
 def prez_open_api_metadata():
@@ -148,7 +195,22 @@ async def app_startup():
     await add_common_context_ontologies_to_tbox_cache()
 
     app.state.pyoxi_system_store = get_system_store()
-    await load_system_data_to_oxigraph(app.state.pyoxi_system_store)
+
+    if settings.materialize_links:
+        # runs in the background; links are generated on request until it completes
+        app.state.link_materialization = asyncio.create_task(
+            materialize_links(app.state.repo)
+        )
+
+    if settings.system_reload_interval:
+        app.state.system_reload = asyncio.create_task(
+            poll_system_definitions(app.state.repo, settings.system_reload_interval)
+        )
+
+    if settings.event_loop_lag_interval:
+        app.state.event_loop_lag = asyncio.create_task(
+            event_loop_lag.run(settings.event_loop_lag_interval)
+        )
 
 
 @app.on_event("shutdown")
@@ -160,6 +222,10 @@ async def app_shutdown():
     log = logging.getLogger("prez")
     log.info("Shutting down...")
 
+    if getattr(app.state, "event_loop_lag", None):
+        app.state.event_loop_lag.cancel()
+    shutdown_executors()
+
     # close all SPARQL async clients
     if not settings.sparql_repo_type:
         await app.state.http_async_client.aclose()
@@ -1,14 +1,38 @@
 from pyoxigraph.pyoxigraph import Store
-from rdflib import Graph, ConjunctiveGraph, Dataset
+from rdflib import Graph, URIRef
 
-tbox_cache = Graph()
+from prez.config import settings
+from prez.services.annotation_index import AnnotationIndex
+from prez.services.bounded_cache import BoundedLRUCache, estimate_triples_size
+from prez.services.system_graph import SystemGraph
 
-profiles_graph_cache = ConjunctiveGraph()
+# term -> annotation category -> (predicate, literal) pairs; context ontologies are pinned, fetched annotations are LRU
+tbox_cache = AnnotationIndex(
+    max_entries=settings.tbox_cache_max_entries,
+    max_bytes=settings.tbox_cache_max_bytes,
+    negative_ttl=settings.tbox_cache_negative_ttl,
+)
+
+# Prez's profiles and endpoint definitions, held once in named graphs of the system store, which the system repo
+# queries as the union default graph
+system_store = Store()
+
+profiles_graph_cache = SystemGraph(
+    system_store, URIRef("https://prez.dev/system/profiles")
+)
 profiles_graph_cache.bind("prez", "https://prez.dev/")
 
-endpoints_graph_cache = ConjunctiveGraph()
+endpoints_graph_cache = SystemGraph(
+    system_store, URIRef("https://prez.dev/system/endpoints")
+)
 endpoints_graph_cache.bind("prez", "https://prez.dev/")
 
+# class -> endpoint templates -> ordered parent relations, compiled from endpoints_graph_cache
+endpoint_template_index = {}
+
+# class -> candidate (profile, format) rows for content negotiation, compiled from profiles_graph_cache
+conneg_table = {}
+
 prez_system_graph = Graph()
 prez_system_graph.bind("prez", "https://prez.dev/")
 
@@ -17,13 +41,25 @@ prefix_graph = Graph(bind_namespaces="rdflib")
 # TODO can probably merge counts graph
 counts_graph = Graph()
 
-links_ids_graph_cache = Dataset()
-links_ids_graph_cache.bind("prez", "https://prez.dev/")
+# object IRI -> tuple of the prez:link and dcterms:identifier triples generated for that object
+links_ids_graph_cache = BoundedLRUCache(
+    max_entries=settings.links_cache_max_entries,
+    max_bytes=settings.links_cache_max_bytes,
+    sizeof=estimate_triples_size,
+)
+
+# object IRI named graph -> precomputed prez:link and dcterms:identifier triples, see link_materialization.py
+links_store = Store(settings.links_store_path) if settings.links_store_path else Store()
+
+# request (path, query parameters and negotiated headers) -> the ETag of its last response, see conditional_requests.py;
+# entries are small, so the cache is in effect bounded by their number
+validator_cache = BoundedLRUCache(
+    max_entries=settings.validator_cache_max_entries,
+    max_bytes=settings.validator_cache_max_entries * 1024,
+)
 
 search_methods = {}
 
 store = Store()
 
-system_store = Store()
-
 oxrdflib_store = Graph(store="Oxigraph")
@@ -22,6 +22,39 @@ class Settings(BaseSettings):
     top_level_classes:
     collection_classes:
     base_classes:
+    links_cache_max_entries: The maximum number of objects internal links and identifiers are cached for
+    links_cache_max_bytes: The (estimated) maximum memory in bytes used by the internal links and identifiers cache
+    link_generation_concurrency: The maximum number of objects internal links are generated for concurrently, per request
+    materialize_links: Precompute internal links for every object delivered by an object endpoint at startup
+    links_store_path: A directory to persist materialized links in. Links are held in memory if not set
+    tbox_cache_max_entries: The maximum number of terms annotations fetched from the triplestore are cached for. Annotations from the context ontologies are always cached
+    tbox_cache_max_bytes: The (estimated) maximum memory in bytes used by annotations fetched from the triplestore
+    tbox_cache_negative_ttl: The number of seconds a term found to have no label, description or other annotation is not queried for again
+    annotation_chunk_size: The maximum number of terms annotations are queried for in a single query
+    annotation_query_concurrency: The maximum number of annotation queries sent concurrently, per request
+    default_languages: The languages labels are returned in, most preferred first, when a request has no Accept-Language header
+    system_reload_interval: The number of seconds between checks of the triplestore for changed profiles, endpoint definitions and search methods, which are reloaded if changed. Not checked if unset
+    rdf_stream_chunk_size: The approximate size in bytes of the chunks RDF responses are streamed in
+    offload_executor: The kind of worker pool parsing and serialization of large responses is offloaded to from the event loop: "thread" or "process"
+    offload_max_workers: The number of threads or processes in the worker pool
+    offload_min_bytes: The size in bytes of a SPARQL response above which it is parsed in the worker pool
+    offload_min_triples: The number of triples in a graph above which it is serialized or rendered in the worker pool
+    event_loop_lag_interval: The number of seconds between measurements of event loop lag, reported by /cache-stats. Not measured if unset
+    rdf_term_cache_max_entries: The maximum number of RDF terms whose escaped N-Triples form is cached between responses
+    compression_encodings: The content codings responses are compressed in, most preferred first, of "zstd", "br" and "gzip". zstd and br are used only if the zstandard and brotli packages (the compression extra) are installed. Responses are not compressed if empty
+    compression_minimum_size: The size in bytes below which responses are sent uncompressed
+    data_version: A token identifying the version of the data in the triplestore, such as a load timestamp. If set, ETags are derived from it and the request, so conditional requests are answered without querying the triplestore; it must change whenever the data does. If unset, ETags are hashes of the response graphs
+    validator_cache_max_entries: The maximum number of requests whose ETag is cached, so a conditional request for them can be answered before querying the triplestore
+    validator_cache_ttl: The number of seconds a cached ETag is trusted for, when data_version is unset
+    response_cache_ttl: The number of seconds a rendered response is cached for, by its route, parameters, profile and mediatype. Responses are not cached if unset
+    response_cache_stale_ttl: The number of seconds after a cached response expires during which it is still returned while it is rendered again in the background
+    response_cache_max_entries: The maximum number of responses cached in memory
+    response_cache_max_bytes: The maximum total size in bytes of the responses, and their compressed variants, cached in memory
+    response_cache_max_entry_bytes: The size in bytes above which a response is not cached
+    response_cache_path: A directory responses are also cached in, so they survive restarts. Not cached on disk if unset
+    response_cache_disk_max_bytes: The maximum total size in bytes of the responses cached on disk
+    cache_control_policies: The Cache-Control header of responses, by the class of the ont:Endpoint a route is defined as (Endpoint, ObjectEndpoint or ListingEndpoint) or, for other routes, by their OpenAPI tag (such as Search, SPARQL or Management). Responses of routes without a policy have no Cache-Control header
+    dropdown_sort_rows: Whether the rows of dd profile (JSON, NDJSON and CSV) responses are sorted by IRI when a request does not say, with the _sort query parameter. Unsorted rows are streamed as they are read from the response graph
     log_level:
     log_output:
     prez_title:
@@ -49,6 +82,49 @@ class Settings(BaseSettings):
     other_predicates = [SDO.color, REG.status]
     sparql_timeout = 30.0
     sparql_repo_type: str = "remote"
+    links_cache_max_entries: int = 100_000
+    links_cache_max_bytes: int = 256 * 1024 * 1024
+    link_generation_concurrency: int = 16
+    materialize_links: bool = False
+    links_store_path: Optional[str] = None
+    materialization_page_size: int = 1000
+    tbox_cache_max_entries: int = 100_000
+    tbox_cache_max_bytes: int = 128 * 1024 * 1024
+    tbox_cache_negative_ttl: float = 3600.0
+    annotation_chunk_size: int = 500
+    annotation_query_concurrency: int = 4
+    default_languages: list = ["en", "en-AU"]
+    system_reload_interval: Optional[float] = None
+    rdf_stream_chunk_size: int = 64 * 1024
+    offload_executor: str = "thread"
+    offload_max_workers: int = 4
+    offload_min_bytes: int = 1024 * 1024
+    offload_min_triples: int = 5_000
+    event_loop_lag_interval: Optional[float] = 1.0
+    rdf_term_cache_max_entries: int = 100_000
+    dropdown_sort_rows: bool = True
+    compression_encodings: list = ["zstd", "br", "gzip"]
+    compression_minimum_size: int = 1024
+    data_version: Optional[str] = None
+    validator_cache_max_entries: int = 10_000
+    validator_cache_ttl: float = 60.0
+    response_cache_ttl: Optional[float] = None
+    response_cache_stale_ttl: float = 0.0
+    response_cache_max_entries: int = 1_000
+    response_cache_max_bytes: int = 256 * 1024 * 1024
+    response_cache_max_entry_bytes: int = 8 * 1024 * 1024
+    response_cache_path: Optional[str] = None
+    response_cache_disk_max_bytes: int = 1024 * 1024 * 1024
+    cache_control_policies: dict = {
+        "Endpoint": "public, max-age=86400",
+        "ObjectEndpoint": "public, max-age=300",
+        "ListingEndpoint": "public, max-age=60",
+        "Search": "no-store",
+        "SPARQL": "no-store",
+        "CQL": "no-store",
+        "Management": "no-store",
+        "Prez": "public, max-age=86400",
+    }
 
     log_level = "INFO"
     log_output = "stdout"
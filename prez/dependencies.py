@@ -8,8 +8,6 @@ from prez.cache import (
     store,
     oxrdflib_store,
     system_store,
-    profiles_graph_cache,
-    endpoints_graph_cache,
 )
 from prez.config import settings
 from prez.sparql.methods import PyoxigraphRepo, RemoteSparqlRepo, OxrdflibRepo
@@ -54,9 +52,10 @@ async def get_system_repo(
     """
     A pyoxigraph Store with Prez system data including:
     - Profiles
-    # TODO add and test other system data (endpoints etc.)
+    - Endpoint definitions
+    each in a named graph (see prez.cache), queried as the union default graph.
     """
-    return PyoxigraphRepo(pyoxi_store)
+    return PyoxigraphRepo(pyoxi_store, union_default_graph=True)
 
 
 async def load_local_data_to_oxigraph(store: Store):
@@ -65,15 +64,3 @@ async def load_local_data_to_oxigraph(store: Store):
     """
     for file in (Path(__file__).parent.parent / settings.local_rdf_dir).glob("*.ttl"):
         store.load(file.read_bytes(), "text/turtle")
-
-
-async def load_system_data_to_oxigraph(store: Store):
-    """
-    Loads all the data from the local data directory into the local SPARQL endpoint
-    """
-    # TODO refactor to use the local files directly
-    profiles_bytes = profiles_graph_cache.serialize(format="nt", encoding="utf-8")
-    store.load(profiles_bytes, "application/n-triples")
-
-    endpoints_bytes = endpoints_graph_cache.serialize(format="nt", encoding="utf-8")
-    store.load(endpoints_bytes, "application/n-triples")
@@ -35,3 +35,14 @@ class NoProfilesException(Exception):
             f"for which a profile was searched was/were: {', '.join(klass for klass in classes)}"
         )
         super().__init__(self.message)
+
+
+class InvalidIRIException(Exception):
+    """
+    Raised when a requested IRI cannot be used in a SPARQL query, for example because it contains spaces or angle
+    brackets.
+    """
+
+    def __init__(self, iri: str):
+        self.message = f"{iri!r} is not a valid IRI."
+        super().__init__(self.message)
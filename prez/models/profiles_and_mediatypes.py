@@ -1,11 +1,15 @@
-from typing import FrozenSet, Optional
+from typing import FrozenSet, Optional, Tuple
 
 from pydantic import BaseModel, root_validator
 from rdflib import Namespace, URIRef
 from starlette.requests import Request
 
 from prez.services.generate_profiles import get_profiles_and_mediatypes
-from prez.services.connegp_service import get_requested_profile_and_mediatype
+from prez.services.connegp_service import (
+    get_requested_profile_and_mediatype,
+    get_requested_languages,
+    get_requested_sort,
+)
 
 PREZ = Namespace("https://prez.dev/")
 
@@ -21,6 +25,8 @@ class ProfilesMediatypesInfo(BaseModel):
     selected_class: Optional[URIRef] = None
     profile_headers: Optional[str] = None
     avail_profile_uris: Optional[str] = None
+    languages: Optional[Tuple[str, ...]] = None
+    sort_rows: Optional[bool] = None
 
     @root_validator
     def populate_requested_types(cls, values):
@@ -30,6 +36,8 @@ class ProfilesMediatypesInfo(BaseModel):
             values["req_profiles_token"],
             values["req_mediatypes"],
         ) = get_requested_profile_and_mediatype(request)
+        values["languages"] = get_requested_languages(request)
+        values["sort_rows"] = get_requested_sort(request)
         return values
 
     @root_validator
@@ -2,7 +2,7 @@ from typing import Optional
 from typing import Set
 
 from pydantic import BaseModel, root_validator
-from rdflib import URIRef, PROF, Namespace
+from rdflib import URIRef, PROF, Namespace, RDF
 
 from prez.cache import profiles_graph_cache
 from prez.config import settings
@@ -35,10 +35,11 @@ class ProfileItem(BaseModel):
             values["uri"] = get_uri_for_curie_id(id)
         elif uri:
             values["id"] = get_curie_id_for_uri(uri)
-        q = f"""SELECT ?class {{ <{values["uri"]}> a ?class }}"""
-        r = profiles_graph_cache.query(q)
-        if len(r.bindings) > 0:
-            values["classes"] = frozenset([prof.get("class") for prof in r.bindings])
+        classes = frozenset(
+            profiles_graph_cache.objects(URIRef(values["uri"]), RDF.type)
+        )
+        if classes:
+            values["classes"] = classes
         label = values.get("label")
         if not label:
             values["label"] = settings.label_predicates[0]
@@ -0,0 +1,26 @@
+from textwrap import dedent
+from typing import List
+
+from jinja2 import Template
+
+
+def get_feature_geometries_query(features: List[str]) -> str:
+    query = Template(
+        """
+        PREFIX geo: <http://www.opengis.net/ont/geosparql#>
+
+        CONSTRUCT {
+            ?feature geo:hasGeometry ?geometry .
+            ?geometry geo:asGeoJSON ?geojson .
+            ?geometry geo:asWKT ?wkt .
+        }
+        WHERE {
+            VALUES ?feature { {% for feature in features %}<{{ feature }}> {% endfor %}}
+            ?feature geo:hasGeometry ?geometry .
+            OPTIONAL { ?geometry geo:asGeoJSON ?geojson . }
+            OPTIONAL { ?geometry geo:asWKT ?wkt . }
+        }
+    """
+    ).render(features=features)
+
+    return dedent(query)
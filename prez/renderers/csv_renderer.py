@@ -1,17 +1,17 @@
-import io
 import csv
+from typing import Iterable, Iterator
 
 
-def render_csv_dropdown(rows: list[dict]) -> io.StringIO:
-    stream = io.StringIO()
-    headers = list(rows[0].keys())
-    writer = csv.DictWriter(
-        stream, fieldnames=headers, quotechar='"', quoting=csv.QUOTE_MINIMAL
-    )
-    writer.writeheader()
+class _Line:
+    """A file-like target for csv.writer which returns each line written rather than storing it."""
+
+    def write(self, line: str) -> str:
+        return line
 
-    for row in rows:
-        writer.writerow(row)
 
-    stream.seek(0)
-    return stream
+def csv_dropdown_pieces(headers: list[str], rows: Iterable[dict]) -> Iterator[str]:
+    """Writes rows as CSV, a line at a time, with a header line of their keys in the order of headers."""
+    writer = csv.writer(_Line(), quotechar='"', quoting=csv.QUOTE_MINIMAL)
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([row[header] for header in headers])
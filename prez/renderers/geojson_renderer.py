@@ -0,0 +1,264 @@
+import json
+import logging
+import re
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from geojson_rewind import rewind
+from rdflib import Graph, Literal, Namespace, RDF, RDFS, URIRef
+from rdflib.term import Node
+
+from prez.config import settings
+from prez.reference_data.prez_ns import PREZ
+from prez.renderers.rdf_stream_renderer import JSON_NATIVE_DATATYPES, chunked
+from prez.services.worker_pool import iterate_offloaded
+
+log = logging.getLogger(__name__)
+
+GEO = Namespace("http://www.opengis.net/ont/geosparql#")
+
+GEOJSON_MEDIATYPE = "application/geo+json"
+
+# the classes whose responses can be written as GeoJSON: a single feature, or a collection of its member features
+GEOJSON_CLASSES = frozenset([GEO.Feature, GEO.FeatureCollection, PREZ.FeatureList])
+
+# predicates which are written as a feature's geometry or id rather than as its properties
+NON_PROPERTY_PREDICATES = frozenset([RDF.type, GEO.hasGeometry])
+
+_WKT_TOKENS = re.compile(r"\(|\)|,|[^\s(),]+")
+
+# the number of coordinate values kept for WKT's dimension suffixes; GeoJSON positions have no measure value
+_WKT_DIMENSIONS = {"": None, "Z": 3, "M": 2, "ZM": 3}
+
+
+class _WKTReader:
+    """A recursive descent reader of the tokens of a WKT literal, with its CRS IRI removed."""
+
+    def __init__(self, text: str):
+        self.tokens = _WKT_TOKENS.findall(text)
+        self.position = 0
+
+    def next(self) -> str:
+        if self.position >= len(self.tokens):
+            raise ValueError("Unexpected end of WKT")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def expect(self, token: str):
+        found = self.next()
+        if found != token:
+            raise ValueError(f"Expected {token!r} in WKT, found {found!r}")
+
+    def geometry(self) -> Optional[dict]:
+        name = self.next().upper()
+        dimensions = ""
+        if self.peek() and self.peek().upper() in ("Z", "M", "ZM"):
+            dimensions = self.next().upper()
+        if self.peek() and self.peek().upper() == "EMPTY":
+            self.next()
+            if name == "GEOMETRYCOLLECTION":
+                return {"type": "GeometryCollection", "geometries": []}
+            return None
+        if name == "GEOMETRYCOLLECTION":
+            self.expect("(")
+            geometries = [self.geometry()]
+            while self.peek() == ",":
+                self.next()
+                geometries.append(self.geometry())
+            self.expect(")")
+            return {
+                "type": "GeometryCollection",
+                "geometries": [g for g in geometries if g is not None],
+            }
+        coordinates = self.nested(_WKT_DIMENSIONS[dimensions])
+        if name == "POINT":
+            return {"type": "Point", "coordinates": coordinates[0]}
+        if name == "MULTIPOINT":
+            # points may be written with or without parentheses around each
+            coordinates = [
+                point[0] if point and isinstance(point[0], list) else point
+                for point in coordinates
+            ]
+            return {"type": "MultiPoint", "coordinates": coordinates}
+        if name in ("LINESTRING", "POLYGON", "MULTILINESTRING", "MULTIPOLYGON"):
+            geojson_type = {
+                "LINESTRING": "LineString",
+                "POLYGON": "Polygon",
+                "MULTILINESTRING": "MultiLineString",
+                "MULTIPOLYGON": "MultiPolygon",
+            }[name]
+            return {"type": geojson_type, "coordinates": coordinates}
+        raise ValueError(f"Unsupported WKT geometry type {name}")
+
+    def nested(self, dimensions: Optional[int]) -> list:
+        """A parenthesised list of positions, or of lists of positions."""
+        self.expect("(")
+        items = []
+        while True:
+            if self.peek() == "(":
+                items.append(self.nested(dimensions))
+            else:
+                position = []
+                while self.peek() not in (",", ")", None):
+                    position.append(float(self.next()))
+                items.append(position[:dimensions] if dimensions else position)
+            token = self.next()
+            if token == ")":
+                return items
+            if token != ",":
+                raise ValueError(f"Expected ',' or ')' in WKT, found {token!r}")
+
+
+def wkt_to_geojson(wkt: str) -> Optional[dict]:
+    """
+    Converts a GeoSPARQL WKT literal to a GeoJSON geometry, or None if it is empty. The literal's CRS IRI, if any, is
+    dropped, and its coordinates written as given, as GeoJSON coordinates are CRS84, the default CRS of WKT literals.
+    Raises ValueError if the literal is not WKT.
+    """
+    text = wkt.strip()
+    if text.startswith("<"):
+        text = text[text.index(">") + 1 :]
+    reader = _WKTReader(text)
+    geometry = reader.geometry()
+    if reader.peek() is not None:
+        raise ValueError(f"Unexpected {reader.peek()!r} after WKT geometry")
+    return geometry
+
+
+def _rewound(geometry: Optional[dict]) -> Optional[dict]:
+    """A geometry with its polygons' rings wound as RFC 7946 requires: exterior rings counterclockwise."""
+    if geometry is None or geometry.get("type") not in (
+        "Polygon",
+        "MultiPolygon",
+        "GeometryCollection",
+    ):
+        return geometry
+    return rewind(geometry)
+
+
+def literal_geometry(graph: Graph, feature: Node) -> Optional[dict]:
+    """
+    The GeoJSON geometry of a feature, from the geo:asGeoJSON literal of its geo:hasGeometry geometry, or failing that
+    its geo:asWKT literal. The literals are read from each geometry's predicates in one lookup of the graph, and parsed
+    directly rather than through a graph of the feature. Geometries which cannot be parsed are skipped.
+    """
+    wkt_literals = []
+    for geometry_node in graph.objects(feature, GEO.hasGeometry):
+        for predicate, value in graph.predicate_objects(geometry_node):
+            if predicate == GEO.asGeoJSON:
+                try:
+                    return _rewound(json.loads(str(value)))
+                except ValueError:
+                    log.debug(f"Invalid GeoJSON literal for feature {feature}")
+            elif predicate == GEO.asWKT:
+                wkt_literals.append(value)
+    for value in wkt_literals:
+        try:
+            return _rewound(wkt_to_geojson(str(value)))
+        except ValueError as err:
+            log.debug(f"Invalid WKT literal for feature {feature}: {err}")
+    return None
+
+
+def _property_name(predicate: Node) -> str:
+    return str(predicate).split("#")[-1].split("/")[-1]
+
+
+def _property_value(value: Node):
+    if isinstance(value, Literal) and value.datatype in JSON_NATIVE_DATATYPES:
+        return value.toPython()
+    return str(value)
+
+
+def geojson_feature(graph: Graph, feature: Node) -> dict:
+    """
+    A GeoJSON Feature for a feature in a graph: its IRI as its id, its geometry (see literal_geometry), and its other
+    predicates as properties keyed by their local names, with a list for a property with several values.
+    """
+    properties: Dict[str, List] = {}
+    for predicate, value in graph.predicate_objects(feature):
+        if predicate not in NON_PROPERTY_PREDICATES:
+            properties.setdefault(_property_name(predicate), []).append(
+                _property_value(value)
+            )
+    return {
+        "type": "Feature",
+        "id": str(feature),
+        "geometry": literal_geometry(graph, feature),
+        "properties": {
+            name: values[0] if len(values) == 1 else sorted(values, key=str)
+            for name, values in sorted(properties.items())
+        },
+    }
+
+
+def collection_features(graph: Graph) -> Tuple[List[Node], Optional[int]]:
+    """
+    The member features of a feature collection or feature listing graph, sorted by IRI, and the number of features
+    matched by the listing, from its prez:count, if given.
+    """
+    features = set()
+    number_matched = None
+    for collection, feature in graph.subject_objects(RDFS.member):
+        features.add(feature)
+        count = graph.value(collection, PREZ["count"])
+        if count is not None:
+            number_matched = int(count)
+    return sorted(features, key=str), number_matched
+
+
+def geojson_pieces(graph: Graph, selected_class: URIRef) -> Iterator[str]:
+    """
+    The GeoJSON of a response graph: a Feature for a feature, otherwise a FeatureCollection of the member features,
+    written feature by feature, so only one feature's JSON is held in memory at a time.
+    """
+    if selected_class == GEO.Feature:
+        feature = min(graph.subjects(RDF.type, GEO.Feature), key=str, default=None)
+        if feature is not None:
+            yield json.dumps(geojson_feature(graph, feature))
+            return
+    features, number_matched = collection_features(graph)
+    yield '{"type": "FeatureCollection", "features": ['
+    for i, feature in enumerate(features):
+        yield (", " if i else "") + json.dumps(geojson_feature(graph, feature))
+    yield "]"
+    if number_matched is not None:
+        yield f', "numberMatched": {number_matched}'
+    yield f', "numberReturned": {len(features)}}}'
+
+
+def stream_geojson(
+    graph: Graph, selected_class: URIRef, chunk_size: Optional[int] = None
+) -> Iterator[bytes]:
+    """Writes a response graph as GeoJSON as it is iterated over, in chunks of settings.rdf_stream_chunk_size bytes."""
+    return chunked(
+        geojson_pieces(graph, selected_class),
+        chunk_size or settings.rdf_stream_chunk_size,
+    )
+
+
+def render_geojson(graph: Graph, selected_class: URIRef) -> AsyncIterator[bytes]:
+    """
+    The content of a GeoJSON response. Graphs of at least settings.offload_min_triples triples are written in the
+    worker pool, smaller graphs on the event loop.
+    """
+    return iterate_offloaded(
+        len(graph),
+        settings.offload_min_triples,
+        stream_geojson,
+        graph,
+        selected_class,
+    )
+
+
+def features_without_geometries(graph: Graph) -> List[Node]:
+    """The member features of a collection or listing graph which have no geometry in it, as listings omit them."""
+    features, _ = collection_features(graph)
+    return [
+        feature
+        for feature in features
+        if isinstance(feature, URIRef) and (feature, GEO.hasGeometry, None) not in graph
+    ]
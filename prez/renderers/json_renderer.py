@@ -1,17 +1,41 @@
-from itertools import chain
+import json
+from typing import AsyncIterator, Dict, Iterator, NamedTuple, Optional, Tuple
 
-from rdflib import Graph, URIRef, RDF, SH, Literal
+from rdflib import Graph, URIRef, RDF, SH
 from rdflib.term import Node
 
-from prez.cache import profiles_graph_cache
+from prez.config import settings
 from prez.reference_data.prez_ns import ALTREXT
+from prez.renderers.csv_renderer import csv_dropdown_pieces
+from prez.renderers.rdf_stream_renderer import chunked
+from prez.services.profile_shapes import get_profile_cbd
+from prez.services.worker_pool import iterate_offloaded
 from prez.sparql.objects_listings import get_listing_predicates
 
 
+NDJSON_MEDIATYPE = "application/x-ndjson"
+
+
 class NotFoundError(Exception):
     ...
 
 
+class DropdownTable(NamedTuple):
+    """
+    The layout of a dropdown response: its columns, keyed by the local names of their predicates, and where its rows
+    are found in the response graph - the members of container_class for a listing, otherwise the children of focus,
+    which are the subjects of child_to_focus and the objects of focus_to_child predicates. Rows are written in the
+    order they are found unless sort_rows, when they are sorted by IRI.
+    """
+
+    columns: Dict[str, Node]
+    container_class: Optional[Node] = None
+    focus: Optional[Node] = None
+    child_to_focus: Tuple[Node, ...] = ()
+    focus_to_child: Tuple[Node, ...] = ()
+    sort_rows: bool = True
+
+
 def _get_resource_iri(graph: Graph, profile_graph: Graph, profile: URIRef) -> Node:
     target_classes = profile_graph.objects(profile, ALTREXT.constrainsClass)
     for target_class in target_classes:
@@ -28,59 +52,37 @@ def _get_label_predicates(profile_graph: Graph, profile: URIRef) -> list[Node]:
     return list(profile_graph.objects(profile, ALTREXT.hasLabelPredicate))
 
 
-def _get_child_iris(
-    graph: Graph,
-    iri: Node,
-    child_to_focus_predicates: list[Node],
-    parent_to_focus_predicates: list[Node],
-    focus_to_child_predicates: list[Node],
-) -> list[Node]:
-    children = []
-    for predicate in child_to_focus_predicates:
-        child_iris = list(graph.subjects(predicate, iri))
-        if child_iris:
-            children += child_iris
-
-    for predicate in parent_to_focus_predicates:
-        child_iris = list(graph.objects(iri, predicate))
-        if child_iris:
-            children += child_iris
-
-    for predicate in focus_to_child_predicates:
-        child_iris = list(graph.objects(iri, predicate))
-        if child_iris:
-            children += child_iris
-
-    return children
-
-
-def create_graph_item(
-    iri: str, predicates: list[Node], graph: Graph, context: dict
-) -> tuple[dict, dict]:
-    item = {"iri": iri}
-    for predicate in predicates:
-        values = list(graph.objects(URIRef(iri), predicate))
-        predicate_localname = str(predicate).split("#")[-1].split("/")[-1]
-        item[str(predicate_localname)] = str(values[0]) if values else None
-        context[predicate_localname] = str(predicate)
-
-    return item, context
-
-
-async def render_json_dropdown(
+def _get_row_iris(graph: Graph, table: DropdownTable) -> Iterator[Node]:
+    if table.container_class is not None:
+        yield from graph.subjects(RDF.type, table.container_class)
+        return
+
+    for predicate in table.child_to_focus:
+        yield from graph.subjects(predicate, table.focus)
+
+    for predicate in table.focus_to_child:
+        yield from graph.objects(table.focus, predicate)
+
+
+def _column_name(predicate: Node) -> str:
+    return str(predicate).split("#")[-1].split("/")[-1]
+
+
+def dropdown_table(
     graph: Graph,
     profile: URIRef,
     selected_class: URIRef,
-) -> dict:
-    profile_graph = profiles_graph_cache.cbd(profile)
+    sort_rows: bool = True,
+) -> DropdownTable:
+    """
+    Lays out the dropdown response for a graph: a row for each member of the container class of a listing, or for each
+    child of an object, with a column for each of the profile's relative and label predicates. Raises NotFoundError if
+    the graph has no resource the profile describes.
+    """
+    profile_graph = get_profile_cbd(profile)
 
     iri = _get_resource_iri(graph, profile_graph, profile)
 
-    items = []
-    context = {
-        "iri": "@id",
-    }
-
     (
         child_to_focus_predicates,
         parent_to_focus,
@@ -89,6 +91,14 @@ async def render_json_dropdown(
         relative_predicates,
     ) = get_listing_predicates(profile, selected_class)
 
+    # a later predicate with the same local name takes the column
+    columns = {}
+    for predicate in (
+        *relative_predicates,
+        *_get_label_predicates(profile_graph, profile),
+    ):
+        columns[_column_name(predicate)] = predicate
+
     if (
         not child_to_focus_predicates
         and not focus_to_parent_predicates
@@ -103,27 +113,106 @@ async def render_json_dropdown(
             raise NotFoundError(
                 f"No container class found for resource {iri} in profile {profile}."
             )
+        return DropdownTable(columns, container_class, sort_rows=sort_rows)
+
+    return DropdownTable(
+        columns,
+        focus=iri,
+        child_to_focus=child_to_focus_predicates,
+        focus_to_child=focus_to_parent_predicates + focus_to_child_predicates,
+        sort_rows=sort_rows,
+    )
+
+
+def dropdown_context(table: DropdownTable, has_rows: bool = True) -> dict:
+    """The JSON-LD context of a dropdown response, which maps its columns to their predicates if it has any rows."""
+    context = {"iri": "@id"}
+    if has_rows:
+        for name, predicate in table.columns.items():
+            context[name] = str(predicate)
+    return context
+
+
+def dropdown_rows(graph: Graph, table: DropdownTable) -> Iterator[dict]:
+    """
+    The rows of a dropdown response, with the first value of each column's predicate for the row's IRI, or None. Each
+    row's predicates and values are indexed in one lookup of the graph, rather than one for each column. Unless the
+    table's rows are sorted, each row is written as it is found, so memory use does not grow with the number of rows.
+    """
+    row_iris = _get_row_iris(graph, table)
+    if table.sort_rows:
+        row_iris = sorted(row_iris, key=str)
+    columns = table.columns.items()
+    for iri in row_iris:
+        values = {}
+        for predicate, value in graph.predicate_objects(iri):
+            values.setdefault(predicate, value)
+        row = {"iri": str(iri)}
+        for name, predicate in columns:
+            value = values.get(predicate)
+            row[name] = str(value) if value is not None else None
+        yield row
+
+
+def json_dropdown_pieces(graph: Graph, table: DropdownTable) -> Iterator[str]:
+    """The JSON of a dropdown response, row by row, as json.dumps writes the whole response."""
+    rows = dropdown_rows(graph, table)
+    row = next(rows, None)
+    context = dropdown_context(table, has_rows=row is not None)
+    yield f'{{"@context": {json.dumps(context)}, "@graph": ['
+    if row is not None:
+        yield json.dumps(row)
+        for row in rows:
+            yield ", " + json.dumps(row)
+    yield "]}"
+
+
+def ndjson_dropdown_pieces(graph: Graph, table: DropdownTable) -> Iterator[str]:
+    """The rows of a dropdown response as newline delimited JSON, one object per line."""
+    for row in dropdown_rows(graph, table):
+        yield json.dumps(row) + "\n"
+
+
+def csv_dropdown_rows(graph: Graph, table: DropdownTable) -> Iterator[str]:
+    """The rows of a dropdown response as CSV, with a column for the IRI and each of the table's columns."""
+    return csv_dropdown_pieces(["iri", *table.columns], dropdown_rows(graph, table))
+
+
+DROPDOWN_WRITERS = {
+    "application/json": json_dropdown_pieces,
+    NDJSON_MEDIATYPE: ndjson_dropdown_pieces,
+    "text/csv": csv_dropdown_rows,
+}
+
+
+def stream_dropdown(
+    graph: Graph,
+    table: DropdownTable,
+    mediatype: str = "application/json",
+    chunk_size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Writes a dropdown response in one of the DROPDOWN_WRITERS mediatypes as it is iterated over, in chunks of roughly
+    settings.rdf_stream_chunk_size bytes.
+    """
+    return chunked(
+        DROPDOWN_WRITERS[mediatype](graph, table),
+        chunk_size or settings.rdf_stream_chunk_size,
+    )
 
-        for resource in graph.subjects(RDF.type, container_class):
-            relative_predicates += _get_label_predicates(profile_graph, profile)
-            item, context = create_graph_item(
-                str(resource), relative_predicates, graph, context
-            )
-            items.append(item)
-    else:
-        relative_predicates += _get_label_predicates(profile_graph, profile)
-
-        child_iris = _get_child_iris(
-            graph,
-            iri,
-            child_to_focus_predicates,
-            focus_to_parent_predicates,
-            focus_to_child_predicates,
-        )
-        for child_iri in child_iris:
-            item, context = create_graph_item(
-                str(child_iri), relative_predicates, graph, context
-            )
-            items.append(item)
 
-    return {"@context": context, "@graph": sorted(items, key=lambda x: x["iri"])}
+def render_dropdown(
+    graph: Graph, table: DropdownTable, mediatype: str = "application/json"
+) -> AsyncIterator[bytes]:
+    """
+    The content of a dropdown response. Graphs of at least settings.offload_min_triples triples are written in the
+    worker pool, smaller graphs on the event loop.
+    """
+    return iterate_offloaded(
+        len(graph),
+        settings.offload_min_triples,
+        stream_dropdown,
+        graph,
+        table,
+        mediatype,
+    )
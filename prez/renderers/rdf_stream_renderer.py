@@ -0,0 +1,681 @@
+from collections import defaultdict
+from functools import cmp_to_key, lru_cache, partial
+from json.encoder import encode_basestring
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from connegp import RDF_SERIALIZER_TYPES_MAP
+from rdflib import BNode, Graph, Literal, RDF, RDFS, URIRef, XSD
+from rdflib.plugins.shared.jsonld.context import Context
+from rdflib.plugins.shared.jsonld.util import split_iri
+from rdflib.term import Node
+
+from prez.cache import prefix_graph
+from prez.config import settings
+from prez.services.worker_pool import iterate_offloaded
+
+Triple = Tuple[Node, Node, Node]
+
+# looked up once, rather than through the namespaces' attribute access for each triple
+RDF_TYPE = RDF.type
+RDF_FIRST = RDF.first
+RDF_REST = RDF.rest
+RDF_NIL = RDF.nil
+RDF_LIST = RDF.List
+RDFS_LABEL = RDFS.label
+RDFS_CLASS = RDFS.Class
+
+# datatypes of literals RDFLib's JSON-LD serializer writes as native JSON values
+JSON_NATIVE_DATATYPES = {XSD.string, XSD.integer, XSD.double, XSD.boolean}
+
+
+def chunked(pieces: Iterable[str], chunk_size: int) -> Iterator[bytes]:
+    """Joins strings into UTF-8 encoded chunks of roughly chunk_size characters."""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer).encode("utf-8", "replace")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8", "replace")
+
+
+def _term_key(node: Node) -> tuple:
+    """A key for a term's written form: literals differing only in the case of their language tag are equal."""
+    return node, node.language if isinstance(node, Literal) else None
+
+
+class _Properties(dict):
+    """
+    The objects of a graph's subjects, grouped by predicate, read from the graph's index for each subject when first
+    needed. The index, not iteration over the whole graph, gives objects in the order RDFLib's serializers write them.
+    """
+
+    def __init__(self, graph: Graph):
+        super().__init__()
+        self.graph = graph
+
+    def __missing__(self, subject: Node) -> Dict[Node, List[Node]]:
+        properties = self[subject] = {}
+        for p, o in self.graph.predicate_objects(subject):
+            properties.setdefault(p, []).append(o)
+        return properties
+
+    def value(self, subject: Node, predicate: Node) -> Optional[Node]:
+        """The first object of a subject and predicate, as Graph.value returns it."""
+        objects = self[subject].get(predicate)
+        return objects[0] if objects else None
+
+
+@lru_cache(maxsize=settings.rdf_term_cache_max_entries)
+def _escaped_term(node: Node, language: Optional[str]) -> str:
+    if isinstance(node, Literal):
+        quoted = (
+            '"'
+            + node.replace("\\", "\\\\")
+            .replace("\n", "\\n")
+            .replace('"', '\\"')
+            .replace("\r", "\\r")
+            + '"'
+        )
+        if language:
+            return f"{quoted}@{language}"
+        if node.datatype:
+            return f"{quoted}^^<{node.datatype}>"
+        return quoted
+    return node.n3()
+
+
+def nt_term(node: Node) -> str:
+    """
+    A term as written in N-Triples, escaped as RDFLib's N-Triples serializer escapes it. IRIs and literals recur within
+    and across responses, so their escaped forms are cached, up to settings.rdf_term_cache_max_entries of them.
+    """
+    if isinstance(node, BNode):
+        return node.n3()
+    return _escaped_term(*_term_key(node))
+
+
+def rdf_term_cache_stats() -> dict:
+    info = _escaped_term.cache_info()
+    return {
+        "entries": info.currsize,
+        "max_entries": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+    }
+
+
+def ntriples_pieces(triples: Iterable[Triple]) -> Iterator[str]:
+    for s, p, o in triples:
+        yield f"{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n"
+
+
+def _compare_objects(a: Node, b: Node) -> int:
+    """Orders objects by value, or by their strings where their values can't be compared."""
+    try:
+        if a > b:
+            return 1
+        if a < b:
+            return -1
+        return 0
+    except TypeError:
+        a, b = str(a), str(b)
+        return (a > b) - (a < b)
+
+
+_object_order = cmp_to_key(_compare_objects)
+
+
+def _turtle_predicate_order(predicate: Node) -> tuple:
+    return (predicate != RDF_TYPE, predicate != RDFS_LABEL, predicate)
+
+
+class _TurtleWriter:
+    """
+    Writes Turtle as RDFLib's Turtle serializer writes it, byte for byte: subjects, predicates and objects in the same
+    order, blank nodes referenced once nested and valid lists written as collections. The triples are grouped by
+    subject in a single pass, rather than looked up in the graph's index subject by subject, and each distinct term's
+    prefixed name or label is computed once, rather than per occurrence as RDFLib does. The prefixes used must be known before the first statement, but
+    statements are then yielded as they are written.
+    """
+
+    indent_string = "    "
+
+    def __init__(self, graph: Graph):
+        self.graph = graph
+        self.base = graph.base
+        self.namespaces = {}
+        self.rewritten_prefixes = {}
+        self.references = defaultdict(int)
+        self.grouped = {}
+        self.classes = []
+        self.qnames = {}
+        self.labels = {}
+        self.serialized = set()
+        self.depth = 0
+        self.out = []
+
+    def add_namespace(self, prefix: str, namespace: str) -> str:
+        # Turtle prefixes can't start with "_", and a prefix may be bound to a different namespace in the output
+        if (prefix > "" and prefix[0] == "_") or self.namespaces.get(
+            prefix, namespace
+        ) != namespace:
+            if prefix not in self.rewritten_prefixes:
+                rewritten = "p" + prefix
+                while rewritten in self.namespaces:
+                    rewritten = "p" + rewritten
+                self.rewritten_prefixes[prefix] = rewritten
+            prefix = self.rewritten_prefixes[prefix]
+        if prefix in self.namespaces and self.namespaces[prefix] != namespace:
+            raise Exception(
+                f"Trying to override namespace prefix {prefix} => {namespace}, but it's already bound to "
+                f"{self.namespaces[prefix]}"
+            )
+        self.namespaces[prefix] = namespace
+        return prefix
+
+    def qname(self, uri: Node, generate: bool) -> Optional[str]:
+        """A prefixed name for an IRI, generating a prefix for its namespace if generate is set and it has none."""
+        if not isinstance(uri, URIRef):
+            return None
+        if (uri, generate) in self.qnames:
+            return self.qnames[uri, generate]
+        try:
+            prefix, namespace, local = self.graph.compute_qname(uri, generate=generate)
+        except Exception:
+            # the IRI may itself be a namespace
+            prefix = self.graph.store.prefix(uri)
+            if prefix is None:
+                return None
+            namespace, local = uri, ""
+        local = local.replace("(", r"\(").replace(")", r"\)")
+        if local.endswith("."):
+            return None
+        qname = f"{self.add_namespace(prefix, namespace)}:{local}"
+        self.qnames[uri, generate] = qname
+        return qname
+
+    def label(self, node: Node, verb: bool) -> str:
+        key = (_term_key(node), verb)
+        if key not in self.labels:
+            if node == RDF_NIL:
+                label = "()"
+            elif verb and node == RDF_TYPE:
+                label = "a"
+            elif isinstance(node, Literal):
+                label = node._literal_n3(
+                    use_plain=True,
+                    qname_callback=lambda datatype: self.qname(datatype, False),
+                )
+            else:
+                if self.base is not None and node.startswith(self.base):
+                    node = URIRef(node.replace(self.base, "", 1))
+                label = self.qname(node, verb) or node.n3()
+            self.labels[key] = label
+        return self.labels[key]
+
+    def preprocess(self):
+        predicates = {}
+        iris = {}
+        for s, p, o in self.graph:
+            self.references[o] += 1
+            self.grouped.setdefault(s, {}).setdefault(p, []).append(o)
+            if p == RDF_TYPE:
+                if o == RDFS_CLASS:
+                    self.classes.append(s)
+            else:
+                predicates[p] = None
+                if isinstance(p, BNode):
+                    self.references[p] += 1
+            if isinstance(s, URIRef):
+                iris[s] = None
+            if isinstance(o, URIRef):
+                iris[o] = None
+            elif isinstance(o, Literal) and o.datatype:
+                iris[o.datatype] = None
+        # prefixes are only generated for predicates' namespaces, so other terms' prefixed names are computed after
+        for p in predicates:
+            self.qname(p, True)
+        for iri in iris:
+            self.qname(iri, False)
+
+    def ordered_subjects(self) -> List[Node]:
+        classes = sorted(self.classes)
+        seen = set(classes)
+        return classes + [
+            subject
+            for _, _, subject in sorted(
+                (isinstance(s, BNode), self.references[s], s)
+                for s in self.grouped
+                if s not in seen
+            )
+        ]
+
+    def indent(self, modifier: int = 0) -> str:
+        return (self.depth + modifier) * self.indent_string
+
+    def statement(self, subject: Node):
+        self.serialized.add(subject)
+        self.out.append("\n" + self.indent())
+        if isinstance(subject, BNode) and self.references[subject] == 0:
+            self.out.append("[]")
+        else:
+            self.path(subject, verb=False, subject=True)
+        self.predicate_list(subject)
+        self.out.append(" .")
+
+    def path(self, node: Node, verb: bool, newline: bool = False, subject=False):
+        if not subject and self.nested(node, newline):
+            return
+        if not subject and not newline:
+            self.out.append(" ")
+        self.out.append(self.label(node, verb))
+
+    def nested(self, node: Node, newline: bool) -> bool:
+        if (
+            not isinstance(node, BNode)
+            or node in self.serialized
+            or self.references[node] > 1
+        ):
+            return False
+        if not newline:
+            self.out.append(" ")
+        if self.is_valid_list(node):
+            self.out.append("(")
+            self.depth += 1
+            while node:
+                item = self.graph.value(node, RDF_FIRST)
+                if item is not None:
+                    self.path(item, verb=False)
+                    self.serialized.add(node)
+                node = self.graph.value(node, RDF_REST)
+            self.depth -= 1
+            self.out.append(" )")
+        else:
+            self.serialized.add(node)
+            self.depth += 2
+            self.out.append("[")
+            self.depth -= 1
+            self.predicate_list(node)
+            self.out.append(" ]")
+            self.depth -= 1
+        return True
+
+    def is_valid_list(self, node: Node) -> bool:
+        """Whether node is the head of a list whose nodes have no properties but rdf:first and rdf:rest."""
+        if RDF_FIRST not in self.grouped.get(node, ()):
+            return False
+        seen = set()
+        while node:
+            if node != RDF_NIL and (
+                node in seen or sum(map(len, self.grouped.get(node, {}).values())) != 2
+            ):
+                return False
+            seen.add(node)
+            node = self.graph.value(node, RDF_REST)
+        return True
+
+    def predicate_list(self, subject: Node):
+        properties = self.grouped.get(subject, {})
+        for i, predicate in enumerate(sorted(properties, key=_turtle_predicate_order)):
+            if i:
+                self.out.append(" ;\n" + self.indent(1))
+            self.path(predicate, verb=True, newline=bool(i))
+            objects = sorted(properties[predicate], key=_object_order)
+            if any(_compare_objects(a, b) == 0 for a, b in zip(objects, objects[1:])):
+                # objects which compare equal, such as 1 and 1.0, stay in the order of the graph's index
+                objects = sorted(
+                    self.graph.objects(subject, predicate), key=_object_order
+                )
+            self.depth += 1
+            self.path(objects[0], verb=False)
+            for o in objects[1:]:
+                self.out.append(",\n" + self.indent(1))
+                self.path(o, verb=False, newline=True)
+            self.depth -= 1
+
+    def pieces(self) -> Iterator[str]:
+        self.preprocess()
+        subjects = self.ordered_subjects()
+        if self.base:
+            self.out.append(f"@base <{self.base}> .\n")
+        for prefix, namespace in sorted(self.namespaces.items()):
+            self.out.append(f"@prefix {prefix}: <{namespace}> .\n")
+        for subject in subjects:
+            if subject in self.serialized:
+                continue
+            self.statement(subject)
+            self.out.append("\n")
+            yield "".join(self.out)
+            self.out.clear()
+        self.out.append("\n")
+        yield "".join(self.out)
+
+
+def turtle_pieces(graph: Graph) -> Iterator[str]:
+    return _TurtleWriter(graph).pieces()
+
+
+def _json_text(value, indent: str = "") -> str:
+    """
+    A JSON value as json.dumps writes it with an indent of 2, sorted keys and non-ASCII characters unescaped, as RDFLib
+    writes JSON-LD, nested at indent. json.dumps falls back to its pure Python encoder when indenting; this is faster
+    for the small, shallow node objects JSON-LD is made of.
+    """
+    if isinstance(value, str):
+        return encode_basestring(value)
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, int):
+        return int.__repr__(value)
+    if isinstance(value, float):
+        if value != value:
+            return "NaN"
+        if value in (float("inf"), float("-inf")):
+            return "Infinity" if value > 0 else "-Infinity"
+        return float.__repr__(value)
+    nested = indent + "  "
+    if isinstance(value, dict):
+        if not value:
+            return "{}"
+        members = (
+            f"{encode_basestring(key)}: {_json_text(value[key], nested)}"
+            for key in sorted(value)
+        )
+    else:
+        if not value:
+            return "[]"
+        members = (_json_text(item, nested) for item in value)
+    brackets = "{}" if isinstance(value, dict) else "[]"
+    return (
+        f"{brackets[0]}\n{nested}"
+        + f",\n{nested}".join(members)
+        + f"\n{indent}{brackets[1]}"
+    )
+
+
+@lru_cache(maxsize=32)
+def _jsonld_context(prefixes: Tuple[Tuple[str, str], ...]) -> Context:
+    return Context(dict(prefixes))
+
+
+def prefix_namespaces() -> Dict[str, str]:
+    """The namespaces bound in prefix_graph, mapped to their prefixes."""
+    return {
+        str(namespace): prefix
+        for prefix, namespace in prefix_graph.namespaces()
+        if prefix and str(namespace) != "http://www.w3.org/XML/1998/namespace"
+    }
+
+
+class _JsonLdWriter:
+    """
+    Writes compact JSON-LD as RDFLib's JSON-LD serializer writes it given a context of prefixes, byte for byte: IRIs as
+    prefixed names, single values unwrapped, and strings, integers, doubles and booleans as native JSON values. The
+    namespaces used are collected in a single pass over the graph's triples, each distinct term is compacted once, and
+    node objects are yielded as they are completed. With an empty context the output is expanded, as a list of node objects.
+    """
+
+    def __init__(self, graph: Graph, namespaces: Dict[str, str]):
+        self.properties = _Properties(graph)
+        self.subjects = set()
+        self.referenced = set()
+        iris = set()
+        for s, p, o in graph:
+            self.subjects.add(s)
+            self.referenced.add(o)
+            iris.add(p)
+            if isinstance(s, URIRef):
+                iris.add(s)
+            if isinstance(o, URIRef):
+                iris.add(o)
+            elif isinstance(o, Literal) and o.datatype:
+                iris.add(o.datatype)
+        used = {split_iri(str(iri))[0] for iri in iris}
+        self.prefixes = {
+            namespaces[namespace]: namespace
+            for namespace in used
+            if namespace in namespaces
+        }
+        self.context = _jsonld_context(tuple(sorted(self.prefixes.items())))
+        self.terms = {}
+        self.symbols = {}
+        self.values = {}
+        self.nodes = []
+
+    def symbol(self, iri: Node) -> str:
+        if iri not in self.symbols:
+            self.symbols[iri] = self.context.to_symbol(iri)
+        return self.symbols[iri]
+
+    def term(self, predicate: Node):
+        if predicate not in self.terms:
+            self.terms[predicate] = self.context.find_term(str(predicate))
+        return self.terms[predicate]
+
+    def process_subject(self, subject: Node, nodemap: dict) -> Optional[dict]:
+        if isinstance(subject, URIRef):
+            node_id = self.context.shrink_iri(subject)
+        elif isinstance(subject, BNode):
+            node_id = subject.n3()
+        else:
+            node_id = None
+        if node_id in nodemap:
+            return None
+        node = {"@id": node_id}
+        nodemap[node_id] = node
+        self.nodes.append(node)
+        for p, objects in self.properties[subject].items():
+            for o in objects:
+                self.add_to_node(subject, p, o, node, nodemap)
+        return node
+
+    def add_to_node(self, subject: Node, p: Node, o: Node, node: dict, nodemap: dict):
+        value = None
+        term = self.term(p)
+        if term:
+            key = term.name
+        else:
+            key = self.symbol(p)
+            if p == RDF_TYPE:
+                if isinstance(o, URIRef):
+                    value = self.symbol(o)
+                key = "@type"
+        if value is None:
+            value = self.raw_value(o, nodemap)
+        existing = node.get(key)
+        if existing:
+            if not isinstance(existing, list):
+                existing = [existing]
+            existing.append(value)
+            node[key] = existing
+        else:
+            node[key] = value if self.context.active else [value]
+
+    def raw_value(self, o: Node, nodemap: dict):
+        collection = self.collection(o)
+        if collection is not None:
+            return {"@list": [self.raw_value(item, nodemap) for item in collection]}
+        if isinstance(o, BNode):
+            self.process_subject(o, nodemap)
+            return {"@id": o.n3()}
+        key = _term_key(o)
+        if key not in self.values:
+            if isinstance(o, URIRef):
+                self.values[key] = {"@id": self.context.shrink_iri(o)}
+            elif isinstance(o, Literal):
+                self.values[key] = self.literal_value(o)
+            else:
+                return None
+        return self.values[key]
+
+    def literal_value(self, o: Literal):
+        native = o.datatype in JSON_NATIVE_DATATYPES
+        value = o.toPython() if native else str(o)
+        if o.datatype:
+            if native:
+                return value if self.context.active else {"@value": value}
+            return {"@type": self.symbol(o.datatype), "@value": value}
+        if o.language and o.language != self.context.language:
+            return {"@language": o.language, "@value": value}
+        if not self.context.active or self.context.language and not o.language:
+            return {"@value": value}
+        return value
+
+    def collection(self, node: Node) -> Optional[list]:
+        """The items of the list node is the head of, or None if it isn't a valid list."""
+        if node != RDF_NIL and (
+            node not in self.subjects or not self.properties.value(node, RDF_FIRST)
+        ):
+            return None
+        items = []
+        chain = {node}
+        while node:
+            if node == RDF_NIL:
+                return items
+            if isinstance(node, URIRef):
+                return None
+            first = rest = None
+            for p, objects in self.properties[node].items():
+                for o in objects:
+                    if not first and p == RDF_FIRST:
+                        first = o
+                    elif not rest and p == RDF_REST:
+                        rest = o
+                    elif p != RDF_TYPE or o != RDF_LIST:
+                        return None
+            items.append(first)
+            node = rest
+            if node in chain:
+                return None
+            chain.add(node)
+        return None
+
+    def completed_nodes(self) -> Iterator[dict]:
+        """Node objects, each yielded once it and the blank nodes nested in it are complete."""
+        nodemap = {}
+        emitted = 0
+        for subject in self.subjects:
+            if isinstance(subject, URIRef) or (
+                isinstance(subject, BNode) and subject not in self.referenced
+            ):
+                self.process_subject(subject, nodemap)
+            yield from self.nodes[emitted:]
+            emitted = len(self.nodes)
+
+    def pieces(self) -> Iterator[str]:
+        nodes = self.completed_nodes()
+        if not self.context.active:
+            separator = "[\n  "
+            for node in nodes:
+                yield separator
+                yield _json_text(node, "  ")
+                separator = ",\n  "
+            yield "[]" if separator == "[\n  " else "\n]"
+            return
+        first = next(nodes, None)
+        second = next(nodes, None)
+        if second is None:
+            document = {"@graph": []} if first is None else dict(first)
+            document["@context"] = self.prefixes
+            yield _json_text(document)
+            return
+        context = _json_text(self.prefixes, "  ")
+        yield f'{{\n  "@context": {context},\n  "@graph": [\n    '
+        separator = ""
+        for node in (first, second, *nodes):
+            yield separator
+            yield _json_text(node, "    ")
+            separator = ",\n    "
+        yield "\n  ]\n}"
+
+
+def jsonld_pieces(
+    graph: Graph, namespaces: Optional[Dict[str, str]] = None
+) -> Iterator[str]:
+    """
+    Compact JSON-LD, with a context of the prefixes of namespaces (mapped to their prefixes, by default those bound in
+    prefix_graph) the graph's IRIs are in.
+    """
+    if namespaces is None:
+        namespaces = prefix_namespaces()
+    return _JsonLdWriter(graph, namespaces).pieces()
+
+
+def _serialized(graph: Graph, format: str) -> Iterator[bytes]:
+    yield graph.serialize(format=format, encoding="utf-8")
+
+
+STREAM_WRITERS: Dict[str, Callable[[Graph], Iterator[str]]] = {
+    "nt": ntriples_pieces,
+    "turtle": turtle_pieces,
+    "json-ld": jsonld_pieces,
+}
+
+
+def _native_writer_applies(graph: Graph, format: str) -> bool:
+    """Whether a graph is written by Prez's own writers: they write the triples of a single graph, in the default
+    graph if JSON-LD."""
+    if format not in STREAM_WRITERS or graph.context_aware:
+        return False
+    return format != "json-ld" or not isinstance(graph.identifier, URIRef)
+
+
+def stream_rdf(
+    graph: Graph,
+    format: str,
+    chunk_size: Optional[int] = None,
+    namespaces: Optional[Dict[str, str]] = None,
+) -> Iterator[bytes]:
+    """
+    Serializes a graph as it is iterated over, in chunks of roughly settings.rdf_stream_chunk_size bytes. format is an
+    RDFLib serializer name or an RDF mediatype. N-Triples, Turtle and JSON-LD are written by Prez's own writers,
+    byte for byte as RDFLib serializes them, JSON-LD compacted with the prefixes of namespaces (see jsonld_pieces);
+    other formats, and datasets, are serialized by RDFLib in full, as a single chunk.
+    """
+    format = RDF_SERIALIZER_TYPES_MAP.get(format, format)
+    if not _native_writer_applies(graph, format):
+        return _serialized(graph, format)
+    writer = STREAM_WRITERS[format]
+    if format == "json-ld":
+        writer = partial(writer, namespaces=namespaces)
+    return chunked(writer(graph), chunk_size or settings.rdf_stream_chunk_size)
+
+
+def rdf_content(graph: Graph, format: str) -> AsyncIterator[bytes]:
+    """
+    The content of an RDF response, see stream_rdf. Graphs of at least settings.offload_min_triples triples are
+    serialized in the worker pool, smaller graphs on the event loop. prefix_graph's namespaces are read here, as a
+    worker process has its own, unpopulated, prefix_graph.
+    """
+    namespaces = (
+        prefix_namespaces()
+        if RDF_SERIALIZER_TYPES_MAP.get(format, format) == "json-ld"
+        else None
+    )
+    return iterate_offloaded(
+        len(graph),
+        settings.offload_min_triples,
+        stream_rdf,
+        graph,
+        format,
+        None,
+        namespaces,
+    )
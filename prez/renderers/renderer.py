@@ -1,5 +1,4 @@
-import io
-import json
+import asyncio
 import logging
 from typing import Optional
 
@@ -11,16 +10,35 @@ from rdflib import Graph, URIRef, Namespace, RDF
 from starlette.requests import Request
 from starlette.responses import Response
 
+from prez.config import settings
 from prez.models.profiles_and_mediatypes import ProfilesMediatypesInfo
 from prez.models.profiles_item import ProfileItem
-from prez.renderers.csv_renderer import render_csv_dropdown
-from prez.renderers.json_renderer import render_json_dropdown, NotFoundError
+from prez.queries.spaceprez import get_feature_geometries_query
+from prez.renderers.geojson_renderer import (
+    GEOJSON_CLASSES,
+    GEOJSON_MEDIATYPE,
+    features_without_geometries,
+    render_geojson,
+)
+from prez.renderers.json_renderer import (
+    DROPDOWN_WRITERS,
+    NotFoundError,
+    dropdown_table,
+    render_dropdown,
+)
+from prez.renderers.rdf_stream_renderer import rdf_content
+from prez.services.conditional_requests import (
+    not_modified_response,
+    response_etag,
+)
+from prez.services.connegp_service import get_default_languages
 from prez.services.curie_functions import get_curie_id_for_uri
 from prez.sparql.methods import Repo
 from prez.sparql.objects_listings import (
     generate_item_construct,
     get_annotation_properties,
 )
+from prez.sparql.terms import binding_to_term
 
 log = logging.getLogger(__name__)
 
@@ -32,20 +50,56 @@ async def return_from_graph(
     profile_headers,
     selected_class: URIRef,
     repo: Repo,
+    languages: Optional[tuple] = None,
+    sort_rows: Optional[bool] = None,
 ):
+    """
+    Renders a response graph in the requested mediatype, with an ETag of the graph as it is rendered - annotated for
+    the mediatypes and profiles which annotate it, with its features' geometries for GeoJSON - or answers 304 if the
+    request's If-None-Match header matches it. For the dd profile, sort_rows says whether rows are sorted by IRI,
+    settings.dropdown_sort_rows if None.
+    """
     profile_headers["Content-Disposition"] = "inline"
+    if sort_rows is None:
+        sort_rows = settings.dropdown_sort_rows
+    geojson = str(mediatype) == GEOJSON_MEDIATYPE and selected_class in GEOJSON_CLASSES
+    dropdown = profile == URIRef("https://w3id.org/profile/dd")
+
+    if str(mediatype) not in RDF_MEDIATYPES:
+        if not (geojson or dropdown or "anot+" in mediatype):
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST, f"Unsupported mediatype: {mediatype}."
+            )
+        graph = await return_annotated_rdf(graph, profile, repo, languages)
+        if geojson:
+            graph = await add_feature_geometries(graph, repo)
+
+    profile_headers["ETag"] = await response_etag(
+        graph, profile, mediatype, languages, sort_rows
+    )
+    not_modified = not_modified_response(profile_headers)
+    if not_modified is not None:
+        return not_modified
 
     if str(mediatype) in RDF_MEDIATYPES:
         return await return_rdf(graph, mediatype, profile_headers)
 
-    elif profile == URIRef("https://w3id.org/profile/dd"):
-        graph = await return_annotated_rdf(graph, profile, repo)
+    elif geojson:
+        return StreamingResponse(
+            render_geojson(graph, selected_class),
+            media_type=GEOJSON_MEDIATYPE,
+            headers=profile_headers,
+        )
 
+    elif dropdown:
         try:
-            # TODO: Currently, data is generated in memory, instead of in a streaming manner.
-            #       Not possible to do a streaming response yet since we are reading the RDF
-            #       data into an in-memory graph.
-            jsonld_data = await render_json_dropdown(graph, profile, selected_class)
+            table = dropdown_table(
+                graph,
+                profile,
+                selected_class,
+                sort_rows,
+            )
+            headers = {"ETag": profile_headers["ETag"]}
 
             if str(mediatype) == "text/csv":
                 iri = graph.value(None, RDF.type, selected_class)
@@ -53,86 +107,117 @@ async def return_from_graph(
                     filename = get_curie_id_for_uri(URIRef(str(iri)))
                 else:
                     filename = selected_class.split("#")[-1].split("/")[-1]
-                stream = render_csv_dropdown(jsonld_data["@graph"])
-                response = StreamingResponse(stream, media_type=mediatype)
-                response.headers[
-                    "Content-Disposition"
-                ] = f"attachment;filename={filename}.csv"
-                return response
+                headers["Content-Disposition"] = f"attachment;filename={filename}.csv"
 
-            # application/json
-            stream = io.StringIO(json.dumps(jsonld_data))
-            return StreamingResponse(stream, media_type=mediatype)
+            # application/json, unless NDJSON or CSV
+            writer_mediatype = (
+                str(mediatype)
+                if str(mediatype) in DROPDOWN_WRITERS
+                else "application/json"
+            )
+            return StreamingResponse(
+                render_dropdown(graph, table, writer_mediatype),
+                media_type=mediatype,
+                headers=headers,
+            )
 
         except NotFoundError as err:
             raise HTTPException(status.HTTP_404_NOT_FOUND, str(err))
 
     else:
-        if "anot+" in mediatype:
-            non_anot_mediatype = mediatype.replace("anot+", "")
-            graph = await return_annotated_rdf(graph, profile, repo)
-            content = io.BytesIO(
-                graph.serialize(format=non_anot_mediatype, encoding="utf-8")
-            )
-            return StreamingResponse(
-                content=content, media_type=non_anot_mediatype, headers=profile_headers
-            )
-
-        raise HTTPException(
-            status.HTTP_400_BAD_REQUEST, f"Unsupported mediatype: {mediatype}."
+        non_anot_mediatype = mediatype.replace("anot+", "")
+        return StreamingResponse(
+            content=rdf_content(graph, non_anot_mediatype),
+            media_type=non_anot_mediatype,
+            headers=profile_headers,
         )
 
 
 async def return_rdf(graph, mediatype, profile_headers):
     RDF_SERIALIZER_TYPES_MAP["text/anot+turtle"] = "turtle"
-    obj = io.BytesIO(
-        graph.serialize(
-            format=RDF_SERIALIZER_TYPES_MAP[str(mediatype)], encoding="utf-8"
-        )
-    )
     profile_headers["Content-Disposition"] = "inline"
-    return StreamingResponse(content=obj, media_type=mediatype, headers=profile_headers)
+    return StreamingResponse(
+        content=rdf_content(graph, RDF_SERIALIZER_TYPES_MAP[str(mediatype)]),
+        media_type=mediatype,
+        headers=profile_headers,
+    )
+
 
+async def get_annotations_graph(terms, cache, repo, languages) -> list:
+    queries_for_uncached, annotations, uncached_terms = await get_annotation_properties(
+        terms, languages
+    )
 
-async def get_annotations_graph(graph, cache, repo):
-    queries_for_uncached, annotations_graph = await get_annotation_properties(graph)
+    if queries_for_uncached:
+        anots_from_triplestore = await fetch_annotations(queries_for_uncached, repo)
+        # terms with nothing returned are cached as negative entries, so they are not queried again until they expire
+        cache.add_fetched(uncached_terms, anots_from_triplestore, languages)
+        annotations.extend(cache.select_best_labels(anots_from_triplestore, languages))
 
-    if queries_for_uncached is None:
-        anots_from_triplestore = Graph()
-    else:
-        anots_from_triplestore, _ = await repo.send_queries([queries_for_uncached], [])
+    return annotations
+
+
+async def fetch_annotations(queries, repo) -> list:
+    """
+    Sends annotation queries concurrently, at most settings.annotation_query_concurrency at a time, and returns the
+    (term, predicate, value) triples from their results.
+    """
+    semaphore = asyncio.Semaphore(settings.annotation_query_concurrency)
 
-    if len(anots_from_triplestore) > 1:
-        annotations_graph += anots_from_triplestore
-        cache += anots_from_triplestore
+    async def bounded_query(query):
+        async with semaphore:
+            return await repo.tabular_query_to_table(query)
 
-    return annotations_graph
+    results = await asyncio.gather(*[bounded_query(query) for query in queries])
+    return [
+        (
+            binding_to_term(row["term"]),
+            binding_to_term(row["prop"]),
+            binding_to_term(row["value"]),
+        )
+        for _, rows in results
+        for row in rows
+    ]
+
+
+def _uriref_terms(triples) -> set:
+    return {term for triple in triples for term in triple if isinstance(term, URIRef)}
 
 
 async def return_annotated_rdf(
     graph: Graph,
     profile,
     repo,
+    languages: Optional[tuple] = None,
 ) -> Graph:
     from prez.cache import tbox_cache
 
-    cache = tbox_cache
-    queries_for_uncached, annotations_graph = await get_annotation_properties(graph)
-    anots_from_triplestore, _ = await repo.send_queries([queries_for_uncached], [])
-    if len(anots_from_triplestore) > 0:
-        annotations_graph += anots_from_triplestore
-        cache += anots_from_triplestore
+    languages = languages or get_default_languages()
+    # Expand the graph with annotations until no new terms are introduced. Each pass only looks up the terms introduced
+    # by the previous pass, so terms already annotated, or known to have no annotations, are not queried again.
+    seen_terms = set()
+    frontier = _uriref_terms(graph)
+    while frontier:
+        seen_terms |= frontier
+        annotations = await get_annotations_graph(frontier, tbox_cache, repo, languages)
+        graph.addN((s, p, o, graph) for s, p, o in annotations)
+        frontier = _uriref_terms(annotations) - seen_terms
 
-    previous_triples_count = len(graph)
+    graph.bind("prez", "https://prez.dev/")
+    return graph
 
-    # Expand the graph with annotations specified in the profile until no new statements are added.
-    while True:
-        graph += await get_annotations_graph(graph, cache, repo)
-        if len(graph) == previous_triples_count:
-            break
-        previous_triples_count = len(graph)
 
-    graph.bind("prez", "https://prez.dev/")
+async def add_feature_geometries(graph: Graph, repo: Repo) -> Graph:
+    """
+    Adds the geometries of the member features of a collection or listing graph, which listings do not include, in one
+    query for all of the features without a geometry in the graph.
+    """
+    features = features_without_geometries(graph)
+    if features:
+        geometries_graph, _ = await repo.send_queries(
+            [get_feature_geometries_query(features)], []
+        )
+        graph += geometries_graph
     return graph
 
 
@@ -167,4 +252,6 @@ async def return_profiles(
         prof_and_mt_info.profile_headers,
         prof_and_mt_info.selected_class,
         repo,
+        prof_and_mt_info.languages,
+        prof_and_mt_info.sort_rows,
     )
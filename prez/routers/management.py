@@ -1,19 +1,30 @@
 import logging
+from typing import List
 
 from connegp import RDF_MEDIATYPES
-from fastapi import APIRouter
+from fastapi import APIRouter, BackgroundTasks, Depends, Query
 from rdflib import BNode
 from rdflib import Graph, URIRef, Literal
 from rdflib.collection import Collection
 from starlette.requests import Request
-from starlette.responses import PlainTextResponse
+from starlette.responses import PlainTextResponse, JSONResponse
 
 from prez.cache import endpoints_graph_cache
-from prez.cache import tbox_cache
+from prez.cache import links_ids_graph_cache, links_store
+from prez.cache import tbox_cache, validator_cache
 from prez.config import settings
+from prez.dependencies import get_repo
 from prez.reference_data.prez_ns import PREZ
+from prez.renderers.rdf_stream_renderer import rdf_term_cache_stats
 from prez.renderers.renderer import return_rdf
 from prez.services.app_service import add_common_context_ontologies_to_tbox_cache
+from prez.services.conditional_requests import conditional_request_stats
+from prez.services.event_loop_lag import event_loop_lag
+from prez.services.link_materialization import materialize_links
+from prez.services.response_cache import response_cache
+from prez.services.system_reload import reload_system_definitions
+from prez.services.worker_pool import worker_pool_stats
+from prez.sparql.methods import Repo
 
 router = APIRouter(tags=["Management"])
 log = logging.getLogger(__name__)
@@ -36,18 +47,86 @@ async def index():
 async def purge_tbox_cache():
     """Purges the tbox cache, then re-adds annotations from common ontologies Prez has a copy of
     (reference_data/context_ontologies)."""
-    tbox_cache.remove((None, None, None))
+    tbox_cache.clear()
     await add_common_context_ontologies_to_tbox_cache()
     return PlainTextResponse("Tbox cache purged and reset to startup state")
 
 
+@router.get("/purge-links-cache", summary="Reset Links Cache")
+async def purge_links_cache():
+    """Purges the cache of internal links and identifiers generated for objects. Links are regenerated on demand."""
+    links_ids_graph_cache.clear()
+    return PlainTextResponse("Links cache purged")
+
+
+@router.get("/purge-response-cache", summary="Purge Cached Responses")
+async def purge_response_cache(tag: List[str] = Query(None)):
+    """Purges cached responses. If one or more tags are given - a path such as /s/datasets/{dataset_curie}, which
+    purges every response under it, a surrogate key (a route's endpoint IRI, or an object's CURIE), or the IRI of an
+    object - only the responses with those tags are purged, otherwise all of them. The cached validators of conditional
+    requests, which are not tagged, are all purged."""
+    validator_cache.clear()
+    if not tag:
+        response_cache.clear()
+        return PlainTextResponse("Response cache purged")
+    count = await response_cache.purge(tag)
+    return PlainTextResponse(f"Purged {count} cached responses")
+
+
+@router.get("/materialize-links", summary="Materialize Links")
+async def materialize_links_route(
+    background_tasks: BackgroundTasks,
+    iri: List[str] = Query(None),
+    repo: Repo = Depends(get_repo),
+):
+    """Precomputes internal links and identifiers. If one or more IRIs are given, only the links for those objects are
+    refreshed, otherwise links are materialized for every object delivered by an object endpoint, in the
+    background."""
+    if iri:
+        count = await materialize_links(repo, iri)
+        return PlainTextResponse(f"Materialized links refreshed for {count} objects")
+    background_tasks.add_task(materialize_links, repo)
+    return PlainTextResponse("Link materialization started")
+
+
+@router.get("/reload", summary="Reload System Definitions")
+async def reload_system_definitions_route(
+    force: bool = False,
+    repo: Repo = Depends(get_repo),
+):
+    """Reloads the profiles, endpoint definitions and search methods if they have changed in the triplestore, or if
+    force is set, and invalidates the caches derived from them."""
+    reloaded = await reload_system_definitions(repo, force)
+    if not reloaded:
+        return PlainTextResponse("System definitions unchanged")
+    return PlainTextResponse(f"Reloaded system definitions: {', '.join(reloaded)}")
+
+
+@router.get("/cache-stats", summary="Show cache statistics")
+async def return_cache_stats():
+    """Returns the size, limits, hit, miss and eviction counts of Prez's bounded caches, including the response cache
+    and its disk tier, how many conditional requests were answered 304, how much work has been offloaded to the worker pool, and the event loop's lag."""
+    return JSONResponse(
+        {
+            "links_cache": links_ids_graph_cache.stats(),
+            "materialized_links": {"triples": len(links_store)},
+            "tbox_cache": tbox_cache.stats(),
+            "rdf_term_cache": rdf_term_cache_stats(),
+            "validator_cache": conditional_request_stats(),
+            "response_cache": response_cache.stats(),
+            "worker_pool": worker_pool_stats(),
+            "event_loop": event_loop_lag.stats(),
+        }
+    )
+
+
 @router.get("/tbox-cache", summary="Show the Tbox Cache")
 async def return_tbox_cache(request: Request):
     """gets the mediatype from the request and returns the tbox cache in this mediatype"""
     mediatype = request.headers.get("Accept").split(",")[0]
     if not mediatype or mediatype not in RDF_MEDIATYPES:
         mediatype = "text/turtle"
-    return await return_rdf(tbox_cache, mediatype, profile_headers={})
+    return await return_rdf(tbox_cache.to_graph(), mediatype, profile_headers={})
 
 
 async def return_annotation_predicates():
@@ -91,6 +91,8 @@ async def search(
         profile_headers=prof_and_mt_info.profile_headers,
         selected_class=prof_and_mt_info.selected_class,
         repo=repo,
+        languages=prof_and_mt_info.languages,
+        sort_rows=prof_and_mt_info.sort_rows,
     )
 
 
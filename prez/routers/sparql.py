@@ -1,5 +1,3 @@
-import io
-
 from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse, Response
 from rdflib import Namespace, Graph
@@ -10,6 +8,7 @@ from starlette.responses import StreamingResponse
 
 from prez.dependencies import get_repo
 from prez.models.profiles_and_mediatypes import ProfilesMediatypesInfo
+from prez.renderers.rdf_stream_renderer import rdf_content
 from prez.renderers.renderer import return_annotated_rdf
 from prez.sparql.methods import Repo
 
@@ -44,11 +43,8 @@ async def sparql_endpoint(
         g = Graph()
         g.parse(data=response.text, format=non_anot_mediatype)
         graph = await return_annotated_rdf(g, prof_and_mt_info.profile)
-        content = io.BytesIO(
-            graph.serialize(format=non_anot_mediatype, encoding="utf-8")
-        )
         return StreamingResponse(
-            content=content,
+            content=rdf_content(graph, non_anot_mediatype),
             media_type=non_anot_mediatype,
             headers=prof_and_mt_info.profile_headers,
         )
@@ -58,8 +54,7 @@ async def sparql_endpoint(
             return JSONResponse(content=query_result)
         elif isinstance(query_result, Graph):
             return Response(
-                content=query_result.serialize(format="text/turtle"),
-                status_code=200
+                content=query_result.serialize(format="text/turtle"), status_code=200
             )
         else:
             return StreamingResponse(
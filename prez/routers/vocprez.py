@@ -23,6 +23,11 @@ from prez.services.objects import object_function
 from prez.services.listings import listing_function
 from prez.services.link_generation import _add_prez_links
 from prez.services.curie_functions import get_curie_id_for_uri
+from prez.services.response_cache import (
+    cached_response,
+    negotiated_cache_key,
+    response_tags,
+)
 from prez.sparql.methods import Repo
 from prez.sparql.resource import get_resource
 
@@ -132,17 +137,27 @@ async def concept_scheme_route(
         )
 
     iri = get_iri_route(concept_scheme_curie)
-    resource = await get_resource(iri, repo)
-    bnode_depth = get_bnode_depth(iri, resource)
-    concept_scheme_query = get_concept_scheme_query(iri, bnode_depth)
-    item_graph, _ = await repo.send_queries([concept_scheme_query], [])
-    return await return_from_graph(
-        item_graph,
-        profiles_mediatypes_info.mediatype,
-        profiles_mediatypes_info.profile,
-        profiles_mediatypes_info.profile_headers,
-        profiles_mediatypes_info.selected_class,
-        repo,
+
+    async def render():
+        resource = await get_resource(iri, repo)
+        bnode_depth = get_bnode_depth(iri, resource)
+        concept_scheme_query = get_concept_scheme_query(iri, bnode_depth)
+        item_graph, _ = await repo.send_queries([concept_scheme_query], [])
+        return await return_from_graph(
+            item_graph,
+            profiles_mediatypes_info.mediatype,
+            profiles_mediatypes_info.profile,
+            profiles_mediatypes_info.profile_headers,
+            profiles_mediatypes_info.selected_class,
+            repo,
+            profiles_mediatypes_info.languages,
+            profiles_mediatypes_info.sort_rows,
+        )
+
+    return await cached_response(
+        negotiated_cache_key(request, profiles_mediatypes_info),
+        render,
+        response_tags(request, str(iri)),
     )
 
 
@@ -173,23 +188,33 @@ async def concept_scheme_top_concepts_route(
     )
 
     iri = get_iri_route(concept_scheme_curie)
-    concept_scheme_top_concepts_query = get_concept_scheme_top_concepts_query(
-        iri, page, per_page
-    )
 
-    graph, _ = await repo.send_queries([concept_scheme_top_concepts_query], [])
-    for concept in graph.objects(iri, SKOS.hasTopConcept):
-        if isinstance(concept, URIRef):
-            concept_curie = get_curie_id_for_uri(concept)
-    if "anot+" in profiles_mediatypes_info.mediatype:
-        await _add_prez_links(graph, repo, system_repo)
-    return await return_from_graph(
-        graph,
-        profiles_mediatypes_info.mediatype,
-        profiles_mediatypes_info.profile,
-        profiles_mediatypes_info.profile_headers,
-        profiles_mediatypes_info.selected_class,
-        repo,
+    async def render():
+        concept_scheme_top_concepts_query = get_concept_scheme_top_concepts_query(
+            iri, page, per_page
+        )
+
+        graph, _ = await repo.send_queries([concept_scheme_top_concepts_query], [])
+        for concept in graph.objects(iri, SKOS.hasTopConcept):
+            if isinstance(concept, URIRef):
+                concept_curie = get_curie_id_for_uri(concept)
+        if "anot+" in profiles_mediatypes_info.mediatype:
+            await _add_prez_links(graph, repo, system_repo)
+        return await return_from_graph(
+            graph,
+            profiles_mediatypes_info.mediatype,
+            profiles_mediatypes_info.profile,
+            profiles_mediatypes_info.profile_headers,
+            profiles_mediatypes_info.selected_class,
+            repo,
+            profiles_mediatypes_info.languages,
+            profiles_mediatypes_info.sort_rows,
+        )
+
+    return await cached_response(
+        negotiated_cache_key(request, profiles_mediatypes_info),
+        render,
+        response_tags(request, str(iri)),
     )
 
 
@@ -221,18 +246,28 @@ async def concept_narrowers_route(
     )
 
     iri = get_iri_route(concept_curie)
-    concept_narrowers_query = get_concept_narrowers_query(iri, page, per_page)
-
-    graph, _ = await repo.send_queries([concept_narrowers_query], [])
-    if "anot+" in profiles_mediatypes_info.mediatype:
-        await _add_prez_links(graph, repo, system_repo)
-    return await return_from_graph(
-        graph,
-        profiles_mediatypes_info.mediatype,
-        profiles_mediatypes_info.profile,
-        profiles_mediatypes_info.profile_headers,
-        profiles_mediatypes_info.selected_class,
-        repo,
+
+    async def render():
+        concept_narrowers_query = get_concept_narrowers_query(iri, page, per_page)
+
+        graph, _ = await repo.send_queries([concept_narrowers_query], [])
+        if "anot+" in profiles_mediatypes_info.mediatype:
+            await _add_prez_links(graph, repo, system_repo)
+        return await return_from_graph(
+            graph,
+            profiles_mediatypes_info.mediatype,
+            profiles_mediatypes_info.profile,
+            profiles_mediatypes_info.profile_headers,
+            profiles_mediatypes_info.selected_class,
+            repo,
+            profiles_mediatypes_info.languages,
+            profiles_mediatypes_info.sort_rows,
+        )
+
+    return await cached_response(
+        negotiated_cache_key(request, profiles_mediatypes_info),
+        render,
+        response_tags(request, str(iri)),
     )
 
 
@@ -0,0 +1,277 @@
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rdflib import Graph, URIRef
+from rdflib.term import Node
+
+from prez.config import settings
+from prez.services.bounded_cache import BoundedLRUCache
+
+ANNOTATION_CATEGORIES = ("labels", "descriptions", "provenance", "other")
+
+
+def annotation_predicate_categories() -> Dict[URIRef, str]:
+    """Maps each annotation predicate configured in the settings to its annotation category."""
+    categories = {}
+    for category, predicates in zip(
+        ANNOTATION_CATEGORIES,
+        (
+            settings.label_predicates,
+            settings.description_predicates,
+            settings.provenance_predicates,
+            settings.other_predicates,
+        ),
+    ):
+        for predicate in predicates:
+            categories.setdefault(URIRef(predicate), category)
+    return categories
+
+
+def language_rank(value: Node, languages: Tuple[str, ...]) -> Optional[int]:
+    """
+    Ranks a label by the position of the first language range it matches, most preferred first. A range matches the
+    label's language tag if it is equal to it or a prefix of it ("en" matches "en-AU"), or if the tag is a prefix of
+    the range ("en-AU" falls back to "en"). Labels without a language tag rank after all ranges, and labels in
+    languages that match no range are not ranked (None).
+    """
+    language = getattr(value, "language", None)
+    if not language:
+        return len(languages)
+    language = language.lower()
+    for rank, language_range in enumerate(languages):
+        if (
+            language_range == "*"
+            or language == language_range
+            or language.startswith(language_range + "-")
+            or language_range.startswith(language + "-")
+        ):
+            return rank
+    return None
+
+
+def best_labels(
+    values: Iterable[Tuple[URIRef, Node]], languages: Tuple[str, ...]
+) -> List[Tuple[URIRef, Node]]:
+    """Selects the best matching label for each label predicate."""
+    best = {}
+    for predicate, value in values:
+        rank = language_rank(value, languages)
+        if rank is not None and (predicate not in best or rank < best[predicate][0]):
+            best[predicate] = (rank, value)
+    return [(predicate, value) for predicate, (_, value) in best.items()]
+
+
+def category_key(category: str, languages: Tuple[str, ...]) -> str:
+    """Fetched labels are cached per language preference list, other annotations are cached for all languages."""
+    if category == "labels":
+        return f"labels@{','.join(languages)}"
+    return category
+
+
+class FetchedAnnotations:
+    """
+    The annotations fetched from the triplestore for one term, and the annotation categories the triplestore was
+    found to have no annotations of, with the (monotonic) time until which that negative result is trusted. Labels are
+    held per language preference list, see category_key.
+    """
+
+    __slots__ = ("annotations", "absent_until")
+
+    def __init__(self):
+        self.annotations: Dict[str, List[Tuple[URIRef, Node]]] = {}
+        self.absent_until: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return sum(len(values) for values in self.annotations.values())
+
+
+def estimate_fetched_annotations_size(entry: FetchedAnnotations) -> int:
+    size = sys.getsizeof(entry) + sys.getsizeof(entry.absent_until)
+    size += sys.getsizeof(entry.annotations)
+    for values in entry.annotations.values():
+        size += sys.getsizeof(values)
+        size += sum(
+            sys.getsizeof(pair) + sys.getsizeof(pair[0]) + sys.getsizeof(pair[1])
+            for pair in values
+        )
+    return size
+
+
+class AnnotationIndex:
+    """
+    An index of annotations (labels, descriptions, provenance and other annotation properties) for RDF terms, of the
+    form term -> annotation category -> (predicate, literal) pairs. Literals keep their language tags.
+
+    The index has two tiers:
+    - a pinned tier, which is never evicted, for annotations from the context ontologies (see add / add_triples).
+    - a bounded LRU tier for annotations fetched from the triplestore (see add_fetched). This tier also holds negative
+    entries - annotation categories a term was found not to have - which expire after negative_ttl seconds so that
+    terms without labels are not queried for on every request.
+
+    Lookups take the request's language preferences, and return only the best matching label for each label
+    predicate. Labels from the context ontologies in any matching language satisfy a lookup; fetched labels are cached
+    per language preference list, as the triplestore is only queried for labels in the requested languages.
+
+    Triples whose predicate is not one of the configured annotation predicates are not indexed.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, negative_ttl: float):
+        self._pinned: Dict[Node, Dict[str, List[Tuple[URIRef, Node]]]] = {}
+        self._pinned_triple_count = 0
+        self._fetched = BoundedLRUCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            sizeof=estimate_fetched_annotations_size,
+        )
+        self.negative_ttl = negative_ttl
+        self.negative_hits = 0
+        self.predicate_categories = annotation_predicate_categories()
+
+    def add(self, triple: Tuple[Node, Node, Node]):
+        """Adds an annotation triple to the pinned tier."""
+        term, predicate, value = triple
+        category = self.predicate_categories.get(predicate)
+        if category is None:
+            return
+        values = self._pinned.setdefault(term, {}).setdefault(category, [])
+        if (predicate, value) not in values:
+            values.append((predicate, value))
+            self._pinned_triple_count += 1
+
+    def add_triples(self, triples: Iterable[Tuple[Node, Node, Node]]):
+        for triple in triples:
+            self.add(triple)
+
+    def __iadd__(self, triples: Iterable[Tuple[Node, Node, Node]]):
+        self.add_triples(triples)
+        return self
+
+    def add_fetched(
+        self,
+        queried: Dict[str, List[Node]],
+        triples: Iterable[Tuple[Node, Node, Node]],
+        languages: Tuple[str, ...],
+    ):
+        """
+        Adds annotation triples fetched from the triplestore, for the given language preferences, to the LRU tier.
+        queried maps each annotation category to the terms it was queried for; a negative entry is recorded for each
+        of these for which nothing was returned.
+        """
+        entries: Dict[Node, FetchedAnnotations] = {}
+
+        def entry_for(term):
+            if term not in entries:
+                entries[term] = self._fetched.pop(term) or FetchedAnnotations()
+            return entries[term]
+
+        for term, predicate, value in triples:
+            category = self.predicate_categories.get(predicate)
+            if category is None:
+                continue
+            key = category_key(category, languages)
+            entry = entry_for(term)
+            values = entry.annotations.setdefault(key, [])
+            if (predicate, value) not in values:
+                values.append((predicate, value))
+            entry.absent_until.pop(key, None)
+
+        absent_until = time.monotonic() + self.negative_ttl
+        for category, terms in queried.items():
+            key = category_key(category, languages)
+            for term in terms:
+                entry = entry_for(term)
+                if not entry.annotations.get(key):
+                    entry.absent_until[key] = absent_until
+
+        for term, entry in entries.items():
+            self._fetched.set(term, entry)
+
+    def select_best_labels(
+        self, triples: Iterable[Tuple[Node, Node, Node]], languages: Tuple[str, ...]
+    ) -> List[Tuple[Node, Node, Node]]:
+        """Filters annotation triples to the best matching label for each term and label predicate."""
+        selected = []
+        labels: Dict[Node, List[Tuple[URIRef, Node]]] = {}
+        for term, predicate, value in triples:
+            if self.predicate_categories.get(predicate) == "labels":
+                labels.setdefault(term, []).append((predicate, value))
+            else:
+                selected.append((term, predicate, value))
+        for term, values in labels.items():
+            selected.extend(
+                (term, predicate, value)
+                for predicate, value in best_labels(values, languages)
+            )
+        return selected
+
+    def get_annotations(
+        self, terms: Iterable[Node], languages: Tuple[str, ...]
+    ) -> Tuple[List[Tuple[Node, Node, Node]], Dict[str, List[Node]]]:
+        """
+        Gets the annotations for all the given terms in one pass, selecting the best matching label for the language
+        preferences. Returns the annotation triples found, and for each annotation category the terms which have no
+        annotations of that category in the index, and no unexpired negative entry.
+        """
+        now = time.monotonic()
+        triples = []
+        missing = {category: [] for category in ANNOTATION_CATEGORIES}
+        for term in terms:
+            pinned = self._pinned.get(term, {})
+            fetched = self._fetched.get(term)
+            for category in ANNOTATION_CATEGORIES:
+                key = category_key(category, languages)
+                values = pinned.get(category)
+                if fetched is not None and fetched.annotations.get(key):
+                    values = (values or []) + fetched.annotations[key]
+                if values and category == "labels":
+                    values = best_labels(values, languages)
+                if values:
+                    triples.extend(
+                        (term, predicate, value) for predicate, value in values
+                    )
+                elif fetched is not None and fetched.absent_until.get(key, 0) > now:
+                    self.negative_hits += 1
+                else:
+                    missing[category].append(term)
+        return triples, missing
+
+    def triples(self):
+        for term, term_annotations in self._pinned.items():
+            for values in term_annotations.values():
+                for predicate, value in values:
+                    yield term, predicate, value
+        for term in list(self._fetched.keys()):
+            for values in self._fetched.peek(term).annotations.values():
+                for predicate, value in values:
+                    yield term, predicate, value
+
+    def to_graph(self, graph: Optional[Graph] = None) -> Graph:
+        graph = Graph() if graph is None else graph
+        graph.addN((s, p, o, graph) for s, p, o in self.triples())
+        return graph
+
+    def clear(self):
+        """Clears both tiers."""
+        self._pinned.clear()
+        self._pinned_triple_count = 0
+        self._fetched.clear()
+        self.predicate_categories = annotation_predicate_categories()
+
+    def __contains__(self, term: Node) -> bool:
+        return term in self._pinned or term in self._fetched
+
+    def __len__(self) -> int:
+        return self._pinned_triple_count + sum(
+            len(self._fetched.peek(term)) for term in self._fetched.keys()
+        )
+
+    def stats(self) -> dict:
+        return {
+            "pinned": {
+                "terms": len(self._pinned),
+                "triples": self._pinned_triple_count,
+            },
+            "fetched": self._fetched.stats(),
+            "negative_hits": self.negative_hits,
+        }
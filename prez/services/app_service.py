@@ -16,6 +16,7 @@ from prez.cache import (
 from prez.config import settings
 from prez.reference_data.prez_ns import PREZ, ALTREXT
 from prez.services.curie_functions import get_curie_id_for_uri
+from prez.services.system_indexes import rebuild_system_indexes
 from prez.sparql.methods import Repo
 from prez.sparql.objects_listings import startup_count_objects
 
@@ -59,6 +60,10 @@ async def count_objects(repo):
 
 
 async def populate_api_info():
+    add_api_info()
+
+
+def add_api_info():
     for prez in settings.prez_flavours:
         bnode = BNode()
         prez_system_graph.add(
@@ -136,6 +141,13 @@ async def add_prefixes_to_prefix_graph(repo: Repo):
 
 
 async def create_endpoints_graph(repo) -> Graph:
+    build_endpoints_graph(
+        await get_remote_endpoint_definitions(repo), endpoints_graph_cache
+    )
+    rebuild_system_indexes()
+
+
+def load_local_endpoints(graph: Graph):
     flavours = ["CatPrez", "SpacePrez", "VocPrez"]
     added_anything = False
     for f in (Path(__file__).parent.parent / "reference_data/endpoints").glob("*.ttl"):
@@ -148,16 +160,26 @@ async def create_endpoints_graph(repo) -> Graph:
         if not matching_flavour or (
             matching_flavour and matching_flavour in settings.prez_flavours
         ):
-            endpoints_graph_cache.parse(f)
+            graph.parse(f)
             added_anything = True
     if added_anything:
         log.info("Local endpoint definitions loaded")
     else:
         log.info("No local endpoint definitions found")
-    await get_remote_endpoint_definitions(repo)
 
 
-async def get_remote_endpoint_definitions(repo):
+def build_endpoints_graph(remote_endpoints: Graph, graph: Graph) -> Graph:
+    """Adds the local endpoint definitions and the endpoint definitions from the triplestore to a graph."""
+    load_local_endpoints(graph)
+    if len(remote_endpoints) > 0:
+        graph.__iadd__(remote_endpoints)
+        log.info(f"Remote endpoint definition(s) found and added")
+    else:
+        log.info("No remote endpoint definitions found")
+    return graph
+
+
+async def get_remote_endpoint_definitions(repo) -> Graph:
     remote_endpoints_query = f"""
 PREFIX ont: <https://prez.dev/ont/>
 CONSTRUCT {{
@@ -169,11 +191,7 @@ WHERE {{
 }}
     """
     g, _ = await repo.send_queries([remote_endpoints_query], [])
-    if len(g) > 0:
-        endpoints_graph_cache.__iadd__(g)
-        log.info(f"Remote endpoint definition(s) found and added")
-    else:
-        log.info("No remote endpoint definitions found")
+    return g
 
 
 async def add_common_context_ontologies_to_tbox_cache():
@@ -0,0 +1,99 @@
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+
+def estimate_triples_size(triples: Iterable[tuple]) -> int:
+    """
+    Estimates the memory used by a tuple of RDF triples, counting the tuples themselves and the string data of each
+    term. Terms shared between entries are counted once per entry, so this is an upper bound.
+    """
+    size = sys.getsizeof(triples)
+    for triple in triples:
+        size += sys.getsizeof(triple)
+        size += sum(sys.getsizeof(term) for term in triple)
+    return size
+
+
+class BoundedLRUCache:
+    """
+    A least recently used cache bounded by both a maximum number of entries and a maximum (estimated) number of bytes.
+    The least recently used entries are evicted first when either limit is exceeded. Hits, misses and evictions are
+    counted so the effectiveness of the cache can be monitored.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        sizeof: Callable[[Any], int] = sys.getsizeof,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def peek(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Gets an entry without counting a hit or miss, or marking it as recently used."""
+        entry = self._entries.get(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        size = self.sizeof(value)
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            # never cache an entry which would evict everything else
+            return
+        self._entries[key] = (value, size)
+        self.current_bytes += size
+        while (
+            len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes
+        ):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        self.current_bytes -= entry[1]
+        return entry[0]
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def keys(self):
+        return self._entries.keys()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,125 @@
+import logging
+from typing import List, Optional
+from urllib.parse import parse_qsl
+
+from rdflib import RDF, URIRef
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from prez.cache import endpoints_graph_cache
+from prez.config import settings
+from prez.reference_data.prez_ns import ONT
+from prez.services.compression import add_vary
+from prez.services.curie_functions import get_curie_id_for_uri
+
+log = logging.getLogger(__name__)
+
+# the request headers Prez negotiates a representation from, so which shared caches must key responses by
+NEGOTIATED_HEADERS = ("Accept", "Accept-Profile", "Accept-Language")
+
+# endpoint classes, most specific first, of the routes defined as an ont:Endpoint
+ENDPOINT_CLASSES = (ONT.ObjectEndpoint, ONT.ListingEndpoint, ONT.Endpoint)
+
+# routes which negotiate like an endpoint of a class, but are not defined as one
+ROUTE_ENDPOINT_CLASSES = {
+    "https://prez.dev/endpoint/object": ONT.ObjectEndpoint,
+    "concept_scheme_top_concepts_route": ONT.ListingEndpoint,
+    "concept_narrowers_route": ONT.ListingEndpoint,
+}
+
+# statuses whose responses are given a cache policy: those shared caches store, and the 304s revalidating them
+CACHEABLE_STATUSES = (200, 203, 304)
+
+
+def endpoint_class(route) -> Optional[URIRef]:
+    """The most specific ont:Endpoint class of a route, by its name, if it is defined as an endpoint."""
+    if route.name in ROUTE_ENDPOINT_CLASSES:
+        return ROUTE_ENDPOINT_CLASSES[route.name]
+    if "://" not in route.name:
+        # named after its function rather than an endpoint IRI
+        return None
+    classes = set(endpoints_graph_cache.objects(URIRef(route.name), RDF.type))
+    for klass in ENDPOINT_CLASSES:
+        if klass in classes:
+            return klass
+    return None
+
+
+def route_cache_control(route) -> Optional[str]:
+    """
+    The Cache-Control header of a route's responses, from settings.cache_control_policies: by the local name of its
+    endpoint class, or, for routes which are not endpoints, by the last of its OpenAPI tags with a policy, as a route's
+    own tags follow its router's.
+    """
+    policies = settings.cache_control_policies
+    klass = endpoint_class(route)
+    if klass is not None:
+        return policies.get(str(klass).split("/")[-1])
+    for tag in reversed(getattr(route, "tags", None) or ()):
+        if tag in policies:
+            return policies[tag]
+    return None
+
+
+def surrogate_keys(scope: Scope) -> List[str]:
+    """
+    The surrogate keys of a response: the route's endpoint IRI, and the CURIEs of the focus object and its parents in
+    the path - so purging a dataset's CURIE purges its page, and every listing and object page under it. The /object
+    endpoint's focus is the CURIE of its uri query parameter.
+    """
+    route = scope.get("route")
+    keys = [route.name] if route is not None else []
+    for name, value in scope.get("path_params", {}).items():
+        if name.endswith("_curie"):
+            keys.append(value)
+    if route is not None and route.name == "https://prez.dev/endpoint/object":
+        query = parse_qsl(scope.get("query_string", b"").decode("latin-1"))
+        uri = dict(query).get("uri")
+        if uri:
+            try:
+                keys.append(get_curie_id_for_uri(URIRef(uri)))
+            except Exception:
+                log.debug(f"No CURIE for surrogate key of {uri}")
+    return list(dict.fromkeys(key for key in keys if key and " " not in key))
+
+
+class CachePolicyMiddleware:
+    """
+    Sets the Cache-Control header of cacheable responses by the policy for their route (see route_cache_control), so a
+    CDN can cache them: long for profiles and other system data, short for listings, not at all for search and the
+    SPARQL proxy. Responses of routes which negotiate their representation Vary by the headers they negotiate from,
+    and cacheable responses carry a Surrogate-Key header (see surrogate_keys) for purging them. A Cache-Control header
+    a route sets itself is kept.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_policy(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                if route is not None and message["status"] in CACHEABLE_STATUSES:
+                    _apply_policy(scope, route, MutableHeaders(raw=message["headers"]))
+            await send(message)
+
+        await self.app(scope, receive, send_with_policy)
+
+
+def _apply_policy(scope: Scope, route, headers: MutableHeaders):
+    cache_control = route_cache_control(route)
+    if cache_control is None:
+        return
+    if "cache-control" not in headers:
+        headers["Cache-Control"] = cache_control
+    if "no-store" in headers["cache-control"]:
+        return
+    if endpoint_class(route) is not None:
+        add_vary(headers, *NEGOTIATED_HEADERS)
+    keys = surrogate_keys(scope)
+    if keys:
+        headers["Surrogate-Key"] = " ".join(keys)
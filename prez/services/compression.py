@@ -0,0 +1,287 @@
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from prez.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional, installed with the compression extra
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional, installed with the compression extra
+    zstandard = None
+
+# levels which compress RDF well at a cost per chunk small enough for responses compressed as they are sent
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+# compressible media types which are not text/*, or JSON or XML by their suffix
+COMPRESSIBLE_MEDIATYPES = {
+    "application/n-triples",
+    "application/n-quads",
+    "application/trig",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/sparql-query",
+    "image/svg+xml",
+}
+
+
+class _GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# content codings Prez can compress with; brotli and zstd only if their optional packages are installed
+ENCODERS = {"gzip": _GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = _BrotliEncoder
+if zstandard is not None:
+    ENCODERS["zstd"] = _ZstdEncoder
+
+
+def available_encodings() -> List[str]:
+    """The content codings of settings.compression_encodings which can be used, most preferred first."""
+    return [
+        encoding for encoding in settings.compression_encodings if encoding in ENCODERS
+    ]
+
+
+def negotiate_encoding(
+    accept_encoding: Optional[str], encodings: Iterable[str]
+) -> Optional[str]:
+    """
+    Return the content coding a response is sent in: the encoding, of those available, with the highest quality value
+    in an Accept-Encoding header, the first available on a tie. None means the response is sent uncompressed, as it is
+    when no encoding is acceptable, or the identity coding is preferred.
+    """
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    if qualities.get("identity", 0.0) > best_quality:
+        return None
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compresses a whole body in a content coding."""
+    encoder = ENCODERS[encoding]()
+    return encoder.compress(body) + encoder.finish()
+
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    """
+    Compresses a body in each available encoding, for a PrecompressedResponse. Bodies smaller than
+    settings.compression_minimum_size, which are sent uncompressed, have no variants.
+    """
+    if len(body) < settings.compression_minimum_size:
+        return {}
+    return {encoding: compress(body, encoding) for encoding in available_encodings()}
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """The entity tag of a representation compressed in a content coding, which differs from the uncompressed one's."""
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def add_vary(headers: MutableHeaders, *names: str):
+    """Adds names to a Vary header which does not already list them."""
+    existing = [name.strip() for name in headers.get("vary", "").split(",")]
+    existing = [name for name in existing if name]
+    listed = {name.lower() for name in existing}
+    added = [name for name in names if name.lower() not in listed]
+    if added:
+        headers["Vary"] = ", ".join([*existing, *added])
+
+
+def is_compressible(headers: Headers) -> bool:
+    mediatype = headers.get("content-type", "").split(";")[0].strip().lower()
+    return (
+        mediatype.startswith("text/")
+        or mediatype.endswith(("json", "xml"))
+        or mediatype in COMPRESSIBLE_MEDIATYPES
+    )
+
+
+class PrecompressedResponse(Response):
+    """
+    A response held both uncompressed and compressed in each of its variants' encodings, such as one from a cache, so
+    that it is sent without being compressed again. See compress_variants. CompressionMiddleware does not compress
+    responses sent in a variant's encoding.
+    """
+
+    def __init__(self, content: bytes, variants: Dict[str, bytes], **kwargs):
+        self.variants = variants
+        super().__init__(content, **kwargs)
+        if variants:
+            add_vary(self.headers, "Accept-Encoding")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding"), self.variants
+        )
+        body, raw_headers = self.body, self.raw_headers
+        if encoding is not None:
+            body = self.variants[encoding]
+            headers = MutableHeaders(raw=list(raw_headers))
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], encoding)
+            raw_headers = headers.raw
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": raw_headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses in the encoding negotiated from the request's Accept-Encoding header, as they are sent. The
+    start of a response is held back only until settings.compression_minimum_size bytes of it have been produced,
+    responses which end before then being sent uncompressed, so streamed responses are never buffered in full.
+    Responses which already have a Content-Encoding, and media types which do not compress, are sent as they are.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding"), available_encodings()
+        )
+        responder = _CompressionResponder(send, encoding)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: Optional[str]):
+        self._send = send
+        self.encoding = encoding
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.encoder = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or not is_compressible(headers)
+            )
+            if not self.passthrough:
+                add_vary(MutableHeaders(raw=message["headers"]), "Accept-Encoding")
+                self.passthrough = self.encoding is None
+            if self.passthrough:
+                await self._send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is None:
+            self.buffer.append(body)
+            self.buffered += len(body)
+            if self.buffered < settings.compression_minimum_size:
+                if more_body:
+                    return
+                # ended before reaching the threshold, so sent uncompressed
+                await self._send(self.start_message)
+                await self._send(
+                    {"type": "http.response.body", "body": b"".join(self.buffer)}
+                )
+                return
+            self.encoder = ENCODERS[self.encoding]()
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self._send(self.start_message)
+            body = b"".join(self.buffer)
+            self.buffer = []
+
+        compressed = self.encoder.compress(body)
+        if not more_body:
+            compressed += self.encoder.finish()
+        if compressed or not more_body:
+            await self._send(
+                {
+                    "type": "http.response.body",
+                    "body": compressed,
+                    "more_body": more_body,
+                }
+            )
@@ -0,0 +1,253 @@
+import time
+from contextvars import ContextVar
+from hashlib import blake2b
+from typing import Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from rdflib import Graph
+from rdflib.compare import to_isomorphic
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from prez.cache import validator_cache
+from prez.config import settings
+from prez.services.cache_policy import NEGOTIATED_HEADERS
+from prez.services.compression import (
+    ENCODERS,
+    available_encodings,
+    negotiate_encoding,
+)
+from prez.services.worker_pool import offload
+
+# headers a 304 response repeats from the response it stands in for
+NOT_MODIFIED_HEADERS = ("etag", "vary", "cache-control", "content-location", "expires")
+
+# the requests answered 304 by the middleware from a validator alone, and by a renderer once it had its response graph
+conditional_counts = {"short_circuited": 0, "not_modified": 0}
+
+
+class ConditionalRequest(NamedTuple):
+    """
+    The parts of a GET request which select its representation, which validators are cached under, and the entity
+    tags of its If-None-Match header, if any.
+    """
+
+    key: tuple
+    if_none_match: Optional[str]
+
+
+# the conditional request being handled, set by ConditionalRequestMiddleware
+conditional_request: ContextVar[Optional[ConditionalRequest]] = ContextVar(
+    "conditional_request", default=None
+)
+
+
+class Validator(NamedTuple):
+    """A cached entity tag, the (monotonic) time until which it is trusted, and the headers a 304 response repeats."""
+
+    etag: str
+    expires: float
+    headers: Tuple[Tuple[str, str], ...]
+
+
+def request_key(scope: Scope) -> tuple:
+    """
+    The path, sorted query parameters, negotiated headers (as responses Vary by, see NEGOTIATED_HEADERS) and content
+    coding of a request, which select its representation.
+    """
+    headers = Headers(scope=scope)
+    query = parse_qsl(
+        scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True
+    )
+    return (
+        scope["path"],
+        tuple(sorted(query)),
+        *(headers.get(name, "") for name in NEGOTIATED_HEADERS),
+        negotiate_encoding(headers.get("accept-encoding"), available_encodings()),
+    )
+
+
+def graph_etag(graph: Graph, *variant) -> str:
+    """
+    A strong entity tag for a response graph: its canonical hash (see rdflib.compare.to_isomorphic), so independent of
+    the order triples were returned in and of blank node labels, and the variant - such as the profile, mediatype and
+    languages - it is rendered in.
+    """
+    return _etag(to_isomorphic(graph).graph_digest(), *variant)
+
+
+def data_version_etag(key: tuple) -> str:
+    """A strong entity tag for a request's representation of the data at settings.data_version."""
+    return _etag(settings.data_version, key)
+
+
+def _etag(*parts) -> str:
+    digest = blake2b("|".join(map(str, parts)).encode("utf-8"), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+async def response_etag(graph: Graph, *variant) -> str:
+    """
+    The entity tag of a response: from settings.data_version and the request if set, otherwise from the response graph
+    and variant (see graph_etag), hashed in the worker pool if it has at least settings.offload_min_triples triples.
+    """
+    request = conditional_request.get()
+    if settings.data_version and request is not None:
+        return data_version_etag(request.key)
+    return await offload(
+        len(graph), settings.offload_min_triples, graph_etag, graph, *variant
+    )
+
+
+def _opaque_tag(etag: str) -> str:
+    """An entity tag without its weakness indicator, or the suffix of the content coding it was compressed in."""
+    tag = etag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for encoding in ENCODERS:
+        if tag.endswith(f"-{encoding}"):
+            return tag[: -len(encoding) - 1]
+    return tag
+
+
+def matching_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """
+    The entity tag of an If-None-Match header which matches etag, by the weak comparison If-None-Match uses, ignoring
+    the content coding suffixes compressed responses' tags have. "*" matches any tag.
+    """
+    if not if_none_match:
+        return None
+    opaque = _opaque_tag(etag)
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag and _opaque_tag(tag) == opaque):
+            return etag if tag == "*" else tag
+    return None
+
+
+def not_modified_response(headers: Dict[str, str]) -> Optional[Response]:
+    """
+    A 304 response for the current request if its If-None-Match header matches the ETag of headers, so the response
+    need not be rendered. The client's matching tag is returned, as it may be that of a compressed representation.
+    """
+    request = conditional_request.get()
+    if request is None:
+        return None
+    tag = matching_etag(request.if_none_match, headers["ETag"])
+    if tag is None:
+        return None
+    conditional_counts["not_modified"] += 1
+    response_headers = {
+        name: value
+        for name, value in headers.items()
+        if name.lower() in NOT_MODIFIED_HEADERS
+    }
+    response_headers["ETag"] = tag
+    return Response(status_code=304, headers=response_headers)
+
+
+class ConditionalRequestMiddleware:
+    """
+    Answers conditional GET requests. A request whose If-None-Match header matches a validator cached from an earlier
+    response to the same request (or, with settings.data_version set, the tag of that version) is answered 304 before
+    any of Prez's routes run, so without querying the triplestore. Other requests are passed on with the
+    conditional_request context set, so renderers can answer 304 before serializing (see not_modified_response), and
+    the ETag of each response is cached as the request's validator. Validators are trusted for
+    settings.validator_cache_ttl seconds, or while settings.data_version is unchanged if it is set.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        key = request_key(scope)
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if if_none_match:
+            headers = self._cached_headers(key)
+            if headers is not None:
+                tag = matching_etag(if_none_match, headers["etag"])
+                if tag is not None:
+                    conditional_counts["short_circuited"] += 1
+                    headers["etag"] = tag
+                    await Response(status_code=304, headers=headers)(
+                        scope, receive, send
+                    )
+                    return
+
+        token = conditional_request.set(ConditionalRequest(key, if_none_match))
+        try:
+            responder = _ValidatorResponder(send, key, if_none_match)
+            await self.app(scope, receive, responder.send)
+        finally:
+            conditional_request.reset(token)
+
+    @staticmethod
+    def _cached_headers(key: tuple) -> Optional[Dict[str, str]]:
+        if settings.data_version:
+            return {"etag": data_version_etag(key)}
+        validator = validator_cache.get(key)
+        if validator is None or validator.expires <= time.monotonic():
+            return None
+        return dict(validator.headers)
+
+
+class _ValidatorResponder:
+    def __init__(self, send: Send, key: tuple, if_none_match: Optional[str]):
+        self._send = send
+        self.key = key
+        self.if_none_match = if_none_match
+        self.not_modified = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            etag = headers.get("etag")
+            if etag is not None and message["status"] in (200, 304):
+                self._cache_validator(headers)
+                tag = matching_etag(self.if_none_match, etag)
+                if message["status"] == 200 and tag is not None:
+                    # rendered in full by a route which does not answer conditional requests itself
+                    self.not_modified = True
+                    message = {
+                        "type": "http.response.start",
+                        "status": 304,
+                        "headers": [
+                            (name, value)
+                            for name, value in message["headers"]
+                            if name.decode("latin-1") in NOT_MODIFIED_HEADERS
+                        ],
+                    }
+            await self._send(message)
+            return
+        if self.not_modified:
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                await self._send({"type": "http.response.body", "body": b""})
+            return
+        await self._send(message)
+
+    def _cache_validator(self, headers: Headers):
+        if settings.data_version or headers.get("etag", "").startswith("W/"):
+            return
+        validator_cache.set(
+            self.key,
+            Validator(
+                headers["etag"],
+                time.monotonic() + settings.validator_cache_ttl,
+                tuple(
+                    (name, value)
+                    for name, value in headers.items()
+                    if name in NOT_MODIFIED_HEADERS
+                ),
+            ),
+        )
+
+
+def conditional_request_stats() -> dict:
+    return {**validator_cache.stats(), **conditional_counts}
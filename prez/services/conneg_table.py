@@ -0,0 +1,229 @@
+import logging
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, NamedTuple, Optional
+
+from rdflib import DCTERMS, Graph, Literal, Namespace, PROF, RDFS, SKOS, URIRef
+from rdflib.namespace import DCAT, SH
+
+from prez.cache import conneg_table, profiles_graph_cache
+from prez.models.model_exceptions import NoProfilesException
+from prez.reference_data.prez_ns import ALTREXT, PREZ
+from prez.services.curie_functions import get_curie_id_for_uri
+
+log = logging.getLogger(__name__)
+
+GEO = Namespace("http://www.opengis.net/ont/geosparql#")
+
+# the base classes delivered by Prez's endpoints, see select_profile_mediatype
+BASE_CLASSES = frozenset(
+    [
+        DCAT.Dataset,
+        GEO.FeatureCollection,
+        PREZ.FeatureCollectionList,
+        PREZ.FeatureList,
+        GEO.Feature,
+        SKOS.ConceptScheme,
+        SKOS.Concept,
+        SKOS.Collection,
+        PREZ.DatasetList,
+        PREZ.VocPrezCollectionList,
+        PREZ.SchemesList,
+        PREZ.CatalogList,
+        PREZ.ResourceList,
+        PREZ.ProfilesList,
+        DCAT.Catalog,
+        DCAT.Resource,
+        PROF.Profile,
+        PREZ.SPARQLQuery,
+        PREZ.SearchResult,
+    ]
+)
+
+
+class ConnegCandidate(NamedTuple):
+    """A profile and format a class can be rendered in, equivalent to a row of select_profile_mediatype's results."""
+
+    profile: URIRef
+    title: Literal
+    klass: URIRef
+    distance: int
+    def_profile: bool
+    format: Literal
+    def_format: bool
+
+
+class ConnegDecision(NamedTuple):
+    profile: URIRef
+    mediatype: Literal
+    selected_class: URIRef
+    profile_headers: Dict[str, str]
+    avail_profile_uris: List[URIRef]
+
+
+def build_conneg_table(graph: Graph) -> Dict[URIRef, List[ConnegCandidate]]:
+    """
+    Compiles the profiles graph into a dictionary of class -> the candidate profiles and formats for that class.
+
+    This is equivalent to the select_profile_mediatype SPARQL query before any profile or mediatype is requested:
+    - the distance of a class is the number of (superclass, base class) pairs for which the class is a (reflexive)
+    rdfs:subClassOf* the superclass, and the superclass is a (reflexive) rdfs:subClassOf* the base class. Classes which
+    are not subclasses of a base class have no candidates;
+    - there is a candidate for each profile constraining the class, for each of the profile's formats and titles;
+    - a candidate is the default profile if a shape targeting the class has it as its altr-ext:hasDefaultProfile, and
+    the default format if it is the profile's altr-ext:hasDefaultResourceFormat.
+    """
+    distances = {}
+
+    def distance(klass):
+        if klass not in distances:
+            distances[klass] = sum(
+                len(set(graph.transitive_objects(mid, RDFS.subClassOf)) & BASE_CLASSES)
+                for mid in set(graph.transitive_objects(klass, RDFS.subClassOf))
+            )
+        return distances[klass]
+
+    candidates_by_class = {}
+    for profile, klass in graph.subject_objects(ALTREXT.constrainsClass):
+        class_distance = distance(klass)
+        if not class_distance:
+            continue
+        def_profile = any(
+            (shape, ALTREXT.hasDefaultProfile, profile) in graph
+            for shape in graph.subjects(SH.targetClass, klass)
+        )
+        candidates = candidates_by_class.setdefault(klass, set())
+        for resource_format in graph.objects(profile, ALTREXT.hasResourceFormat):
+            def_format = (
+                profile,
+                ALTREXT.hasDefaultResourceFormat,
+                resource_format,
+            ) in graph
+            for title in graph.objects(profile, DCTERMS.title):
+                candidates.add(
+                    ConnegCandidate(
+                        profile,
+                        title,
+                        klass,
+                        class_distance,
+                        def_profile,
+                        resource_format,
+                        def_format,
+                    )
+                )
+    # a fixed order, so that ties are broken consistently
+    return {
+        klass: sorted(candidates, key=lambda c: (c.profile, c.format, c.title))
+        for klass, candidates in candidates_by_class.items()
+    }
+
+
+def rebuild_conneg_table():
+    """
+    (Re)compiles the conneg table from the profiles graph cache. Must be called whenever the profiles graph cache
+    changes, see rebuild_system_indexes.
+    """
+    table = build_conneg_table(profiles_graph_cache)
+    conneg_table.clear()
+    conneg_table.update(table)
+    decide_profile_and_mediatype.cache_clear()
+    log.info(f"Conneg table built for {len(conneg_table):,} classes")
+
+
+def get_conneg_decision(
+    classes: FrozenSet[URIRef],
+    requested_profile: Optional[URIRef] = None,
+    requested_mediatypes: Optional[FrozenSet] = None,
+) -> ConnegDecision:
+    # classes may be given as strings, e.g. from SPARQL results
+    return decide_profile_and_mediatype(
+        frozenset(URIRef(klass) for klass in classes),
+        requested_profile,
+        requested_mediatypes or None,
+    )
+
+
+def _requested_format_rank(requested_mediatypes: Optional[FrozenSet]):
+    """The q value of each requested mediatype, as a string, as compared by the select_profile_mediatype query."""
+    if not requested_mediatypes:
+        return lambda resource_format: ""
+    ranks = {}
+    for requested in requested_mediatypes:
+        q, mediatype = requested if isinstance(requested, tuple) else (1, requested)
+        ranks[mediatype] = max(ranks.get(mediatype, ""), str(q))
+    return lambda resource_format: ranks.get(str(resource_format), "")
+
+
+@lru_cache(maxsize=1024)
+def decide_profile_and_mediatype(
+    classes: FrozenSet[URIRef],
+    requested_profile: Optional[URIRef],
+    requested_mediatypes: Optional[FrozenSet],
+) -> ConnegDecision:
+    """
+    Selects the profile, mediatype and class to render an object with, and precomputes the profile headers, for a set
+    of classes and a requested profile and mediatypes. Candidates are ordered as by select_profile_mediatype: requested
+    profile first, then most specific class, default profile, requested mediatype (by q value), then default format.
+    """
+    candidates = [
+        candidate for klass in classes for candidate in conneg_table.get(klass, [])
+    ]
+    if not candidates:
+        raise NoProfilesException(classes)
+    format_rank = _requested_format_rank(requested_mediatypes)
+    candidates.sort(
+        key=lambda c: (
+            c.profile == requested_profile,
+            c.distance,
+            c.def_profile,
+            format_rank(c.format),
+            c.def_format,
+        ),
+        reverse=True,
+    )
+    top = candidates[0]
+    profile_headers, avail_profile_uris = generate_profiles_headers(
+        top.klass,
+        [
+            {"profile": c.profile, "title": c.title, "format": c.format}
+            for c in candidates
+        ],
+        top.profile,
+        top.format,
+    )
+    return ConnegDecision(
+        top.profile, top.format, top.klass, profile_headers, avail_profile_uris
+    )
+
+
+def generate_profiles_headers(selected_class, rows, profile, mediatype):
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Content-Type": mediatype,
+    }
+    avail_profiles = set(
+        (get_curie_id_for_uri(i["profile"]), i["profile"], i["title"]) for i in rows
+    )
+    avail_profiles_headers = ", ".join(
+        [
+            f'<http://www.w3.org/ns/dx/prof/Profile>; rel="type"; title="{i[2]}"; token="{i[0]}"; anchor=<{i[1]}>'
+            for i in avail_profiles
+        ]
+    )
+    avail_mediatypes_headers = ", ".join(
+        [
+            f"""<{selected_class}?_profile={get_curie_id_for_uri(i["profile"])}&_mediatype={i["format"]}>; \
+rel="{"self" if i["profile"] == profile and i["format"] == mediatype else "alternate"}"; \
+type="{i["format"]}"; profile="{i["profile"]}"\
+"""
+            for i in rows
+        ]
+    )
+    headers["Link"] = ", ".join(
+        [
+            f'<{profile}>; rel="profile"',
+            avail_profiles_headers,
+            avail_mediatypes_headers,
+        ]
+    )
+    avail_profile_uris = [i[1] for i in avail_profiles]
+    return headers, avail_profile_uris
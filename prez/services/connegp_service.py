@@ -1,8 +1,12 @@
 import time
 
+from typing import Optional, Tuple
+
 from connegp import Connegp
 from fastapi import Request
 
+from prez.config import settings
+
 
 def get_requested_profile_and_mediatype(request: Request):
     """Return the requested profile and mediatype."""
@@ -13,3 +17,44 @@ def get_requested_profile_and_mediatype(request: Request):
         c.profile_tokens_requested,
         frozenset(c.mediatypes_requested),
     )
+
+
+def get_requested_languages(request: Request) -> Tuple[str, ...]:
+    """
+    Return the language ranges in the request's Accept-Language header, most preferred first, or the default
+    languages if none are requested. Ranges with a quality value of 0 are excluded.
+    """
+    header = request.headers.get("accept-language") if request else None
+    ranges = []
+    for position, item in enumerate((header or "").split(",")):
+        language_range, *params = [part.strip() for part in item.split(";")]
+        if not language_range:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            ranges.append((-quality, position, language_range.lower()))
+    languages = tuple(
+        dict.fromkeys(language_range for _, _, language_range in sorted(ranges))
+    )
+    return languages or get_default_languages()
+
+
+def get_requested_sort(request: Request) -> Optional[bool]:
+    """
+    Return whether the request's _sort query parameter asks for the rows of a dd profile response to be sorted, or
+    None if it does not say.
+    """
+    value = request.query_params.get("_sort") if request else None
+    if value is None:
+        return None
+    return value.lower() not in ("false", "0", "no", "none")
+
+
+def get_default_languages() -> Tuple[str, ...]:
+    return tuple(language.lower() for language in settings.default_languages)
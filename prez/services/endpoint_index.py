@@ -0,0 +1,118 @@
+import logging
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from rdflib import Graph, RDF, URIRef
+
+from prez.cache import endpoints_graph_cache, endpoint_template_index
+from prez.reference_data.prez_ns import ONT
+
+log = logging.getLogger(__name__)
+
+RELATION_DIRECTIONS = (ONT.FocusToParentRelation, ONT.ParentToFocusRelation)
+
+
+def build_endpoint_index(
+    graph: Graph,
+) -> Dict[URIRef, List[Tuple[int, str, Optional[URIRef], Optional[URIRef]]]]:
+    """
+    Compiles Prez's endpoint definitions into a dictionary of class -> rows of
+    (distance, endpoint template, relation predicate, relation direction), ordered by descending distance.
+
+    This is equivalent to running the get_endpoint_template_queries SPARQL query for every class an endpoint delivers:
+    - every ont:ObjectEndpoint contributes a row with no relation at distance 0;
+    - every endpoint with a parent to focus or focus to parent relation contributes a row per ont:ObjectEndpoint
+    ancestor, where the distance is the number of ont:ObjectEndpoint ancestors between the endpoint and that ancestor
+    (inclusive of the ancestor).
+    """
+    object_endpoints = set(graph.subjects(RDF.type, ONT.ObjectEndpoint))
+
+    def ancestors(endpoint) -> set:
+        """all endpoints reachable via one or more ont:parentEndpoint links"""
+        found = set()
+        to_visit = list(graph.objects(endpoint, ONT.parentEndpoint))
+        while to_visit:
+            parent = to_visit.pop()
+            if parent not in found:
+                found.add(parent)
+                to_visit.extend(graph.objects(parent, ONT.parentEndpoint))
+        return found
+
+    rows_by_class = {}
+    for endpoint, endpoint_template in graph.subject_objects(ONT.endpointTemplate):
+        klasses = list(graph.objects(endpoint, ONT.deliversClasses))
+        if not klasses:
+            continue
+        endpoint_rows = []
+        if endpoint in object_endpoints:
+            endpoint_rows.append((0, str(endpoint_template), None, None))
+        relations = [
+            (predicate, direction)
+            for direction in RELATION_DIRECTIONS
+            for predicate in graph.objects(endpoint, direction)
+        ]
+        if relations:
+            intermediates = ancestors(endpoint) & object_endpoints
+            parent_endpoints = {}
+            for intermediate in intermediates:
+                for parent in (
+                    ancestors(intermediate) | {intermediate}
+                ) & object_endpoints:
+                    parent_endpoints[parent] = parent_endpoints.get(parent, 0) + 1
+            for distance in parent_endpoints.values():
+                for predicate, direction in relations:
+                    endpoint_rows.append(
+                        (distance, str(endpoint_template), predicate, direction)
+                    )
+        for klass in klasses:
+            rows_by_class.setdefault(klass, []).extend(endpoint_rows)
+
+    for rows in rows_by_class.values():
+        rows.sort(key=lambda row: row[0], reverse=True)
+    return rows_by_class
+
+
+def rebuild_endpoint_index():
+    """
+    (Re)compiles the endpoint template index from the endpoints graph cache. Must be called whenever the endpoints
+    graph cache changes, see rebuild_system_indexes.
+    """
+    index = build_endpoint_index(endpoints_graph_cache)
+    endpoint_template_index.clear()
+    endpoint_template_index.update(index)
+    _lookup_endpoint_templates.cache_clear()
+    log.info(
+        f"Endpoint template index built for {len(endpoint_template_index):,} classes"
+    )
+
+
+def get_endpoint_templates_for_classes(
+    classes: FrozenSet[URIRef],
+) -> Mapping[str, Tuple[Tuple[Optional[URIRef], Optional[URIRef]], ...]]:
+    """
+    Returns a mapping of endpoint template -> ordered tuple of (relation predicate, relation direction) tuples for the
+    endpoints which can render an object with the given classes. The mapping is shared between requests, so is
+    read-only.
+    """
+    return _lookup_endpoint_templates(classes)
+
+
+@lru_cache(maxsize=1024)
+def _lookup_endpoint_templates(classes: FrozenSet[URIRef]):
+    rows = []
+    for klass in classes:
+        rows.extend(endpoint_template_index.get(klass, []))
+    if len(classes) > 1:
+        rows.sort(key=lambda row: row[0], reverse=True)
+    endpoint_to_relations = {}
+    for _, endpoint_template, relation, direction in rows:
+        endpoint_to_relations.setdefault(endpoint_template, []).append(
+            (relation, direction)
+        )
+    return MappingProxyType(
+        {
+            endpoint_template: tuple(relations)
+            for endpoint_template, relations in endpoint_to_relations.items()
+        }
+    )
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class EventLoopLagMonitor:
+    """
+    Measures how late the event loop wakes from a sleep of a fixed interval. Lag is time the loop spent running other
+    work - such as parsing or serializing on the loop rather than in the worker pool - during which no other request
+    progressed.
+    """
+
+    def __init__(self, stall_threshold: float = 0.1):
+        self.stall_threshold = stall_threshold
+        self.samples = 0
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+        self.stalls = 0
+
+    def record(self, lag: float):
+        self.samples += 1
+        self.last = lag
+        self.max = max(self.max, lag)
+        self.total += lag
+        if lag >= self.stall_threshold:
+            self.stalls += 1
+            log.warning(f"Event loop stalled for {lag:.3f}s")
+
+    async def run(self, interval: float):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.record(max(0.0, loop.time() - start - interval))
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.samples,
+            "last_lag_seconds": round(self.last, 6),
+            "mean_lag_seconds": round(self.total / self.samples, 6)
+            if self.samples
+            else 0.0,
+            "max_lag_seconds": round(self.max, 6),
+            "stalls": self.stalls,
+        }
+
+
+event_loop_lag = EventLoopLagMonitor()
@@ -6,6 +6,7 @@ from prez.models.model_exceptions import (
     ClassNotFoundException,
     URINotFoundException,
     NoProfilesException,
+    InvalidIRIException,
 )
 
 
@@ -51,3 +52,13 @@ async def catch_no_profiles_exception(request: Request, exc: NoProfilesException
             "detail": exc.message,
         },
     )
+
+
+async def catch_invalid_iri_exception(request: Request, exc: InvalidIRIException):
+    return JSONResponse(
+        status_code=400,
+        content={
+            "error": "Bad Request",
+            "detail": exc.message,
+        },
+    )
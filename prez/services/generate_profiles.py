@@ -6,10 +6,10 @@ from rdflib import Graph, URIRef, RDF, PROF, Literal
 
 from prez.cache import profiles_graph_cache
 from prez.config import settings
-from prez.models.model_exceptions import NoProfilesException
 from prez.reference_data.prez_ns import PREZ
-from prez.services.curie_functions import get_curie_id_for_uri
-from prez.sparql.objects_listings import select_profile_mediatype
+from prez.services.conneg_table import get_conneg_decision
+from prez.services.curie_functions import get_curie_id_for_uri, get_uri_for_curie_id
+from prez.services.system_indexes import rebuild_system_indexes
 
 log = logging.getLogger(__name__)
 
@@ -20,6 +20,11 @@ async def create_profiles_graph(repo) -> Graph:
     ):  # pytest imports app.py multiple times, so this is needed. Not sure why cache is
         # not cleared between calls
         return
+    build_profiles_graph(await get_remote_profiles(repo), profiles_graph_cache)
+    rebuild_system_indexes()
+
+
+def load_local_profiles(graph: Graph):
     flavours = ["CatPrez", "SpacePrez", "VocPrez"]
     for f in (Path(__file__).parent.parent / "reference_data/profiles").glob("*.ttl"):
         # Check if file starts with any of the flavour prefixes
@@ -31,8 +36,11 @@ async def create_profiles_graph(repo) -> Graph:
         if not matching_flavour or (
             matching_flavour and matching_flavour in settings.prez_flavours
         ):
-            profiles_graph_cache.parse(f)
+            graph.parse(f)
     log.info("Prez default profiles loaded")
+
+
+async def get_remote_profiles(repo) -> Graph:
     remote_profiles_query = """
         PREFIX dcat: <http://www.w3.org/ns/dcat#>
         PREFIX geo: <http://www.opengis.net/ont/geosparql#>
@@ -66,80 +74,51 @@ async def create_profiles_graph(repo) -> Graph:
         }
         """
     g, _ = await repo.send_queries([remote_profiles_query], [])
-    if len(g) > 0:
-        profiles_graph_cache.__iadd__(g)
+    return g
+
+
+def build_profiles_graph(remote_profiles: Graph, graph: Graph) -> Graph:
+    """Adds the local profiles, the profiles from the triplestore and the profiles' internal links to a graph."""
+    load_local_profiles(graph)
+    if len(remote_profiles) > 0:
+        graph.__iadd__(remote_profiles)
         log.info(f"Remote profile(s) found and added")
     else:
         log.info("No remote profiles found")
     # add profiles internal links
-    _add_prez_profile_links()
+    _add_prez_profile_links(graph)
+    return graph
 
 
-# @lru_cache(maxsize=128)
 def get_profiles_and_mediatypes(
     classes: FrozenSet[URIRef],
     requested_profile: URIRef = None,
     requested_profile_token: str = None,
     requested_mediatype: URIRef = None,
 ):
-    query = select_profile_mediatype(
-        classes, requested_profile, requested_profile_token, requested_mediatype
-    )
-    response = profiles_graph_cache.query(query)
-    if len(response.bindings[0]) == 0:
-        raise NoProfilesException(classes)
-    top_result = response.bindings[0]
-    profile, mediatype, selected_class = (
-        top_result["profile"],
-        top_result["format"],
-        top_result["class"],
-    )
-    profile_headers, avail_profile_uris = generate_profiles_headers(
-        selected_class, response, profile, mediatype
-    )
-    return profile, mediatype, selected_class, profile_headers, avail_profile_uris
-
-
-def generate_profiles_headers(selected_class, response, profile, mediatype):
-    headers = {
-        "Access-Control-Allow-Origin": "*",
-        "Content-Type": mediatype,
-    }
-    avail_profiles = set(
-        (get_curie_id_for_uri(i["profile"]), i["profile"], i["title"])
-        for i in response.bindings
-    )
-    avail_profiles_headers = ", ".join(
-        [
-            f'<http://www.w3.org/ns/dx/prof/Profile>; rel="type"; title="{i[2]}"; token="{i[0]}"; anchor=<{i[1]}>'
-            for i in avail_profiles
-        ]
-    )
-    avail_mediatypes_headers = ", ".join(
-        [
-            f"""<{selected_class}?_profile={get_curie_id_for_uri(i["profile"])}&_mediatype={i["format"]}>; \
-rel="{"self" if i["profile"] == profile and i["format"] == mediatype else "alternate"}"; \
-type="{i["format"]}"; profile="{i["profile"]}"\
-"""
-            for i in response.bindings
-        ]
+    if requested_profile_token:
+        requested_profile = get_uri_for_curie_id(requested_profile_token)
+    elif isinstance(requested_profile, list):
+        # profiles requested with an Accept-Profile header, most preferred first
+        requested_profile = requested_profile[0]["profile"]
+    decision = get_conneg_decision(
+        classes,
+        URIRef(requested_profile) if requested_profile else None,
+        requested_mediatype,
     )
-    headers["Link"] = ", ".join(
-        [
-            f'<{profile}>; rel="profile"',
-            avail_profiles_headers,
-            avail_mediatypes_headers,
-        ]
+    # the headers are modified per response, so each response gets its own copy
+    return (
+        decision.profile,
+        decision.mediatype,
+        decision.selected_class,
+        dict(decision.profile_headers),
+        list(decision.avail_profile_uris),
     )
-    avail_profile_uris = [i[1] for i in avail_profiles]
-    return headers, avail_profile_uris
 
 
-def _add_prez_profile_links():
-    for profile in profiles_graph_cache.subjects(
-        predicate=RDF.type, object=PROF.Profile
-    ):
-        profiles_graph_cache.add(
+def _add_prez_profile_links(graph: Graph = profiles_graph_cache):
+    for profile in graph.subjects(predicate=RDF.type, object=PROF.Profile):
+        graph.add(
             (
                 profile,
                 PREZ["link"],
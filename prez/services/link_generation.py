@@ -1,82 +1,130 @@
+import asyncio
 from string import Template
-from typing import FrozenSet
+from typing import FrozenSet, Optional
 
 from fastapi import Depends
+from pyoxigraph import NamedNode
 from rdflib import Graph, Literal, URIRef, DCTERMS, BNode
 
-from prez.cache import endpoints_graph_cache, links_ids_graph_cache
-from prez.dependencies import get_system_repo
+from prez.cache import links_ids_graph_cache, links_store
+from prez.config import settings
 from prez.reference_data.prez_ns import PREZ
 from prez.services.curie_functions import get_curie_id_for_uri
+from prez.services.endpoint_index import get_endpoint_templates_for_classes
 from prez.services.model_methods import get_classes
 from prez.sparql.methods import Repo
-from prez.sparql.objects_listings import (
-    get_endpoint_template_queries,
-    generate_relationship_query,
-)
+from prez.sparql.objects_listings import generate_relationship_query
+from prez.sparql.terms import to_oxigraph_term, from_oxigraph_term
 
 
 async def _add_prez_links(graph: Graph, repo: Repo, system_repo: Repo):
+    """
+    Adds internal links and identifiers to the graph for every URIRef in it. Links are read from the materialized links
+    store where they have been precomputed, and otherwise from the links cache. Links for URIs in neither are
+    generated concurrently, with at most settings.link_generation_concurrency URIs in flight per request so a single
+    request cannot flood the triplestore. Generated triples are added to the graph in URI order once all tasks finish.
+    """
     # get all URIRefs - if Prez can find a class and endpoint for them, an internal link will be generated.
-    uris = [uri for uri in graph.all_nodes() if isinstance(uri, URIRef)]
-    uri_to_klasses = {}
+    uris = sorted(uri for uri in graph.all_nodes() if isinstance(uri, URIRef))
+    uncached_uris = []
     for uri in uris:
-        uri_to_klasses[uri] = await get_classes(uri, repo)
-
-    for uri, klasses in uri_to_klasses.items():
-        await _create_internal_links_graph(uri, graph, repo, klasses, system_repo)
-
-
-async def _create_internal_links_graph(uri, graph, repo: Repo, klasses, system_repo):
-    quads = list(
-        links_ids_graph_cache.quads((None, None, None, uri))
-    )  # context required as not all triples that relate to links or identifiers for a particular object have that object's URI as the subject
-    if quads:
-        for quad in quads:
-            graph.add(quad[:3])
-    else:
-        for klass in klasses:
-            endpoint_to_relations = await get_endpoint_info_for_classes(
-                frozenset([klass]), system_repo
+        cached_triples = get_materialized_links(uri)
+        if cached_triples is None:
+            cached_triples = links_ids_graph_cache.get(uri)
+        if cached_triples is not None:
+            for triple in cached_triples:
+                graph.add(triple)
+        else:
+            uncached_uris.append(uri)
+    if not uncached_uris:
+        return
+
+    semaphore = asyncio.Semaphore(settings.link_generation_concurrency)
+
+    async def bounded_link_generation(uri):
+        async with semaphore:
+            klasses = await get_classes(uri, repo)
+            return await _create_internal_links_graph(uri, repo, klasses, system_repo)
+
+    results = await asyncio.gather(
+        *[bounded_link_generation(uri) for uri in uncached_uris]
+    )
+    for triples in results:
+        for triple in triples:
+            graph.add(triple)
+
+
+async def _create_internal_links_graph(uri, repo: Repo, klasses, system_repo) -> tuple:
+    """
+    Generates the internal link and identifier triples for an object, and caches them against the object's URI.
+    """
+    triples = await generate_links_for_classes(uri, klasses, repo)
+    # the cache is keyed on the object's URI as not all triples that relate to links or identifiers for a particular
+    # object have that object's URI as the subject
+    links_ids_graph_cache.set(uri, triples)
+    return triples
+
+
+async def generate_links_for_classes(uri: URIRef, klasses, repo: Repo) -> tuple:
+    """
+    Generates the internal link and identifier triples for an object with the given classes.
+    """
+    triples = []
+    for klass in klasses:
+        endpoint_to_relations = get_endpoint_info_for_classes(frozenset([klass]))
+        relationship_query = generate_relationship_query(uri, endpoint_to_relations)
+        if relationship_query:
+            _, tabular_results = await repo.send_queries(
+                [], [(uri, relationship_query)]
             )
-            relationship_query = generate_relationship_query(uri, endpoint_to_relations)
-            if relationship_query:
-                _, tabular_results = await repo.send_queries(
-                    [], [(uri, relationship_query)]
-                )
-                for _, result in tabular_results:
-                    quads = generate_system_links_object(result, uri)
-                    for quad in quads:
-                        graph.add(quad[:3])  # just add the triple not the quad
-                        links_ids_graph_cache.add(quad)  # add the quad to the cache
+            for _, result in tabular_results:
+                quads = generate_system_links_object(result, uri)
+                triples.extend(
+                    quad[:3] for quad in quads
+                )  # just the triple not the quad
+    return tuple(triples)
+
+
+def links_graph_name(uri: URIRef) -> Optional[NamedNode]:
+    """
+    The name of the graph an object's links are materialized in, or None for IRIs RDFLib accepts but Oxigraph rejects,
+    such as those with spaces or braces, which are never materialized, so their links are generated on request.
+    """
+    try:
+        return to_oxigraph_term(uri)
+    except ValueError:
+        return None
+
+
+def get_materialized_links(uri: URIRef) -> Optional[tuple]:
+    """
+    Returns the precomputed internal link and identifier triples for an object from the materialized links store, or
+    None if links have not been materialized for the object. Each object's links are held in a named graph identified
+    by the object's URI.
+    """
+    graph_name = links_graph_name(uri)
+    if graph_name is None:
+        return None
+    if not links_store.contains_named_graph(graph_name):
+        return None
+    return tuple(
+        (
+            from_oxigraph_term(quad.subject),
+            from_oxigraph_term(quad.predicate),
+            from_oxigraph_term(quad.object),
+        )
+        for quad in links_store.quads_for_pattern(None, None, None, graph_name)
+    )
 
 
-async def get_endpoint_info_for_classes(
-    classes: FrozenSet[URIRef], system_repo
-) -> dict:
+def get_endpoint_info_for_classes(classes: FrozenSet[URIRef]) -> dict:
     """
-    Queries Prez's in memory reference data for endpoints to determine which endpoints are relevant for the classes an
-    object has, along with information about "parent" objects included in the URL path for the object. This information
-    is whether the relationship in RDF is expected to be from the parent to the child, or from the child to the parent,
-    and the predicate used for the relationship.
+    Looks up Prez's in memory index of endpoint reference data to determine which endpoints are relevant for the
+    classes an object has, along with information about "parent" objects included in the URL path for the object. This
+    information is whether the relationship in RDF is expected to be from the parent to the child, or from the child to
+    the parent, and the predicate used for the relationship.
     """
-    endpoint_query = get_endpoint_template_queries(classes)
-    results = await system_repo.send_queries([], [(None, endpoint_query)])
-    endpoint_to_relations = {}
-    if results[1][0][1] != [{}]:
-        for result in results[1][0][1]:
-            endpoint_template = result["endpoint_template"]["value"]
-            relation = result.get("relation_predicate")
-            if relation:
-                relation = URIRef(relation["value"])
-            direction = result.get("relation_direction")
-            if direction:
-                direction = URIRef(direction["value"])
-            if endpoint_template not in endpoint_to_relations:
-                endpoint_to_relations[endpoint_template] = [(relation, direction)]
-            else:
-                endpoint_to_relations[endpoint_template].append((relation, direction))
-    return endpoint_to_relations
+    return get_endpoint_templates_for_classes(classes)
 
 
 def generate_system_links_object(relationship_results: list, object_uri: str):
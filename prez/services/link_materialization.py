@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from typing import Iterable, Optional
+
+from pyoxigraph import NamedNode, Quad
+from rdflib import RDF, URIRef
+
+from prez.cache import endpoints_graph_cache, links_store
+from prez.config import settings
+from prez.reference_data.prez_ns import ONT
+from prez.services.link_generation import (
+    generate_links_for_classes,
+    links_graph_name,
+)
+from prez.services.model_methods import get_classes
+from prez.sparql.methods import Repo
+from prez.sparql.terms import to_oxigraph_term
+
+log = logging.getLogger(__name__)
+
+
+def get_object_endpoint_classes() -> set:
+    """
+    Returns the classes delivered by any ont:ObjectEndpoint - the classes Prez can generate internal links for.
+    """
+    return {
+        klass
+        for endpoint in endpoints_graph_cache.subjects(RDF.type, ONT.ObjectEndpoint)
+        for klass in endpoints_graph_cache.objects(endpoint, ONT.deliversClasses)
+    }
+
+
+def _write_links(graph_name: NamedNode, triples: tuple):
+    """
+    Replaces the materialized links for an object. The named graph is created even when there are no links, so that
+    objects known to have no links are not regenerated on request. Raises ValueError, leaving the links as they were,
+    if a term of the links cannot be stored in Oxigraph.
+    """
+    quads = [
+        Quad(to_oxigraph_term(s), to_oxigraph_term(p), to_oxigraph_term(o), graph_name)
+        for s, p, o in triples
+    ]
+    links_store.remove_graph(graph_name)
+    links_store.add_graph(graph_name)
+    links_store.extend(quads)
+
+
+async def _materialize_objects(uris: Iterable[URIRef], repo: Repo):
+    semaphore = asyncio.Semaphore(settings.link_generation_concurrency)
+
+    async def bounded_materialization(uri):
+        graph_name = links_graph_name(uri)
+        if graph_name is None:
+            log.warning(f"Not materializing links for {uri}, an IRI Oxigraph rejects")
+            return
+        async with semaphore:
+            klasses = await get_classes(uri, repo)
+            triples = await generate_links_for_classes(uri, klasses, repo)
+        try:
+            _write_links(graph_name, triples)
+        except ValueError as err:
+            log.warning(f"Not materializing links for {uri}: {err}")
+
+    await asyncio.gather(*[bounded_materialization(uri) for uri in uris])
+
+
+async def _instances_of_class(klass: URIRef, repo: Repo):
+    """Yields pages of the IRIs of instances of a class."""
+    offset = 0
+    page_size = settings.materialization_page_size
+    while True:
+        query = f"""
+        SELECT ?iri
+        WHERE {{ ?iri a <{klass}> . FILTER(isIRI(?iri)) }}
+        ORDER BY ?iri
+        LIMIT {page_size}
+        OFFSET {offset}
+        """
+        _, results = await repo.send_queries([], [(None, query)])
+        page = [URIRef(row["iri"]["value"]) for row in results[0][1] if row]
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+
+async def materialize_links(repo: Repo, iris: Optional[Iterable[URIRef]] = None):
+    """
+    Precomputes internal links and identifiers and writes them to the materialized links store, from which
+    _add_prez_links reads them instead of generating them per request.
+
+    If IRIs are given, only the links for those objects are refreshed. Otherwise every instance of every class
+    delivered by an ont:ObjectEndpoint is walked, and the links of objects no longer found are removed.
+    """
+    if iris is not None:
+        iris = [URIRef(iri) for iri in iris]
+        await _materialize_objects(iris, repo)
+        log.info(f"Refreshed materialized links for {len(iris):,} objects")
+        return len(iris)
+
+    log.info("Materializing internal links for all objects")
+    seen = set()
+    for klass in sorted(get_object_endpoint_classes()):
+        async for page in _instances_of_class(klass, repo):
+            new_iris = [iri for iri in page if iri not in seen]
+            seen.update(new_iris)
+            await _materialize_objects(new_iris, repo)
+    stale_graphs = [
+        graph_name
+        for graph_name in links_store.named_graphs()
+        if URIRef(graph_name.value) not in seen
+    ]
+    for graph_name in stale_graphs:
+        links_store.remove_graph(graph_name)
+    log.info(
+        f"Materialized internal links for {len(seen):,} objects, removed {len(stale_graphs):,} stale objects"
+    )
+    return len(seen)
@@ -6,6 +6,11 @@ from prez.models.listing import ListingModel
 from prez.models.profiles_and_mediatypes import ProfilesMediatypesInfo
 from prez.renderers.renderer import return_from_graph, return_profiles
 from prez.services.link_generation import _add_prez_links
+from prez.services.response_cache import (
+    cached_response,
+    negotiated_cache_key,
+    response_tags,
+)
 from prez.sparql.methods import Repo
 from prez.sparql.objects_listings import (
     generate_listing_construct,
@@ -43,31 +48,42 @@ async def listing_function(
             repo=repo,
         )
 
-    ordering_predicate = request.query_params.get("ordering-pred", None)
-    item_members_query = generate_listing_construct(
-        listing_item,
-        prof_and_mt_info.profile,
-        page=page,
-        per_page=per_page,
-        ordering_predicate=ordering_predicate,
-    )
-    count_query = generate_listing_count_construct(listing_item, endpoint_uri)
-    if listing_item.selected_class in [
-        URIRef("https://prez.dev/ProfilesList"),
-        PROF.Profile,
-    ]:
-        list_graph = profiles_graph_cache.query(item_members_query).graph
-        count_graph = profiles_graph_cache.query(count_query).graph
-        item_graph = list_graph + count_graph
-    else:
-        item_graph, _ = await repo.send_queries([count_query, item_members_query], [])
-    if "anot+" in prof_and_mt_info.mediatype:
-        await _add_prez_links(item_graph, repo, system_repo)
-    return await return_from_graph(
-        item_graph,
-        prof_and_mt_info.mediatype,
-        listing_item.profile,
-        prof_and_mt_info.profile_headers,
-        prof_and_mt_info.selected_class,
-        repo,
+    async def render():
+        ordering_predicate = request.query_params.get("ordering-pred", None)
+        item_members_query = generate_listing_construct(
+            listing_item,
+            prof_and_mt_info.profile,
+            page=page,
+            per_page=per_page,
+            ordering_predicate=ordering_predicate,
+        )
+        count_query = generate_listing_count_construct(listing_item, endpoint_uri)
+        if listing_item.selected_class in [
+            URIRef("https://prez.dev/ProfilesList"),
+            PROF.Profile,
+        ]:
+            list_graph = profiles_graph_cache.query(item_members_query).graph
+            count_graph = profiles_graph_cache.query(count_query).graph
+            item_graph = list_graph + count_graph
+        else:
+            item_graph, _ = await repo.send_queries(
+                [count_query, item_members_query], []
+            )
+        if "anot+" in prof_and_mt_info.mediatype:
+            await _add_prez_links(item_graph, repo, system_repo)
+        return await return_from_graph(
+            item_graph,
+            prof_and_mt_info.mediatype,
+            listing_item.profile,
+            prof_and_mt_info.profile_headers,
+            prof_and_mt_info.selected_class,
+            repo,
+            prof_and_mt_info.languages,
+            prof_and_mt_info.sort_rows,
+        )
+
+    return await cached_response(
+        negotiated_cache_key(request, prof_and_mt_info),
+        render,
+        response_tags(request),
     )
@@ -13,6 +13,11 @@ from prez.reference_data.prez_ns import PREZ
 from prez.renderers.renderer import return_from_graph, return_profiles
 from prez.services.curie_functions import get_uri_for_curie_id
 from prez.services.model_methods import get_classes
+from prez.services.response_cache import (
+    cached_response,
+    negotiated_cache_key,
+    response_tags,
+)
 from prez.services.link_generation import _add_prez_links
 from prez.sparql.methods import Repo
 from prez.sparql.objects_listings import (
@@ -69,26 +74,37 @@ async def object_function(
             repo=repo,
         )
 
-    item_query = generate_item_construct(object_item, object_item.profile)
+    async def render():
+        item_query = generate_item_construct(object_item, object_item.profile)
 
-    ordering_predicate = request.query_params.get("ordering-pred", None)
-    item_members_query = generate_listing_construct(
-        object_item, prof_and_mt_info.profile, 1, 20, ordering_predicate
-    )
-    if object_item.selected_class == URIRef("http://www.w3.org/ns/dx/prof/Profile"):
-        item_graph = profiles_graph_cache.query(item_query).graph
-        if item_members_query:
-            list_graph = profiles_graph_cache.query(item_members_query).graph
-            item_graph += list_graph
-    else:
-        item_graph, _ = await repo.send_queries([item_query, item_members_query], [])
-    if "anot+" in prof_and_mt_info.mediatype:
-        await _add_prez_links(item_graph, repo, system_repo)
-    return await return_from_graph(
-        item_graph,
-        prof_and_mt_info.mediatype,
-        object_item.profile,
-        prof_and_mt_info.profile_headers,
-        prof_and_mt_info.selected_class,
-        repo,
+        ordering_predicate = request.query_params.get("ordering-pred", None)
+        item_members_query = generate_listing_construct(
+            object_item, prof_and_mt_info.profile, 1, 20, ordering_predicate
+        )
+        if object_item.selected_class == URIRef("http://www.w3.org/ns/dx/prof/Profile"):
+            item_graph = profiles_graph_cache.query(item_query).graph
+            if item_members_query:
+                list_graph = profiles_graph_cache.query(item_members_query).graph
+                item_graph += list_graph
+        else:
+            item_graph, _ = await repo.send_queries(
+                [item_query, item_members_query], []
+            )
+        if "anot+" in prof_and_mt_info.mediatype:
+            await _add_prez_links(item_graph, repo, system_repo)
+        return await return_from_graph(
+            item_graph,
+            prof_and_mt_info.mediatype,
+            object_item.profile,
+            prof_and_mt_info.profile_headers,
+            prof_and_mt_info.selected_class,
+            repo,
+            prof_and_mt_info.languages,
+            prof_and_mt_info.sort_rows,
+        )
+
+    return await cached_response(
+        negotiated_cache_key(request, prof_and_mt_info),
+        render,
+        response_tags(request, str(uri)),
     )
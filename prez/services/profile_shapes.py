@@ -0,0 +1,123 @@
+import logging
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from rdflib import Graph, SH, URIRef
+from rdflib.term import Node
+
+from prez.cache import profiles_graph_cache
+from prez.reference_data.prez_ns import ALTREXT
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BNODE_DEPTH = 2
+
+# not a term in rdflib's closed SHACL namespace
+SH_SEQUENCE_PATH = URIRef("http://www.w3.org/ns/shacl#sequencePath")
+
+
+class ProfileShape(NamedTuple):
+    """
+    The parts of a profile's node shapes for a class which are used to generate queries and render responses. Empty
+    shapes (no node shape in the profile targets the class) have None for the item predicates, meaning all predicates
+    are included, and empty listing predicates.
+    """
+
+    shape_bns: Tuple[Node, ...]
+    include_predicates: Optional[Tuple[Node, ...]]
+    exclude_predicates: Optional[Tuple[Node, ...]]
+    inverse_predicates: Optional[Tuple[Node, ...]]
+    sequence_predicates: Optional[Tuple[Tuple[Node, ...], ...]]
+    child_to_focus: Tuple[Node, ...]
+    parent_to_focus: Tuple[Node, ...]
+    focus_to_child: Tuple[Node, ...]
+    focus_to_parent: Tuple[Node, ...]
+    relative_properties: Tuple[Node, ...]
+    bnode_depth: int
+
+
+def compile_profile_shape(
+    graph: Graph, profile: Optional[URIRef], selected_class: Optional[URIRef]
+) -> ProfileShape:
+    """Reads the node shapes of a profile which target a class from the profiles graph."""
+    bnode_depth = DEFAULT_BNODE_DEPTH
+    shape_bns = ()
+    if profile:
+        bnode_depth = int(
+            graph.value(profile, ALTREXT.hasBNodeDepth, None, default=bnode_depth)
+        )
+        profile_shape_bns = list(graph.objects(profile, ALTREXT.hasNodeShape))
+        if profile_shape_bns:
+            shape_bns = tuple(
+                triple[0]
+                for triple in graph.triples_choices(
+                    (profile_shape_bns, SH.targetClass, selected_class)
+                )
+            )
+    if not shape_bns:
+        log.info(
+            f"No special predicates (include/exclude/inverse/sequence) found for class {selected_class} in profile "
+            f"{profile}. Default behaviour is to include all predicates, and blank nodes to a depth of two."
+        )
+        return ProfileShape(
+            shape_bns, None, None, None, None, (), (), (), (), (), bnode_depth
+        )
+
+    def shape_objects(predicate) -> tuple:
+        return tuple(
+            triple[2]
+            for triple in graph.triples_choices((list(shape_bns), predicate, None))
+        )
+
+    return ProfileShape(
+        shape_bns=shape_bns,
+        include_predicates=shape_objects(SH.path),
+        exclude_predicates=shape_objects(ALTREXT.exclude),
+        inverse_predicates=shape_objects(SH.inversePath),
+        sequence_predicates=tuple(
+            tuple(graph.items(sequence_node))
+            for sequence_node in shape_objects(SH_SEQUENCE_PATH)
+        ),
+        child_to_focus=shape_objects(ALTREXT.childToFocus),
+        parent_to_focus=shape_objects(ALTREXT.parentToFocus),
+        focus_to_child=shape_objects(ALTREXT.focusToChild),
+        focus_to_parent=shape_objects(ALTREXT.focusToParent),
+        relative_properties=shape_objects(ALTREXT.relativeProperties),
+        bnode_depth=bnode_depth,
+    )
+
+
+def clear_profile_shapes():
+    """
+    Clears the compiled profile shapes. Must be called whenever the profiles graph cache changes, see
+    rebuild_system_indexes.
+    """
+    _compiled_profile_shape.cache_clear()
+    _profile_cbd.cache_clear()
+
+
+def get_profile_shape(
+    profile: Optional[URIRef], selected_class: Optional[URIRef]
+) -> ProfileShape:
+    """Returns the compiled shape of a profile for a class, compiling it on first use."""
+    return _compiled_profile_shape(profile, selected_class)
+
+
+@lru_cache(maxsize=1024)
+def _compiled_profile_shape(
+    profile: Optional[URIRef], selected_class: Optional[URIRef]
+) -> ProfileShape:
+    return compile_profile_shape(profiles_graph_cache, profile, selected_class)
+
+
+def get_profile_cbd(profile: URIRef) -> Graph:
+    """
+    Returns the concise bounded description of a profile from the profiles graph, read on first use. The graph is
+    shared between requests, so must not be modified.
+    """
+    return _profile_cbd(profile)
+
+
+@lru_cache(maxsize=128)
+def _profile_cbd(profile: URIRef) -> Graph:
+    return profiles_graph_cache.cbd(profile)
@@ -0,0 +1,55 @@
+import logging
+from contextvars import ContextVar
+from time import perf_counter
+from typing import AsyncIterator, Dict, Optional
+
+log = logging.getLogger(__name__)
+
+# name -> seconds spent in that part of the current request, reported in the Server-Timing response header, and logged
+# once the response has been sent
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def record_timing(name: str, seconds: float):
+    """Adds to the time spent in a part of the current request. Does nothing outside of a request."""
+    timings = request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+class timed:
+    """A context manager which records the time spent in its body, see record_timing."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_timing(self.name, perf_counter() - self.start)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items()
+    )
+
+
+async def log_timings(
+    body: AsyncIterator[bytes], request: str, timings: Dict[str, float], start: float
+) -> AsyncIterator[bytes]:
+    """
+    Passes a response body through, then logs the request's timings at debug level, with those recorded while the body
+    was produced, such as the serialization of a streamed response, and the total time, which the Server-Timing header,
+    sent before the body, cannot include.
+    """
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        timings["total"] = perf_counter() - start
+        log.debug(f"{request}: {server_timing_header(timings)}")
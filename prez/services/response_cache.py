@@ -0,0 +1,404 @@
+import asyncio
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from pathlib import Path
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from prez.config import settings
+from prez.models.profiles_and_mediatypes import ProfilesMediatypesInfo
+from prez.services.bounded_cache import BoundedLRUCache
+from prez.services.cache_policy import surrogate_keys
+from prez.services.compression import PrecompressedResponse, compress_variants
+from prez.services.conditional_requests import ConditionalRequest, conditional_request
+from prez.services.worker_pool import offload
+
+log = logging.getLogger(__name__)
+
+# headers which are not stored, as they describe a single transfer of a response rather than the response
+UNCACHED_HEADERS = {"content-length", "content-encoding", "transfer-encoding"}
+
+# query parameters which select the profile and mediatype, which are in a response's key once resolved
+CONNEG_QUERY_PARAMETERS = {"_profile", "_mediatype"}
+
+
+class CachedResponse(NamedTuple):
+    """
+    A rendered response: its status, headers and body, the body compressed in each available content coding, the tags
+    it can be purged by, and the (wall clock) times until which it is fresh, and may be served stale while it is
+    refreshed.
+    """
+
+    key: tuple
+    status_code: int
+    headers: Tuple[Tuple[str, str], ...]
+    body: bytes
+    variants: Dict[str, bytes]
+    tags: FrozenSet[str]
+    fresh_until: float
+    stale_until: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(variant) for variant in self.variants.values())
+
+    def response(self) -> Response:
+        return PrecompressedResponse(
+            self.body,
+            self.variants,
+            status_code=self.status_code,
+            headers=dict(self.headers),
+        )
+
+
+def response_cache_key(request: Request, profile, mediatype, *variant) -> tuple:
+    """
+    The key a response is cached under: its route, path parameters and query parameters, sorted, with the resolved
+    profile and mediatype in place of the parameters requesting them, the variant - such as the languages - it was
+    rendered in, and settings.data_version.
+    """
+    query = sorted(
+        (name, value)
+        for name, value in request.query_params.multi_items()
+        if name not in CONNEG_QUERY_PARAMETERS
+    )
+    return (
+        request.scope["route"].name,
+        tuple(sorted(request.path_params.items())),
+        tuple(query),
+        str(profile),
+        str(mediatype),
+        *variant,
+        settings.data_version,
+    )
+
+
+def negotiated_cache_key(
+    request: Request, prof_and_mt_info: ProfilesMediatypesInfo
+) -> tuple:
+    """The key a response is cached under once its profile, mediatype, languages and row order are negotiated."""
+    return response_cache_key(
+        request,
+        prof_and_mt_info.profile,
+        prof_and_mt_info.mediatype,
+        prof_and_mt_info.languages,
+        prof_and_mt_info.sort_rows,
+    )
+
+
+def response_tags(request: Request, *extra: str) -> FrozenSet[str]:
+    """
+    The tags a response can be purged by: each prefix of its path - so "/s/datasets/ds1" purges every response under
+    that dataset - its surrogate keys, so a purge of the CDN can be repeated here, and any extra tags, such as the IRI
+    of the object it describes.
+    """
+    segments = request.url.path.rstrip("/").split("/")
+    prefixes = {"/".join(segments[: i + 1]) for i in range(1, len(segments))}
+    return frozenset({*prefixes, *surrogate_keys(request.scope), *extra})
+
+
+class DiskEntry(NamedTuple):
+    """
+    A response cached on disk: its size, and its key and the tags it can be purged by, which are None for an entry found
+    on disk at startup until it is read.
+    """
+
+    size: int
+    key: Optional[tuple]
+    tags: Optional[FrozenSet[str]]
+
+
+class ResponseCache:
+    """
+    A cache of rendered responses, bounded by number and size in memory, with an optional tier on disk which survives
+    restarts. Responses are fresh for ttl seconds, then may be served stale for stale_ttl seconds while they are
+    rendered again in the background. Entries are stored with the compressed variants of their bodies, so a hit is
+    never compressed again, and can be purged by tag.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        disk_path: Optional[str] = None,
+        disk_max_bytes: int = 0,
+    ):
+        self.memory = BoundedLRUCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            sizeof=lambda entry: entry.size,
+        )
+        self.disk_path = Path(disk_path) if disk_path else None
+        self.disk_max_bytes = disk_max_bytes
+        # file name -> entry, least recently written first. Only changed on the event loop; worker threads only read and
+        # write files.
+        self.disk_index: OrderedDict[str, DiskEntry] = OrderedDict()
+        self.disk_bytes = 0
+        # file name -> the number of writes of it in worker threads
+        self.disk_writes: Dict[str, int] = {}
+        if self.disk_path is not None:
+            self.disk_path.mkdir(parents=True, exist_ok=True)
+            files = sorted(self.disk_path.glob("*.pickle"), key=os.path.getmtime)
+            for file in files:
+                self._index(file.name, DiskEntry(file.stat().st_size, None, None))
+        # keys of the entries being rendered again, and the tasks rendering them
+        self.revalidating = set()
+        self.tasks = set()
+        self.counts = {"fresh_hits": 0, "stale_hits": 0, "disk_hits": 0, "purged": 0}
+
+    @staticmethod
+    def _file_name(key: tuple) -> str:
+        return (
+            f"{blake2b(repr(key).encode('utf-8'), digest_size=20).hexdigest()}.pickle"
+        )
+
+    async def get(self, key: tuple) -> Optional[CachedResponse]:
+        """Returns an entry which is fresh, or may be served stale, from memory, or from disk into memory."""
+        entry = self.memory.get(key)
+        if entry is None and self.disk_path is not None:
+            name = self._file_name(key)
+            if name in self.disk_index:
+                entry = await asyncio.to_thread(self._read, name)
+                if entry is not None and entry.key == key:
+                    self.counts["disk_hits"] += 1
+                    self.memory.set(key, entry)
+                else:
+                    entry = None
+        if entry is None or entry.stale_until <= time.time():
+            return None
+        return entry
+
+    def _read(self, name: str) -> Optional[CachedResponse]:
+        try:
+            return pickle.loads((self.disk_path / name).read_bytes())
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    async def set(self, entry: CachedResponse):
+        self.memory.set(entry.key, entry)
+        if self.disk_path is not None and entry.size <= self.disk_max_bytes:
+            name = self._file_name(entry.key)
+            self.disk_writes[name] = self.disk_writes.get(name, 0) + 1
+            try:
+                size = await asyncio.to_thread(self._write, name, entry)
+            finally:
+                self.disk_writes[name] -= 1
+                if not self.disk_writes[name]:
+                    del self.disk_writes[name]
+            self._index(name, DiskEntry(size, entry.key, entry.tags))
+            while self.disk_bytes > self.disk_max_bytes:
+                self._remove_file(next(iter(self.disk_index)))
+
+    def _write(self, name: str, entry: CachedResponse) -> int:
+        """Writes an entry to disk, in a worker thread, returning its size. The index is updated by the caller."""
+        data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        # named for the thread, so concurrent writes of the same entry do not write the same temporary file
+        temporary = self.disk_path / f"{name}.{threading.get_ident()}.tmp"
+        temporary.write_bytes(data)
+        temporary.replace(self.disk_path / name)
+        return len(data)
+
+    def _index(self, name: str, entry: DiskEntry):
+        previous = self.disk_index.pop(name, None)
+        if previous is not None:
+            self.disk_bytes -= previous.size
+        self.disk_index[name] = entry
+        self.disk_bytes += entry.size
+
+    async def purge(self, tags: Iterable[str]) -> int:
+        """
+        Removes the responses with any of the tags, from memory and disk, by the tags in the disk index. The entries on
+        disk from before a restart, whose tags are not yet known, are read in a worker thread. Returns the number
+        removed.
+        """
+        tags = set(tags)
+        removed = set()
+        for key in list(self.memory.keys()):
+            if tags & self.memory.peek(key).tags:
+                self.memory.pop(key)
+                removed.add(key)
+        if self.disk_path is not None:
+            unread = [
+                name for name, entry in self.disk_index.items() if entry.tags is None
+            ]
+            if unread:
+                entries = await asyncio.to_thread(
+                    lambda: {name: self._read(name) for name in unread}
+                )
+                for name, entry in entries.items():
+                    indexed = self.disk_index.get(name)
+                    if indexed is None or indexed.tags is not None:
+                        continue
+                    if entry is None:
+                        self._remove_file(name)
+                    else:
+                        # in place, so the entry keeps its place in the eviction order
+                        self.disk_index[name] = indexed._replace(
+                            key=entry.key, tags=entry.tags
+                        )
+            for name, entry in list(self.disk_index.items()):
+                if tags & entry.tags:
+                    self._remove_file(name)
+                    removed.add(entry.key)
+        self.counts["purged"] += len(removed)
+        return len(removed)
+
+    def _remove_file(self, name: str):
+        entry = self.disk_index.pop(name, None)
+        if entry is not None:
+            self.disk_bytes -= entry.size
+        # a file being written again is left to the write, which indexes it once it is written
+        if name not in self.disk_writes:
+            (self.disk_path / name).unlink(missing_ok=True)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk_path is not None:
+            for name in list(self.disk_index):
+                self._remove_file(name)
+
+    def stats(self) -> dict:
+        return {
+            **self.memory.stats(),
+            **self.counts,
+            "disk_entries": len(self.disk_index),
+            "disk_bytes": self.disk_bytes,
+        }
+
+
+response_cache = ResponseCache(
+    max_entries=settings.response_cache_max_entries,
+    max_bytes=settings.response_cache_max_bytes,
+    disk_path=settings.response_cache_path,
+    disk_max_bytes=settings.response_cache_disk_max_bytes,
+)
+
+
+async def _body(response: Response) -> bytes:
+    if not isinstance(response, StreamingResponse):
+        return response.body
+    return b"".join(
+        [
+            chunk if isinstance(chunk, bytes) else chunk.encode(response.charset)
+            async for chunk in response.body_iterator
+        ]
+    )
+
+
+async def _store(
+    key: tuple, response: Response, body: bytes, tags: FrozenSet[str]
+) -> CachedResponse:
+    variants = await offload(
+        len(body), settings.offload_min_bytes, compress_variants, body
+    )
+    now = time.time()
+    entry = CachedResponse(
+        key,
+        response.status_code,
+        tuple(
+            (name, value)
+            for name, value in response.headers.items()
+            if name not in UNCACHED_HEADERS
+        ),
+        body,
+        variants,
+        tags,
+        now + settings.response_cache_ttl,
+        now + settings.response_cache_ttl + settings.response_cache_stale_ttl,
+    )
+    await response_cache.set(entry)
+    return entry
+
+
+def _caching(
+    key: tuple, response: StreamingResponse, tags: FrozenSet[str]
+) -> StreamingResponse:
+    """Streams a response as it is rendered, storing it once complete unless it exceeds the maximum entry size."""
+    body_iterator = response.body_iterator
+
+    async def stream():
+        chunks, size = [], 0
+        async for chunk in body_iterator:
+            if not isinstance(chunk, bytes):
+                chunk = chunk.encode(response.charset)
+            if chunks is not None:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > settings.response_cache_max_entry_bytes:
+                    chunks = None
+            yield chunk
+        if chunks is not None:
+            try:
+                await _store(key, response, b"".join(chunks), tags)
+            except Exception as err:
+                log.warning(f"Could not cache response {key}: {err}")
+
+    response.body_iterator = stream()
+    return response
+
+
+async def _revalidate(
+    key: tuple, render: Callable[[], Awaitable[Response]], tags: FrozenSet[str]
+):
+    # rendered in full, as no request awaits it, and without the conditional headers of the request which found it stale,
+    # but as a request for the same representation, so it has the same data version ETag
+    request = conditional_request.get()
+    if request is not None:
+        conditional_request.set(ConditionalRequest(request.key, None))
+    try:
+        response = await render()
+        if response.status_code == 200:
+            await _store(key, response, await _body(response), tags)
+    except Exception as err:
+        log.warning(f"Could not refresh cached response {key}: {err}")
+    finally:
+        response_cache.revalidating.discard(key)
+
+
+async def cached_response(
+    key: tuple, render: Callable[[], Awaitable[Response]], tags: FrozenSet[str]
+) -> Response:
+    """
+    Returns the cached response for a key, or renders and caches it. A fresh response is returned as it is cached; a
+    stale one is returned while it is rendered again in the background. Successful responses are cached as they are
+    streamed. Does nothing but render if settings.response_cache_ttl is unset.
+    """
+    if settings.response_cache_ttl is None:
+        return await render()
+    entry = await response_cache.get(key)
+    if entry is not None:
+        if entry.fresh_until > time.time():
+            response_cache.counts["fresh_hits"] += 1
+        else:
+            response_cache.counts["stale_hits"] += 1
+            if key not in response_cache.revalidating:
+                response_cache.revalidating.add(key)
+                task = asyncio.create_task(_revalidate(key, render, tags))
+                response_cache.tasks.add(task)
+                task.add_done_callback(response_cache.tasks.discard)
+        return entry.response()
+
+    response = await render()
+    if response.status_code != 200:
+        return response
+    if isinstance(response, StreamingResponse):
+        return _caching(key, response, tags)
+    if len(response.body) <= settings.response_cache_max_entry_bytes:
+        await _store(key, response, response.body, tags)
+    return response
@@ -17,6 +17,10 @@ async def get_all_search_methods(repo):
 
 
 async def get_remote_search_methods(repo):
+    await add_remote_search_methods(await fetch_remote_search_methods(repo))
+
+
+async def fetch_remote_search_methods(repo) -> Graph:
     remote_search_methods_query = f"""
     PREFIX prez: <{PREZ}>
     CONSTRUCT {{?s ?p ?o}}
@@ -24,22 +28,26 @@ async def get_remote_search_methods(repo):
                ?p ?o . }}
     """
     graph, _ = await repo.send_queries([remote_search_methods_query], [])
+    return graph
+
+
+async def add_remote_search_methods(graph: Graph, methods: dict = search_methods):
     if len(graph) > 1:
-        await generate_search_methods(graph)
+        await generate_search_methods(graph, methods)
         log.info(f"Remote search methods found and added.")
     else:
         log.info("No remote search methods found.")
 
 
-async def get_local_search_methods():
+async def get_local_search_methods(methods: dict = search_methods):
     for f in (Path(__file__).parent.parent / "reference_data/search_methods").glob(
         "*.ttl"
     ):
         g = Graph().parse(f, format="ttl")
-        await generate_search_methods(g)
+        await generate_search_methods(g, methods)
 
 
-async def generate_search_methods(g):
+async def generate_search_methods(g, methods: dict = search_methods):
     uri = g.value(None, RDF.type, PREZ.SearchMethod)
     identifier = g.value(uri, DCTERMS.identifier, None)
     title: Literal = g.value(uri, RDFS.label, None)
@@ -47,4 +55,4 @@ async def generate_search_methods(g):
     sm = SearchMethod(
         uri=uri, identifier=identifier, title=title, template_query=template_query
     )
-    search_methods.update({identifier: sm})
+    methods.update({identifier: sm})
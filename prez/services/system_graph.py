@@ -0,0 +1,281 @@
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pyoxigraph import NamedNode, Quad, QuerySolutions, QueryTriples, Store
+from rdflib import BNode, Graph, RDF, URIRef, Variable
+from rdflib.query import Result
+from rdflib.term import Node
+
+from prez.services.request_timing import record_timing
+from prez.sparql.terms import from_oxigraph_term, to_oxigraph_term
+
+Triple = Tuple[Node, Node, Node]
+TriplePattern = Tuple[Optional[Node], Optional[Node], Optional[Node]]
+
+
+class _ParseOrderGraph(Graph):
+    """A Graph which records the order its triples were added in by a parser."""
+
+    def __init__(self):
+        super().__init__()
+        self.parsed: List[Triple] = []
+
+    def add(self, triple: Triple):
+        self.parsed.append(triple)
+        return super().add(triple)
+
+
+class SystemGraph:
+    """
+    One named graph of the system store (Prez's profiles or endpoint definitions), with the subset of RDFLib's Graph
+    API Prez uses for lookups, so the system data is held once, in Oxigraph, and is also queryable by the system repo.
+    Terms are converted to and from RDFLib terms. Queries are evaluated by Oxigraph, with the graph as the default
+    graph.
+
+    The order in which triples were added is tracked on writes, and lookups return triples in that order, as RDFLib's
+    memory store does - the order of a profile's predicates, for example, is the order of the columns of a listing.
+    Triples written to the store directly (with Store.load, for example) are read too, after the tracked triples, in
+    the store's order.
+    """
+
+    def __init__(self, store: Store, identifier: URIRef):
+        self.store = store
+        self.identifier = identifier
+        self._graph_name = NamedNode(identifier)
+        self._positions: Dict[Quad, int] = {}
+        self._next_position = 0
+        self._namespaces: Dict[str, URIRef] = {}
+
+    def _quads(self, pattern: TriplePattern) -> List[Quad]:
+        s, p, o = (None if term is None else to_oxigraph_term(term) for term in pattern)
+        quads = list(self.store.quads_for_pattern(s, p, o, self._graph_name))
+        if len(quads) > 1:
+            # quads written to the store directly have no position, and sort last
+            quads.sort(key=lambda quad: self._positions.get(quad, self._next_position))
+        return quads
+
+    def triples(self, pattern: TriplePattern = (None, None, None)) -> Iterator[Triple]:
+        for quad in self._quads(pattern):
+            yield (
+                from_oxigraph_term(quad.subject),
+                from_oxigraph_term(quad.predicate),
+                from_oxigraph_term(quad.object),
+            )
+
+    def triples_choices(
+        self,
+        pattern: Tuple[
+            Union[Node, List[Node], None],
+            Union[Node, List[Node], None],
+            Union[Node, List[Node], None],
+        ],
+    ) -> Iterator[Triple]:
+        """Like triples, but one of the terms of the pattern may be a list of alternatives."""
+        for i, choices in enumerate(pattern):
+            if isinstance(choices, (list, tuple, set, frozenset)):
+                for choice in choices:
+                    yield from self.triples(pattern[:i] + (choice,) + pattern[i + 1 :])
+                return
+        yield from self.triples(pattern)
+
+    def __iter__(self) -> Iterator[Triple]:
+        return self.triples()
+
+    def __contains__(self, triple: Triple) -> bool:
+        s, p, o = (None if term is None else to_oxigraph_term(term) for term in triple)
+        return (
+            next(self.store.quads_for_pattern(s, p, o, self._graph_name), None)
+            is not None
+        )
+
+    def __len__(self) -> int:
+        return sum(
+            1 for _ in self.store.quads_for_pattern(None, None, None, self._graph_name)
+        )
+
+    def value(
+        self,
+        subject: Optional[Node] = None,
+        predicate: Optional[Node] = RDF.value,
+        object: Optional[Node] = None,
+        default=None,
+    ) -> Optional[Node]:
+        """Returns the missing term of the first triple matching two given terms, or default if none match."""
+        position = (subject, predicate, object).index(None)
+        for triple in self.triples((subject, predicate, object)):
+            return triple[position]
+        return default
+
+    def subjects(
+        self,
+        predicate: Optional[Node] = None,
+        object: Optional[Node] = None,
+        unique: bool = False,
+    ) -> Iterator[Node]:
+        subjects = (s for s, _, _ in self.triples((None, predicate, object)))
+        return iter(dict.fromkeys(subjects)) if unique else subjects
+
+    def objects(
+        self,
+        subject: Optional[Node] = None,
+        predicate: Optional[Node] = None,
+        unique: bool = False,
+    ) -> Iterator[Node]:
+        objects = (o for _, _, o in self.triples((subject, predicate, None)))
+        return iter(dict.fromkeys(objects)) if unique else objects
+
+    def subject_objects(
+        self, predicate: Optional[Node] = None
+    ) -> Iterator[Tuple[Node, Node]]:
+        return ((s, o) for s, _, o in self.triples((None, predicate, None)))
+
+    def predicate_objects(
+        self, subject: Optional[Node] = None
+    ) -> Iterator[Tuple[Node, Node]]:
+        return ((p, o) for _, p, o in self.triples((subject, None, None)))
+
+    def transitive_objects(self, subject: Node, predicate: Node) -> Iterator[Node]:
+        """The subject, and the objects reachable from it by one or more predicate links."""
+        seen = set()
+        to_visit = [subject]
+        while to_visit:
+            node = to_visit.pop()
+            if node not in seen:
+                seen.add(node)
+                yield node
+                to_visit.extend(self.objects(node, predicate))
+
+    def items(self, list_node: Node) -> Iterator[Node]:
+        """The members of an RDF list."""
+        seen = set()
+        while list_node and list_node != RDF.nil and list_node not in seen:
+            seen.add(list_node)
+            item = self.value(list_node, RDF.first)
+            if item is not None:
+                yield item
+            list_node = self.value(list_node, RDF.rest)
+
+    def cbd(self, resource: Node) -> Graph:
+        """The concise bounded description of a resource: its triples, and those of the blank nodes it refers to."""
+        graph = Graph()
+        to_describe = [resource]
+        while to_describe:
+            subject = to_describe.pop()
+            for triple in self.triples((subject, None, None)):
+                if triple not in graph and isinstance(triple[2], BNode):
+                    to_describe.append(triple[2])
+                graph.add(triple)
+        return graph
+
+    def query(self, query: str) -> Result:
+        """
+        Evaluates a SPARQL query with Oxigraph, with this graph as the default graph, returning an RDFLib Result. The
+        time taken is recorded as "system-query" in the request's timings.
+        """
+        start = perf_counter()
+        results = self.store.query(query, default_graph=self._graph_name)
+        if isinstance(results, QueryTriples):
+            result = Result("CONSTRUCT")
+            result.graph = Graph()
+            result.graph.addN(
+                (
+                    from_oxigraph_term(t.subject),
+                    from_oxigraph_term(t.predicate),
+                    from_oxigraph_term(t.object),
+                    result.graph,
+                )
+                for t in results
+            )
+        elif isinstance(results, QuerySolutions):
+            result = Result("SELECT")
+            result.vars = [Variable(v.value) for v in results.variables]
+            result.bindings = [
+                {
+                    var: from_oxigraph_term(value)
+                    for var, value in zip(result.vars, solution)
+                    if value is not None
+                }
+                for solution in results
+            ]
+        else:
+            result = Result("ASK")
+            result.askAnswer = results
+        record_timing("system-query", perf_counter() - start)
+        return result
+
+    def bind(self, prefix: str, namespace: Union[str, URIRef]):
+        self._namespaces[prefix] = URIRef(namespace)
+
+    def namespaces(self) -> Iterator[Tuple[str, URIRef]]:
+        yield from self._namespaces.items()
+
+    def to_graph(self) -> Graph:
+        graph = Graph()
+        for prefix, namespace in self.namespaces():
+            graph.bind(prefix, namespace)
+        graph.addN((s, p, o, graph) for s, p, o in self.triples())
+        return graph
+
+    def serialize(self, *args, **kwargs):
+        return self.to_graph().serialize(*args, **kwargs)
+
+    def _to_quad(self, triple: Triple) -> Quad:
+        s, p, o = (to_oxigraph_term(term) for term in triple)
+        return Quad(s, p, o, self._graph_name)
+
+    def _track(self, quads: Iterable[Quad]) -> List[Quad]:
+        """Records the position of each quad not already in the graph, returning those quads."""
+        new_quads = []
+        for quad in quads:
+            if quad not in self._positions:
+                self._positions[quad] = self._next_position
+                self._next_position += 1
+                new_quads.append(quad)
+        return new_quads
+
+    def add(self, triple: Triple):
+        for quad in self._track([self._to_quad(triple)]):
+            self.store.add(quad)
+
+    def add_triples(self, triples: Iterable[Triple]):
+        self.store.extend(self._track(self._to_quad(triple) for triple in triples))
+
+    def __iadd__(self, triples: Iterable[Triple]):
+        self.add_triples(triples)
+        return self
+
+    def remove(self, pattern: TriplePattern):
+        for quad in self._quads(pattern):
+            self.store.remove(quad)
+            self._positions.pop(quad, None)
+
+    def parse(self, source=None, **kwargs):
+        """Parses a file (or other source RDFLib can parse) into the graph, in the order the triples were parsed."""
+        graph = _ParseOrderGraph().parse(source, **kwargs)
+        self.add_triples(graph.parsed)
+        for prefix, namespace in graph.namespaces():
+            self._namespaces.setdefault(prefix, namespace)
+        return self
+
+    def staging(self) -> "SystemGraph":
+        """An empty graph with the same identifier in a store of its own, in which replacement contents are built."""
+        graph = SystemGraph(Store(), self.identifier)
+        graph._namespaces = dict(self._namespaces)
+        return graph
+
+    def replace(self, triples: Iterable[Triple]):
+        """
+        Replaces the contents of the graph, keeping the order of the given triples. The new triples are added before
+        the old ones are removed, so concurrent queries never see a partially emptied graph.
+        """
+        positions = {}
+        for triple in triples:
+            positions.setdefault(self._to_quad(triple), len(positions))
+        self.store.extend([quad for quad in positions if quad not in self._positions])
+        for quad in list(
+            self.store.quads_for_pattern(None, None, None, self._graph_name)
+        ):
+            if quad not in positions:
+                self.store.remove(quad)
+        self._positions = positions
+        self._next_position = len(positions)
@@ -0,0 +1,16 @@
+from prez.services.conneg_table import rebuild_conneg_table
+from prez.services.endpoint_index import rebuild_endpoint_index
+from prez.services.profile_shapes import clear_profile_shapes
+from prez.sparql.objects_listings import clear_query_templates
+
+
+def rebuild_system_indexes():
+    """
+    Rebuilds what is compiled from the profiles and endpoints graph caches: the conneg table and endpoint template
+    index, and the compiled profile shapes and query templates. Must be called whenever either graph cache changes, as
+    they are not checked for changes when used.
+    """
+    rebuild_conneg_table()
+    clear_profile_shapes()
+    clear_query_templates()
+    rebuild_endpoint_index()
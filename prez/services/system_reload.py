@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import logging
+from typing import Dict
+
+from rdflib import Graph
+from rdflib.compare import to_isomorphic
+
+from prez.cache import (
+    endpoints_graph_cache,
+    links_ids_graph_cache,
+    links_store,
+    prez_system_graph,
+    profiles_graph_cache,
+    search_methods,
+    validator_cache,
+)
+from prez.config import settings
+from prez.services.app_service import (
+    build_endpoints_graph,
+    get_remote_endpoint_definitions,
+    add_api_info,
+)
+from prez.services.generate_profiles import (
+    build_profiles_graph,
+    get_remote_profiles,
+)
+from prez.services.link_materialization import materialize_links
+from prez.services.response_cache import response_cache
+from prez.services.search_methods import (
+    add_remote_search_methods,
+    fetch_remote_search_methods,
+    get_local_search_methods,
+)
+from prez.services.system_indexes import rebuild_system_indexes
+from prez.sparql.methods import Repo
+
+log = logging.getLogger(__name__)
+
+_reload_lock = asyncio.Lock()
+
+# system definition ("profiles", "endpoints", "search_methods") -> content hash of the definitions last loaded from
+# the triplestore
+_loaded_hashes: Dict[str, str] = {}
+
+
+def graph_hash(graph: Graph) -> str:
+    """A content hash of a graph, which is the same for isomorphic graphs (i.e. independent of blank node labels)."""
+    return hashlib.sha256(str(to_isomorphic(graph).graph_digest()).encode()).hexdigest()
+
+
+async def get_remote_system_definitions(repo: Repo) -> Dict[str, Graph]:
+    profiles, endpoints, methods = await asyncio.gather(
+        get_remote_profiles(repo),
+        get_remote_endpoint_definitions(repo),
+        fetch_remote_search_methods(repo),
+    )
+    return {"profiles": profiles, "endpoints": endpoints, "search_methods": methods}
+
+
+async def record_system_definitions(repo: Repo):
+    """Records the content hashes of the system definitions in the triplestore, as loaded at startup."""
+    remote = await get_remote_system_definitions(repo)
+    _loaded_hashes.update({name: graph_hash(g) for name, g in remote.items()})
+
+
+async def reload_system_definitions(repo: Repo, force: bool = False) -> list:
+    """
+    Reloads the profiles, endpoint definitions and search methods, from the local reference data and the triplestore,
+    if the definitions in the triplestore have changed (by content hash) or if forced. Returns the names of the system
+    definitions which were reloaded.
+
+    The new system graphs are built before any are replaced, and then replaced without yielding to the event loop, so
+    requests see either the old or the new definitions. The system repo's queries, which run in threads, may see both
+    for the moment a system graph is being replaced, but never neither. Only the caches derived from the reloaded
+    definitions are invalidated: the conneg table, compiled profile shapes and query templates for profiles; the endpoint template
+    index and internal links for endpoints; and, for either, the cached responses.
+    """
+    async with _reload_lock:
+        remote = await get_remote_system_definitions(repo)
+        hashes = {name: graph_hash(g) for name, g in remote.items()}
+        changed = [
+            name
+            for name, digest in hashes.items()
+            if _loaded_hashes.get(name) != digest
+        ]
+        if force:
+            changed = list(hashes)
+        if not changed:
+            log.info("System definitions unchanged")
+            return []
+
+        new_profiles = new_endpoints = new_methods = None
+        if "profiles" in changed:
+            new_profiles = build_profiles_graph(
+                remote["profiles"], profiles_graph_cache.staging()
+            )
+        if "endpoints" in changed:
+            new_endpoints = build_endpoints_graph(
+                remote["endpoints"], endpoints_graph_cache.staging()
+            )
+        if "search_methods" in changed:
+            new_methods = {}
+            await get_local_search_methods(new_methods)
+            await add_remote_search_methods(remote["search_methods"], new_methods)
+
+        # no awaits from here on, so no request sees partially reloaded definitions
+        if new_profiles is not None:
+            profiles_graph_cache.replace(new_profiles)
+            prez_system_graph.remove((None, None, None))
+            add_api_info()
+        if new_endpoints is not None:
+            endpoints_graph_cache.replace(new_endpoints)
+            links_ids_graph_cache.clear()
+            links_store.clear()
+        if new_profiles is not None or new_endpoints is not None:
+            rebuild_system_indexes()
+            # cached validators would answer 304 for the representations rendered from the old definitions
+            response_cache.clear()
+            validator_cache.clear()
+        if new_methods is not None:
+            search_methods.clear()
+            search_methods.update(new_methods)
+        _loaded_hashes.update(hashes)
+        log.info(f"Reloaded system definitions: {', '.join(changed)}")
+
+    if new_endpoints is not None and settings.materialize_links:
+        # links are generated on request until materialization completes
+        asyncio.create_task(materialize_links(repo))
+    return changed
+
+
+async def poll_system_definitions(repo: Repo, interval: float):
+    """Periodically reloads the system definitions if they have changed in the triplestore."""
+    await record_system_definitions(repo)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await reload_system_definitions(repo)
+        except Exception:
+            log.exception("Failed to check system definitions for changes")
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+from prez.config import settings
+from prez.services.request_timing import timed
+
+log = logging.getLogger(__name__)
+
+_thread_executor: Optional[ThreadPoolExecutor] = None
+_process_executor: Optional[ProcessPoolExecutor] = None
+
+# the number of jobs run in the worker pool, and on the event loop because they were below the size threshold
+offload_counts = {"offloaded": 0, "inline": 0}
+
+_DONE = object()
+
+
+def get_executor(process_safe: bool = True) -> Executor:
+    """
+    The worker pool CPU-bound work is offloaded to: a process pool if settings.offload_executor is "process" and the
+    work is process safe (its function and arguments can be pickled, and it does not depend on Prez's in-process
+    caches), otherwise a thread pool. Pools are created on first use.
+    """
+    global _thread_executor, _process_executor
+    if process_safe and settings.offload_executor == "process":
+        if _process_executor is None:
+            _process_executor = ProcessPoolExecutor(
+                max_workers=settings.offload_max_workers
+            )
+        return _process_executor
+    if _thread_executor is None:
+        _thread_executor = ThreadPoolExecutor(
+            max_workers=settings.offload_max_workers, thread_name_prefix="prez-worker"
+        )
+    return _thread_executor
+
+
+def shutdown_executors():
+    global _thread_executor, _process_executor
+    for executor in (_thread_executor, _process_executor):
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    _thread_executor = _process_executor = None
+
+
+async def offload(
+    size: int, threshold: int, func: Callable, *args, process_safe: bool = True
+):
+    """
+    Runs func(*args) in the worker pool if size (in whatever unit threshold is given in) is at least threshold,
+    otherwise on the event loop, where small jobs are cheaper to run than to hand off. The time spent is recorded as
+    "offload" in the request's timings.
+    """
+    if size < threshold:
+        offload_counts["inline"] += 1
+        return func(*args)
+    offload_counts["offloaded"] += 1
+    with timed("offload"):
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor(process_safe), partial(func, *args)
+        )
+
+
+def _consume(func: Callable[..., Iterator], *args) -> list:
+    return list(func(*args))
+
+
+async def iterate_offloaded(
+    size: int, threshold: int, func: Callable[..., Iterator], *args
+) -> AsyncIterator:
+    """
+    Iterates over func(*args) on the event loop if size is below threshold. Otherwise each item is produced in a worker
+    thread, or, with a process pool, the iterator is consumed in full in a worker process, as generators cannot be
+    shared between processes. The time spent producing items, but not consuming them, is recorded as "serialize" in
+    the request's timings.
+    """
+    if size < threshold:
+        offload_counts["inline"] += 1
+        with timed("serialize"):
+            iterator = func(*args)
+        while True:
+            with timed("serialize"):
+                item = next(iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item
+    offload_counts["offloaded"] += 1
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    if isinstance(executor, ProcessPoolExecutor):
+        with timed("serialize"):
+            items = await loop.run_in_executor(executor, partial(_consume, func, *args))
+        for item in items:
+            yield item
+        return
+    with timed("serialize"):
+        iterator = func(*args)
+    while True:
+        with timed("serialize"):
+            item = await loop.run_in_executor(executor, next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+
+def worker_pool_stats() -> dict:
+    return {
+        "executor": settings.offload_executor,
+        "max_workers": settings.offload_max_workers,
+        **offload_counts,
+    }
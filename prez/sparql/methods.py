@@ -1,4 +1,5 @@
 import asyncio
+import json
 import logging
 from abc import ABC, abstractmethod
 from typing import List
@@ -11,12 +12,19 @@ from fastapi.concurrency import run_in_threadpool
 from rdflib import Namespace, Graph, URIRef, Literal, BNode
 
 from prez.config import settings
+from prez.services.request_timing import timed
+from prez.services.worker_pool import offload
+from prez.sparql.terms import XSD_STRING
 
 PREZ = Namespace("https://prez.dev/")
 
 log = logging.getLogger(__name__)
 
 
+def parse_graph(data: bytes, format: str) -> Graph:
+    return Graph().parse(data=data, format=format)
+
+
 class Repo(ABC):
     @abstractmethod
     async def rdf_query_to_graph(self, query: str):
@@ -27,7 +35,7 @@ class Repo(ABC):
         pass
 
     async def send_queries(
-            self, rdf_queries: List[str], tabular_queries: List[Tuple[URIRef, str]] = None
+        self, rdf_queries: List[str], tabular_queries: List[Tuple[URIRef, str]] = None
     ):
         # Common logic to send both query types in parallel
         results = await asyncio.gather(
@@ -48,7 +56,9 @@ class Repo(ABC):
         return g, tabular_results
 
     @abstractmethod
-    def sparql(self, query: str, raw_headers: list[tuple[bytes, bytes]], method: str = "GET"):
+    def sparql(
+        self, query: str, raw_headers: list[tuple[bytes, bytes]], method: str = "GET"
+    ):
         pass
 
 
@@ -77,9 +87,14 @@ class RemoteSparqlRepo(Repo):
         Returns: rdflib.Graph: An RDFLib Graph object
         """
         response = await self._send_query(query)
-        g = Graph()
         await response.aread()
-        return g.parse(data=response.text, format="turtle")
+        return await offload(
+            len(response.content),
+            settings.offload_min_bytes,
+            parse_graph,
+            response.content,
+            "turtle",
+        )
 
     async def tabular_query_to_table(self, query: str, context: URIRef = None):
         """
@@ -112,10 +127,21 @@ class RemoteSparqlRepo(Repo):
 
 
 class PyoxigraphRepo(Repo):
-    def __init__(self, pyoxi_store: pyoxigraph.Store):
+    def __init__(
+        self, pyoxi_store: pyoxigraph.Store, union_default_graph: bool = False
+    ):
+        """union_default_graph: query the union of the store's named graphs as the default graph"""
         self.pyoxi_store = pyoxi_store
+        self.union_default_graph = union_default_graph
+
+    def _query(self, query: str):
+        return self.pyoxi_store.query(
+            query, use_default_graph_as_union=self.union_default_graph
+        )
 
-    def _handle_query_solution_results(self, results: pyoxigraph.QuerySolutions) -> dict:
+    def _handle_query_solution_results(
+        self, results: pyoxigraph.QuerySolutions
+    ) -> dict:
         """Organise the query results into format serializable by FastAPIs JSONResponse."""
         variables = results.variables
         results_dict = {"head": {"vars": [v.value for v in results.variables]}}
@@ -130,6 +156,13 @@ class PyoxigraphRepo(Repo):
                         "type": binding_type,
                         "value": binding.value,
                     }
+                    if binding_type == "literal":
+                        if binding.language:
+                            result_dict[str(var)[1:]]["xml:lang"] = binding.language
+                        elif binding.datatype != XSD_STRING:
+                            result_dict[str(var)[1:]][
+                                "datatype"
+                            ] = binding.datatype.value
             results_list.append(result_dict)
         results_dict["results"] = {"bindings": results_list}
         return results_dict
@@ -145,19 +178,19 @@ class PyoxigraphRepo(Repo):
         return g.parse(data=ntriples, format="ntriples")
 
     def _sync_rdf_query_to_graph(self, query: str) -> Graph:
-        results = self.pyoxi_store.query(query)
+        results = self._query(query)
         result_graph = self._handle_query_triples_results(results)
         return result_graph
 
     def _sync_tabular_query_to_table(self, query: str, context: URIRef = None) -> tuple:
-        results = self.pyoxi_store.query(query)
+        results = self._query(query)
         results_dict = self._handle_query_solution_results(results)
         # only return the bindings from the results.
         return context, results_dict["results"]["bindings"]
 
     def _sparql(self, query: str) -> dict | Graph | bool:
         """Submit a sparql query to the pyoxigraph store and return the formatted results."""
-        results = self.pyoxi_store.query(query)
+        results = self._query(query)
         if isinstance(results, pyoxigraph.QuerySolutions):  # a SELECT query result
             results_dict = self._handle_query_solution_results(results)
             return results_dict
@@ -178,7 +211,9 @@ class PyoxigraphRepo(Repo):
             self._sync_tabular_query_to_table, query, context
         )
 
-    async def sparql(self, query: str, raw_headers: list[tuple[bytes, bytes]], method: str = "") -> list | Graph | bool:
+    async def sparql(
+        self, query: str, raw_headers: list[tuple[bytes, bytes]], method: str = ""
+    ) -> list | Graph | bool:
         return self._sparql(query)
 
     @staticmethod
@@ -194,24 +229,37 @@ class PyoxigraphRepo(Repo):
 
 
 class OxrdflibRepo(Repo):
+    """
+    Queries an RDFLib graph backed by oxrdflib's Oxigraph store. Queries are sent as text rather than as prepared
+    queries: oxrdflib raises NotImplementedError for prepared queries, so RDFLib would evaluate them with its own, much
+    slower, engine, whereas Oxigraph parses query text natively. The time spent parsing and evaluating queries is
+    recorded as "oxrdflib-query" in the request's timings.
+    """
+
     def __init__(self, oxrdflib_graph: Graph):
         self.oxrdflib_graph = oxrdflib_graph
 
     def _sync_rdf_query_to_graph(self, query: str) -> Graph:
-        results = self.oxrdflib_graph.query(query)
+        with timed("oxrdflib-query"):
+            results = self.oxrdflib_graph.query(query)
         return results.graph
 
     def _sync_tabular_query_to_table(self, query: str, context: URIRef = None):
-        results = self.oxrdflib_graph.query(query)
         reformatted_results = []
-        for result in results:
-            reformatted_result = {}
-            for var in results.vars:
-                binding = result[var]
-                if binding:
-                    str_type = self._str_type_for_rdflib_type(binding)
-                    reformatted_result[str(var)] = {"type": str_type, "value": binding}
-            reformatted_results.append(reformatted_result)
+        with timed("oxrdflib-query"):
+            # SELECT results are evaluated lazily, as they are iterated over
+            results = self.oxrdflib_graph.query(query)
+            for result in results:
+                reformatted_result = {}
+                for var in results.vars:
+                    binding = result[var]
+                    if binding:
+                        str_type = self._str_type_for_rdflib_type(binding)
+                        reformatted_result[str(var)] = {
+                            "type": str_type,
+                            "value": binding,
+                        }
+                reformatted_results.append(reformatted_result)
         return context, reformatted_results
 
     async def rdf_query_to_graph(self, query: str) -> Graph:
@@ -222,6 +270,21 @@ class OxrdflibRepo(Repo):
             self._sync_tabular_query_to_table, query, context
         )
 
+    def _sparql(self, query: str) -> dict | Graph:
+        """Submit a sparql query to the oxrdflib graph and return the results formatted as PyoxigraphRepo does."""
+        with timed("oxrdflib-query"):
+            results = self.oxrdflib_graph.query(query)
+            if results.type == "CONSTRUCT" or results.type == "DESCRIBE":
+                return results.graph
+            if results.type == "ASK":
+                return {"head": {}, "boolean": results.askAnswer}
+            return json.loads(results.serialize(format="json"))
+
+    async def sparql(
+        self, query: str, raw_headers: list[tuple[bytes, bytes]], method: str = ""
+    ) -> dict | Graph:
+        return await run_in_threadpool(self._sparql, query)
+
     def _str_type_for_rdflib_type(self, instance):
         map = {URIRef: "uri", BNode: "bnode", Literal: "literal"}
         return map[type(instance)]
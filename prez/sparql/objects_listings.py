@@ -1,8 +1,7 @@
 import logging
 from functools import lru_cache
-from itertools import chain
 from textwrap import dedent
-from typing import List, Optional, Tuple, Dict, FrozenSet
+from typing import List, Optional, Tuple, Dict, FrozenSet, Set
 
 from rdflib import Graph, URIRef, Namespace, Literal
 
@@ -13,14 +12,16 @@ from prez.models.listing import ListingModel
 from prez.models.profiles_item import ProfileItem
 from prez.models.profiles_listings import ProfilesMembers
 from prez.reference_data.prez_ns import ONT
+from prez.services.connegp_service import get_default_languages
 from prez.services.curie_functions import get_uri_for_curie_id
+from prez.services.profile_shapes import get_profile_shape
+from prez.sparql.query_templates import QueryTemplate, integer, iri, slot
 
 log = logging.getLogger(__name__)
 
 ALTREXT = Namespace("http://www.w3.org/ns/dx/conneg/altr-ext#")
 PREZ = Namespace("https://prez.dev/")
 
-
 def generate_listing_construct(
     focus_item,
     profile: URIRef,
@@ -30,19 +31,65 @@ def generate_listing_construct(
 ):
     """
     For a given URI, finds items with the specified relation(s).
-    Generates a SPARQL construct query for a listing of items
+    Generates a SPARQL construct query for a listing of items, from a query template compiled once per profile, class
+    and kind of listing (see listing_construct_template).
     """
     if not ordering_predicate:
         ordering_predicate = settings.label_predicates[0]
+    paginated = page is not None and per_page is not None
+    template = listing_construct_template(
+        profile,
+        focus_item.selected_class,
+        isinstance(focus_item, (ProfilesMembers, ListingModel)),
+        focus_item.top_level_listing,
+        getattr(focus_item, "base_class", None),
+        bool(focus_item.uri),
+        paginated,
+    )
+    if template is None:
+        log.warning(
+            f"Requested listing of objects related to {focus_item.uri}, however the profile {profile} does not"
+            f" define any listing relations for this for this class, for example focus to child."
+        )
+        return None
+    values = {}
+    if focus_item.top_level_listing:
+        values["ordering_predicate"] = iri(ordering_predicate)
+    else:
+        values["focus"] = iri(focus_item.uri)
+    if paginated:
+        values["limit"] = integer(per_page)
+        values["offset"] = integer((page - 1) * per_page)
+    query = template.render(**values)
+
+    log.debug(f"Listing construct query for {focus_item} is:\n{query}")
+    return query
+
 
-    if isinstance(focus_item, (ProfilesMembers, ListingModel)):  # listings can include
+@lru_cache(maxsize=1024)
+def listing_construct_template(
+    profile: URIRef,
+    selected_class: URIRef,
+    is_listing: bool,
+    top_level_listing: bool,
+    base_class: Optional[URIRef],
+    has_focus_uri: bool,
+    paginated: bool,
+) -> Optional[QueryTemplate]:
+    """
+    Compiles the listing construct query for a profile and class, for listings (is_listing) or the members of an
+    object. The endpoint determines whether the listing is top level and its base class. The focus IRI, ordering
+    predicate, limit and offset are slots. Returns None if the profile defines no listing relations for a listing of
+    the members of an object.
+    """
+    if is_listing:  # listings can include
         # "context" in the same way objects can, using include/exclude predicates etc.
         (
             include_predicates,
             exclude_predicates,
             inverse_predicates,
             sequence_predicates,
-        ) = get_item_predicates(profile, focus_item.selected_class)
+        ) = get_item_predicates(profile, selected_class)
     else:  # for objects, this context is already included in the separate "generate_item_construct" function, so these
         # predicates are explicitly set to None here to avoid duplication.
         include_predicates = (
@@ -54,10 +101,10 @@ def generate_listing_construct(
         focus_to_child,
         focus_to_parent,
         relative_properties,
-    ) = get_listing_predicates(profile, focus_item.selected_class)
+    ) = get_listing_predicates(profile, selected_class)
     if (
-        focus_item.uri
-        # and not focus_item.top_level_listing  # if it's a top level class we don't need a listing relation - we're
+        has_focus_uri
+        # and not top_level_listing  # if it's a top level class we don't need a listing relation - we're
         # # searching by class
         and not child_to_focus
         and not parent_to_focus
@@ -66,13 +113,9 @@ def generate_listing_construct(
         # do not need to check relative properties - they will only be used if one of the other listing relations
         # are defined
     ):
-        log.warning(
-            f"Requested listing of objects related to {focus_item.uri}, however the profile {profile} does not"
-            f" define any listing relations for this for this class, for example focus to child."
-        )
         return None
     uri_or_tl_item = (
-        "?top_level_item" if focus_item.top_level_listing else f"<{focus_item.uri}>"
+        "?top_level_item" if top_level_listing else slot("focus")
     )  # set the focus
 
     # item to a variable if it's a top level listing (this will utilise "class based" listing, where objects are listed
@@ -91,7 +134,7 @@ def generate_listing_construct(
         PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
 
         CONSTRUCT {{
-            {f'{uri_or_tl_item} a <{focus_item.base_class}> .{chr(10)}' if focus_item.top_level_listing else ""}\
+            {f'{uri_or_tl_item} a <{base_class}> .{chr(10)}' if top_level_listing else ""}\
             {sequence_construct}
             {f'{uri_or_tl_item} ?focus_to_child ?child_item .{chr(10)}' if focus_to_child else ""}\
             {f'{uri_or_tl_item} ?focus_to_parent ?parent_item .{chr(10)}' if focus_to_parent else ""}\
@@ -102,7 +145,7 @@ def generate_listing_construct(
             {f"{uri_or_tl_item} ?p ?o ." if include_predicates else ""}\
         }}
         WHERE {{
-            {f'{uri_or_tl_item} a <{focus_item.base_class}> .{chr(10)}' if focus_item.top_level_listing else ""}\
+            {f'{uri_or_tl_item} a <{base_class}> .{chr(10)}' if top_level_listing else ""}\
             {f'OPTIONAL {{ {uri_or_tl_item} ?p ?o .' if include_predicates else ""}\
             {f'{generate_include_predicates(include_predicates)} }}' if include_predicates else ""} \
             {sequence_construct_where}\
@@ -113,50 +156,61 @@ def generate_listing_construct(
             {{
                 SELECT ?top_level_item ?child_item
                 WHERE {{
-                    {f'{uri_or_tl_item} a <{focus_item.base_class}> .{chr(10)}' if focus_item.top_level_listing else generate_focus_to_x_predicates(uri_or_tl_item, focus_to_child, focus_to_parent)}\
+                    {f'{uri_or_tl_item} a <{base_class}> .{chr(10)}' if top_level_listing else generate_focus_to_x_predicates(uri_or_tl_item, focus_to_child, focus_to_parent)}\
 
                 {f'''
                     OPTIONAL {{
-                        {f'{uri_or_tl_item} <{ordering_predicate}> ?label .' if focus_item.top_level_listing else ""}
+                        {f'{uri_or_tl_item} {slot("ordering_predicate")} ?label .' if top_level_listing else ""}
                     }}
                 ''' if settings.order_lists_by_label else ""}
             }}
             {f'''
-            {'ORDER BY ASC(?label)' if ordering_predicate else "ORDER BY ?top_level_item"}
+            ORDER BY ASC(?label)
             ''' if settings.order_lists_by_label else ""}
-            {f"LIMIT {per_page}{chr(10)}"
-             f"OFFSET {(page - 1) * per_page}" if page is not None and per_page is not None else ""}
+            {f"LIMIT {slot('limit')}{chr(10)}"
+             f"OFFSET {slot('offset')}" if paginated else ""}
             }}
         }}
 
     """
     ).strip()
-
-    log.debug(f"Listing construct query for {focus_item} is:\n{query}")
-    return query
+    return QueryTemplate(query)
 
 
-@lru_cache(maxsize=128)
 def generate_item_construct(focus_item, profile: URIRef):
-    search_query = (
-        True if isinstance(focus_item, SearchMethod) else False
-    )  # generates a listing of search results
+    """
+    Generates a SPARQL construct query for an object, or for the results of a search, from a query template compiled
+    once per profile and class (see item_construct_template).
+    """
+    if isinstance(focus_item, SearchMethod):  # generates a listing of search results
+        template = item_construct_template(profile, focus_item.selected_class, True)
+        construct_query = template.render(search=focus_item.populated_query)
+    else:
+        template = item_construct_template(profile, focus_item.selected_class, False)
+        construct_query = template.render(focus=iri(focus_item.uri))
+    log.debug(f"Item Construct query for {focus_item.uri} is:\n{construct_query}")
+    return construct_query
+
+
+@lru_cache(maxsize=1024)
+def item_construct_template(
+    profile: URIRef, selected_class: URIRef, search_query: bool
+) -> QueryTemplate:
+    """
+    Compiles the item construct query for a profile and class. The focus IRI is a slot, or for search queries, the
+    populated search query, which is substituted verbatim.
+    """
     (
         include_predicates,
         exclude_predicates,
         inverse_predicates,
         sequence_predicates,
-    ) = get_item_predicates(profile, focus_item.selected_class)
-    bnode_depth = profiles_graph_cache.value(
-        profile,
-        ALTREXT.hasBNodeDepth,
-        None,
-        default=2,
-    )
+    ) = get_item_predicates(profile, selected_class)
+    bnode_depth = get_profile_shape(profile, selected_class).bnode_depth
     if search_query:
         uri_or_search_item = "?search_result_uri"
     else:
-        uri_or_search_item = f"<{focus_item.uri}>"
+        uri_or_search_item = slot("focus")
 
     sequence_construct, sequence_construct_where = generate_sequence_construct(
         sequence_predicates, uri_or_search_item
@@ -174,7 +228,7 @@ def generate_item_construct(focus_item, profile: URIRef):
     {generate_bnode_construct(bnode_depth)} \
     \n}}
     WHERE {{
-        {{ {f'{focus_item.populated_query}' if search_query else ""} }}
+        {{ {slot("search") if search_query else ""} }}
         {{
             {uri_or_search_item} ?p ?o1 . {chr(10)} \
             {f'?s ?inverse_predicate {uri_or_search_item}{chr(10)}' if inverse_predicates else chr(10)} \
@@ -190,8 +244,16 @@ def generate_item_construct(focus_item, profile: URIRef):
     }}
     """
     )
-    log.debug(f"Item Construct query for {uri_or_search_item} is:\n{construct_query}")
-    return construct_query
+    return QueryTemplate(construct_query)
+
+
+def clear_query_templates():
+    """
+    Clears the compiled query templates. Must be called whenever the profiles graph cache changes, see
+    rebuild_system_indexes.
+    """
+    item_construct_template.cache_clear()
+    listing_construct_template.cache_clear()
 
 
 def search_query_construct():
@@ -372,131 +434,97 @@ def generate_bnode_select(depth):
 
 
 async def get_annotation_properties(
-    item_graph: Graph,
+    terms: Set[URIRef],
+    languages: Optional[Tuple[str, ...]] = None,
 ):
     """
-    Gets annotation data used for HTML display.
-    This includes the label, description, and provenance, if available.
+    Gets annotation data used for HTML display, for the given terms.
+    This includes the label, description, and provenance, if available. Only the labels best matching the language
+    preferences (settings.default_languages if none are given) are returned.
+    Returns a list of queries for the annotations of terms not in the TBox cache (empty if all terms are cached), a
+    list of the annotation triples found in the TBox cache, and the terms queried for, per annotation category.
     Note the following three default predicates are always included. This allows context, i.e. background ontologies,
     which are often diverse in the predicates they use, to be aligned with the default predicates used by Prez. The full
     range of predicates used can be manually included via profiles.
     """
-    label_predicates = settings.label_predicates
-    description_predicates = settings.description_predicates
-    explanation_predicates = settings.provenance_predicates
-    other_predicates = settings.other_predicates
-    terms = (
-        set(i for i in item_graph.predicates() if isinstance(i, URIRef))
-        | set(i for i in item_graph.objects() if isinstance(i, URIRef))
-        | set(i for i in item_graph.subjects() if isinstance(i, URIRef))
-    )
     # TODO confirm caching of SUBJECT labels does not cause issues! this could be a lot of labels. Perhaps these are
     # better separated and put in an LRU cache. Or it may not be worth the effort.
     if not terms:
-        return None, Graph()
+        return [], [], {}
+    languages = languages or get_default_languages()
     # read labels from the tbox cache, this should be the majority of labels
-    uncached_terms, labels_g = get_annotations_from_tbox_cache(
-        terms,
-        label_predicates,
-        description_predicates,
-        explanation_predicates,
-        other_predicates,
+    uncached_terms, cached_annotations = get_annotations_from_tbox_cache(
+        terms, languages
+    )
+    if not settings.other_predicates:
+        uncached_terms["other"] = []
+    return (
+        generate_annotation_queries(uncached_terms, languages),
+        cached_annotations,
+        uncached_terms,
     )
 
-    def other_predicates_statement(other_predicates, uncached_terms_other):
-        return f"""UNION
-            {{
-                ?unannotated_term ?other_prop ?other .
-                VALUES ?other_prop {{ {" ".join('<' + str(pred) + '>' for pred in other_predicates)} }}
-                VALUES ?unannotated_term {{ {" ".join('<' + str(term) + '>' for term in uncached_terms_other)}
-                }}
-            }}"""
 
-    queries_for_uncached = f"""CONSTRUCT {{
-    ?unlabeled_term ?label_prop ?label .
-    ?undescribed_term ?desc_prop ?description .
-    ?unexplained_term ?expl_prop ?explanation .
-    ?unannotated_term ?other_prop ?other .
-    }}
-        WHERE {{
-            {{
-                ?unlabeled_term ?label_prop ?label .
-                VALUES ?label_prop {{ {" ".join('<' + str(pred) + '>' for pred in label_predicates)} }}
-                VALUES ?unlabeled_term {{ {" ".join('<' + str(term) + '>' for term in uncached_terms["labels"])} }}
-                FILTER(lang(?label) = "" || lang(?label) = "en" || lang(?label) = "en-AU")
-            }}
-            UNION
-            {{
-                ?undescribed_term ?desc_prop ?description .
-                VALUES ?desc_prop {{ {" ".join('<' + str(pred) + '>' for pred in description_predicates)} }}
-                VALUES ?undescribed_term {{ {" ".join('<' + str(term) + '>' for term in uncached_terms["descriptions"])}
-                }}
-            }}
-            UNION
-            {{
-                ?unexplained_term ?expl_prop ?explanation .
-                VALUES ?expl_prop {{ {" ".join('<' + str(pred) + '>' for pred in explanation_predicates)} }}
-                VALUES ?unexplained_term {{ {" ".join('<' + str(term) + '>' for term in uncached_terms["provenance"])}
-                }}
-            }}
-            {other_predicates_statement(other_predicates, uncached_terms["other"]) if other_predicates else ""}
-        }}"""
-    return queries_for_uncached, labels_g
+def generate_annotation_queries(
+    uncached_terms: Dict[str, List[URIRef]], languages: Tuple[str, ...]
+) -> List[str]:
+    """
+    Generates SELECT queries returning (term, predicate, value) rows for the annotations of the given terms, per
+    annotation category. The terms of each category are split into chunks of settings.annotation_chunk_size terms, so
+    that large term sets do not produce very long queries. Only labels without a language tag or in one of the
+    languages are queried for.
+    """
+    category_predicates = {
+        "labels": settings.label_predicates,
+        "descriptions": settings.description_predicates,
+        "provenance": settings.provenance_predicates,
+        "other": settings.other_predicates,
+    }
+    chunk_size = settings.annotation_chunk_size
+    queries = []
+    for category, category_terms in uncached_terms.items():
+        label_filter = language_filter(languages) if category == "labels" else ""
+        for i in range(0, len(category_terms), chunk_size):
+            queries.append(
+                f"""SELECT ?term ?prop ?value
+WHERE {{
+    VALUES ?prop {{ {" ".join('<' + str(pred) + '>' for pred in category_predicates[category])} }}
+    VALUES ?term {{ {" ".join('<' + str(term) + '>' for term in category_terms[i:i + chunk_size])} }}
+    ?term ?prop ?value .
+    {label_filter}
+}}"""
+            )
+    return queries
 
 
-def get_annotations_from_tbox_cache(
-    terms: List[URIRef], label_props, description_props, explanation_props, other_props
-):
+def language_filter(languages: Tuple[str, ...]) -> str:
     """
-    Gets labels from the TBox cache, returns a list of terms that were not found in the cache, and a graph of labels,
-    descriptions, and explanations
-    """
-    labels_from_cache = Graph(bind_namespaces="rdflib")
-    terms_list = list(terms)
-    props_from_cache = {
-        "labels": list(
-            chain(
-                *(
-                    tbox_cache.triples_choices((terms_list, prop, None))
-                    for prop in label_props
-                )
-            )
-        ),
-        "descriptions": list(
-            chain(
-                *(
-                    tbox_cache.triples_choices((terms_list, prop, None))
-                    for prop in description_props
-                )
-            )
-        ),
-        "provenance": list(
-            chain(
-                *(
-                    tbox_cache.triples_choices((terms_list, prop, None))
-                    for prop in explanation_props
-                )
-            )
-        ),
-        "other": list(
-            chain(
-                *(
-                    tbox_cache.triples_choices((terms_list, prop, None))
-                    for prop in other_props
-                )
-            )
-        ),
-    }
-    # get all the annotations we can from the cache
-    all = list(chain(*props_from_cache.values()))
-    for triple in all:
-        labels_from_cache.add(triple)
-    # the remaining terms are not in the cache; we need to query the SPARQL endpoint to attempt to get them
-    uncached_props = {
-        k: list(set(terms) - set(triple[0] for triple in v))
-        for k, v in props_from_cache.items()
-    }
-    return uncached_props, labels_from_cache
+    A FILTER matching literals without a language tag, or in one of the language ranges. Ranges with subtags also fall
+    back to their primary language, e.g. "en-AU" also matches "en" labels.
+    """
+    if "*" in languages:
+        return ""
+    ranges = []
+    for language_range in languages:
+        subtags = language_range.split("-")
+        for i in range(len(subtags), 0, -1):
+            ranges.append("-".join(subtags[:i]))
+    conditions = " || ".join(
+        f'langMatches(lang(?value), "{language_range}")'
+        for language_range in dict.fromkeys(ranges)
+    )
+    return f'FILTER(lang(?value) = "" || {conditions})'
+
+
+def get_annotations_from_tbox_cache(terms: Set[URIRef], languages: Tuple[str, ...]):
+    """
+    Gets labels from the TBox cache, returns a list of terms that were not found in the cache (and are not known to
+    have no annotations) for each kind of annotation, and a list of the label, description, explanation and other annotation triples that were found.
+    """
+    annotations_from_cache, uncached_props = tbox_cache.get_annotations(
+        terms, languages
+    )
+    return uncached_props, annotations_from_cache
 
 
 # hit the count cache first, if it's not there, hit the SPARQL endpoint
@@ -558,25 +586,7 @@ def get_relevant_shape_bns_for_profile(selected_class, profile):
     """
     if not profile:
         return None
-    shape_bns = list(
-        profiles_graph_cache.objects(
-            subject=profile,
-            predicate=ALTREXT.hasNodeShape,
-        )
-    )
-    if not shape_bns:
-        return None
-    relevant_shape_bns = [
-        triple[0]
-        for triple in profiles_graph_cache.triples_choices(
-            (
-                list(shape_bns),
-                URIRef("http://www.w3.org/ns/shacl#targetClass"),
-                selected_class,
-            )
-        )
-    ]
-    return relevant_shape_bns
+    return list(get_profile_shape(profile, selected_class).shape_bns) or None
 
 
 def get_listing_predicates(profile, selected_class):
@@ -598,66 +608,15 @@ def get_listing_predicates(profile, selected_class):
         focus object is a Concept Scheme, and the predicate skos:inScheme is used to link from Concept(s) (using
         altr-ext:childToFocus) then specifying skos:broader as a relative property will cause the broader concepts to
         be returned for each concept
+    The predicates are read from the compiled profile shape, see prez.services.profile_shapes.
     """
-    shape_bns = get_relevant_shape_bns_for_profile(selected_class, profile)
-    if not shape_bns:
-        return [], [], [], [], []
-    child_to_focus = [
-        i[2]
-        for i in profiles_graph_cache.triples_choices(
-            (
-                shape_bns,
-                ALTREXT.childToFocus,
-                None,
-            )
-        )
-    ]
-    parent_to_focus = [
-        i[2]
-        for i in profiles_graph_cache.triples_choices(
-            (
-                shape_bns,
-                ALTREXT.parentToFocus,
-                None,
-            )
-        )
-    ]
-    focus_to_child = [
-        i[2]
-        for i in profiles_graph_cache.triples_choices(
-            (
-                shape_bns,
-                ALTREXT.focusToChild,
-                None,
-            )
-        )
-    ]
-    focus_to_parent = [
-        i[2]
-        for i in profiles_graph_cache.triples_choices(
-            (
-                shape_bns,
-                ALTREXT.focusToParent,
-                None,
-            )
-        )
-    ]
-    relative_properties = [
-        i[2]
-        for i in profiles_graph_cache.triples_choices(
-            (
-                shape_bns,
-                ALTREXT.relativeProperties,
-                None,
-            )
-        )
-    ]
+    shape = get_profile_shape(profile, selected_class)
     return (
-        child_to_focus,
-        parent_to_focus,
-        focus_to_child,
-        focus_to_parent,
-        relative_properties,
+        shape.child_to_focus,
+        shape.parent_to_focus,
+        shape.focus_to_child,
+        shape.focus_to_parent,
+        shape.relative_properties,
     )
 
 
@@ -668,47 +627,16 @@ def get_item_predicates(profile, selected_class):
     - predicates to exclude. Uses sh:path in conjunction with dash:hidden.
     - inverse path predicates to include (inbound links to the object). Uses sh:inversePath.
     - sequence path predicates to include, expressed as a list. Uses sh:sequencePath.
+    The predicates are read from the compiled profile shape, see prez.services.profile_shapes. If the profile has no
+    shape for the class, None is returned for each, meaning all predicates are included.
     """
-    shape_bns = get_relevant_shape_bns_for_profile(selected_class, profile)
-    if not shape_bns:
-        log.info(
-            f"No special predicates (include/exclude/inverse/sequence) found for class {selected_class} in profile "
-            f"{profile}. Default behaviour is to include all predicates, and blank nodes to a depth of two."
-        )
-        return None, None, None, None
-    includes = [
-        i[2]
-        for i in profiles_graph_cache.triples_choices(
-            (shape_bns, URIRef("http://www.w3.org/ns/shacl#path"), None)
-        )
-    ]
-    excludes = [
-        i[2]
-        for i in profiles_graph_cache.triples_choices(
-            (shape_bns, ALTREXT.exclude, None)
-        )
-    ]
-    inverses = [
-        i[2]
-        for i in profiles_graph_cache.triples_choices(
-            (shape_bns, URIRef("http://www.w3.org/ns/shacl#inversePath"), None)
-        )
-    ]
-    _sequence_nodes = [
-        i[2]
-        for i in profiles_graph_cache.triples_choices(
-            (
-                shape_bns,
-                URIRef("http://www.w3.org/ns/shacl#sequencePath"),
-                None,
-            )
-        )
-    ]
-    sequence_paths = [
-        [path_item for path_item in profiles_graph_cache.items(i)]
-        for i in _sequence_nodes
-    ]
-    return includes, excludes, inverses, sequence_paths
+    shape = get_profile_shape(profile, selected_class)
+    return (
+        shape.include_predicates,
+        shape.exclude_predicates,
+        shape.inverse_predicates,
+        shape.sequence_predicates,
+    )
 
 
 def select_profile_mediatype(
@@ -0,0 +1,47 @@
+import re
+from typing import Dict
+
+from prez.models.model_exceptions import InvalidIRIException
+
+# slots are delimited by NUL characters, which cannot occur in SPARQL generated by Prez
+SLOT_DELIMITER = "\x00"
+
+# characters which are not allowed in a SPARQL IRIREF
+INVALID_IRI_CHARACTERS = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+
+
+def slot(name: str) -> str:
+    """A placeholder for a value which is substituted into a query template per request."""
+    return f"{SLOT_DELIMITER}{name}{SLOT_DELIMITER}"
+
+
+def iri(value: str) -> str:
+    """Formats an IRI for substitution into a query, rejecting IRIs which could alter the query."""
+    if not value or INVALID_IRI_CHARACTERS.search(str(value)):
+        raise InvalidIRIException(value)
+    return f"<{value}>"
+
+
+def integer(value: int) -> str:
+    """Formats an integer for substitution into a query."""
+    return str(int(value))
+
+
+class QueryTemplate:
+    """
+    A SPARQL query compiled once, with slots (see slot) for the values which change per request. Rendering only joins
+    the precompiled text with the substituted values, which should be formatted with iri or integer.
+    """
+
+    def __init__(self, text: str):
+        self._parts = text.split(SLOT_DELIMITER)
+        self.slots = frozenset(self._parts[1::2])
+
+    def render(self, **values: str) -> str:
+        parts = self._parts.copy()
+        for i in range(1, len(parts), 2):
+            parts[i] = values[parts[i]]
+        return "".join(parts)
+
+    def __repr__(self):
+        return f"QueryTemplate(slots={sorted(self.slots)})"
@@ -0,0 +1,59 @@
+import pyoxigraph
+from rdflib import BNode, Literal, URIRef, XSD
+from rdflib.term import Node
+
+XSD_STRING = pyoxigraph.NamedNode(str(XSD.string))
+
+
+def to_oxigraph_term(term: Node):
+    """Converts an RDFLib term to the equivalent pyoxigraph term."""
+    if isinstance(term, URIRef):
+        return pyoxigraph.NamedNode(term)
+    elif isinstance(term, BNode):
+        return pyoxigraph.BlankNode(term)
+    elif isinstance(term, Literal):
+        if term.language:
+            return pyoxigraph.Literal(str(term), language=term.language)
+        if term.datatype:
+            return pyoxigraph.Literal(
+                str(term), datatype=pyoxigraph.NamedNode(term.datatype)
+            )
+        return pyoxigraph.Literal(str(term))
+    raise ValueError(f"Unknown type: {type(term)}")
+
+
+def from_oxigraph_term(term) -> Node:
+    """Converts a pyoxigraph term to the equivalent RDFLib term."""
+    if isinstance(term, pyoxigraph.NamedNode):
+        return URIRef(term.value)
+    elif isinstance(term, pyoxigraph.BlankNode):
+        return BNode(term.value)
+    elif isinstance(term, pyoxigraph.Literal):
+        if term.language:
+            return Literal(term.value, lang=term.language)
+        if term.datatype == XSD_STRING:
+            return Literal(term.value)
+        return Literal(term.value, datatype=URIRef(term.datatype.value))
+    raise ValueError(f"Unknown type: {type(term)}")
+
+
+def binding_to_term(binding: dict) -> Node:
+    """
+    Converts a SPARQL JSON results binding, e.g. {"type": "literal", "value": "A", "xml:lang": "en"}, to the equivalent
+    RDFLib term. Bindings from OxrdflibRepo already hold RDFLib terms as their values, which are returned as is.
+    """
+    value = binding["value"]
+    if isinstance(value, Node):
+        return value
+    binding_type = binding["type"]
+    if binding_type == "uri":
+        return URIRef(value)
+    elif binding_type == "bnode":
+        return BNode(value)
+    elif binding_type in ("literal", "typed-literal"):
+        if "xml:lang" in binding:
+            return Literal(value, lang=binding["xml:lang"])
+        if "datatype" in binding:
+            return Literal(value, datatype=URIRef(binding["datatype"]))
+        return Literal(value)
+    raise ValueError(f"Unknown binding type: {binding_type}")
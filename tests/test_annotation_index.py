@@ -0,0 +1,125 @@
+import time
+
+from rdflib import Literal, RDF, RDFS, SKOS, URIRef, DCTERMS
+
+from prez.services.annotation_index import AnnotationIndex
+from prez.services.connegp_service import get_requested_languages
+
+EX_A = URIRef("https://example.com/a")
+EX_B = URIRef("https://example.com/b")
+EX_C = URIRef("https://example.com/c")
+EN = ("en", "en-au")
+
+
+def new_index(max_entries=100, max_bytes=1024 * 1024, negative_ttl=60.0):
+    return AnnotationIndex(
+        max_entries=max_entries, max_bytes=max_bytes, negative_ttl=negative_ttl
+    )
+
+
+def test_annotation_index_lookup():
+    index = new_index()
+    index += [
+        (EX_A, RDFS.label, Literal("A", lang="en")),
+        (EX_A, RDFS.label, Literal("A", lang="en")),  # duplicate
+        (EX_A, SKOS.definition, Literal("The letter A")),
+        (EX_A, RDF.type, SKOS.Concept),  # not an annotation, not indexed
+    ]
+    assert len(index) == 2
+    assert EX_A in index
+
+    triples, missing = index.get_annotations([EX_A, EX_B], EN)
+    assert set(triples) == {
+        (EX_A, RDFS.label, Literal("A", lang="en")),
+        (EX_A, SKOS.definition, Literal("The letter A")),
+    }
+    assert missing["labels"] == [EX_B]
+    assert missing["descriptions"] == [EX_B]
+    assert missing["provenance"] == [EX_A, EX_B]
+
+
+def test_annotation_index_to_graph_and_clear():
+    index = new_index()
+    index.add((EX_B, DCTERMS.provenance, Literal("Made up")))
+    assert len(index.to_graph()) == 1
+    index.clear()
+    assert len(index) == 0
+    assert EX_B not in index
+
+
+def test_annotation_index_negative_entries_expire(monkeypatch):
+    index = new_index(negative_ttl=10)
+    queried = {"labels": [EX_A, EX_B], "descriptions": [EX_A, EX_B]}
+    index.add_fetched(queried, [(EX_A, RDFS.label, Literal("A"))], EN)
+
+    triples, missing = index.get_annotations([EX_A, EX_B], EN)
+    assert triples == [(EX_A, RDFS.label, Literal("A"))]
+    # known to have no label or description
+    assert missing["labels"] == []
+    assert missing["descriptions"] == []
+    # never queried for provenance
+    assert missing["provenance"] == [EX_A, EX_B]
+    assert index.stats()["negative_hits"] == 3
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    _, missing = index.get_annotations([EX_A, EX_B], EN)
+    assert missing["labels"] == [EX_B]
+    assert missing["descriptions"] == [EX_A, EX_B]
+
+
+def test_annotation_index_evicts_fetched_but_not_pinned():
+    index = new_index(max_entries=1)
+    index.add((EX_A, RDFS.label, Literal("A")))
+    index.add_fetched({"labels": [EX_B]}, [(EX_B, RDFS.label, Literal("B"))], EN)
+    index.add_fetched({"labels": [EX_C]}, [(EX_C, RDFS.label, Literal("C"))], EN)
+
+    assert EX_A in index
+    assert EX_B not in index
+    assert EX_C in index
+    assert len(index) == 2
+    stats = index.stats()
+    assert stats["pinned"]["triples"] == 1
+    assert stats["fetched"]["evictions"] == 1
+
+
+def test_annotation_index_selects_best_label_per_predicate():
+    index = new_index()
+    index += [
+        (EX_A, RDFS.label, Literal("A")),
+        (EX_A, RDFS.label, Literal("A en", lang="en")),
+        (EX_A, RDFS.label, Literal("A fr", lang="fr")),
+        (EX_A, SKOS.prefLabel, Literal("A en-AU", lang="en-AU")),
+    ]
+    triples, missing = index.get_annotations([EX_A], ("fr", "en"))
+    assert set(triples) == {
+        (EX_A, RDFS.label, Literal("A fr", lang="fr")),
+        (EX_A, SKOS.prefLabel, Literal("A en-AU", lang="en-AU")),
+    }
+    triples, _ = index.get_annotations([EX_A], ("de",))
+    # labels without a language tag are used when no language matches
+    assert triples == [(EX_A, RDFS.label, Literal("A"))]
+
+
+def test_fetched_labels_are_cached_per_language():
+    index = new_index()
+    index.add_fetched(
+        {"labels": [EX_A]}, [(EX_A, RDFS.label, Literal("A fr", lang="fr"))], ("fr",)
+    )
+    _, missing = index.get_annotations([EX_A], ("fr",))
+    assert missing["labels"] == []
+    # German labels have not been queried for
+    _, missing = index.get_annotations([EX_A], ("de",))
+    assert missing["labels"] == [EX_A]
+
+
+class HeadersRequest:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_requested_languages():
+    assert get_requested_languages(
+        HeadersRequest({"accept-language": "fr;q=0.5, en-AU, de;q=0, EN;q=0.8"})
+    ) == ("en-au", "en", "fr")
+    assert get_requested_languages(HeadersRequest({})) == EN
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from pyoxigraph import Store
+from rdflib import Graph, URIRef, Literal, RDFS, XSD
+
+from prez.cache import tbox_cache
+from prez.config import settings
+from prez.reference_data.prez_ns import REG
+from prez.renderers.renderer import return_annotated_rdf, return_from_graph
+from prez.services.app_service import add_common_context_ontologies_to_tbox_cache
+from prez.sparql.methods import PyoxigraphRepo
+
+EX_A = URIRef("https://example.com/annotations/a")
+EX_B = URIRef("https://example.com/annotations/b")
+EX_C = URIRef("https://example.com/annotations/c")
+EX_P = URIRef("https://example.com/annotations/p")
+
+
+class QueryRecordingRepo(PyoxigraphRepo):
+    def __init__(self, pyoxi_store: Store):
+        super().__init__(pyoxi_store)
+        self.queries = []
+
+    async def tabular_query_to_table(self, query: str, context: URIRef = None):
+        self.queries.append(query)
+        return await super().tabular_query_to_table(query, context)
+
+
+def create_repo():
+    g = Graph()
+    g.add((EX_B, RDFS.label, Literal("b")))
+    g.add((EX_B, REG.status, EX_C))
+    g.add((EX_C, RDFS.label, Literal("c")))
+    store = Store()
+    store.load(g.serialize(format="nt", encoding="utf-8"), "application/n-triples")
+    return QueryRecordingRepo(store)
+
+
+@pytest.fixture()
+def empty_tbox_cache():
+    tbox_cache.clear()
+    yield
+    tbox_cache.clear()
+    asyncio.run(add_common_context_ontologies_to_tbox_cache())
+
+
+def test_annotation_frontier(empty_tbox_cache):
+    repo = create_repo()
+
+    graph = Graph()
+    graph.add((EX_A, EX_P, EX_B))
+    annotated = asyncio.run(return_annotated_rdf(graph, None, repo))
+
+    assert (EX_B, RDFS.label, Literal("b")) in annotated
+    # the status introduced by the first pass is annotated in a second pass
+    assert (EX_C, RDFS.label, Literal("c")) in annotated
+    # one query per annotation category per pass
+    assert len(repo.queries) == 8
+    # terms from the first pass are not looked up again
+    assert all(f"<{EX_A}>" not in query for query in repo.queries[4:])
+    assert all(f"<{EX_C}>" in query for query in repo.queries[4:])
+
+
+def test_annotation_queries_are_chunked(empty_tbox_cache, monkeypatch):
+    monkeypatch.setattr(settings, "annotation_chunk_size", 1)
+    repo = create_repo()
+
+    graph = Graph()
+    graph.add((EX_A, EX_P, EX_B))
+    annotated = asyncio.run(return_annotated_rdf(graph, None, repo))
+
+    assert (EX_B, RDFS.label, Literal("b")) in annotated
+    assert (EX_C, RDFS.label, Literal("c")) in annotated
+    # each query holds a single term
+    assert all(
+        sum(f"<{term}>" in query for term in (EX_A, EX_B, EX_P)) == 1
+        for query in repo.queries[:12]
+    )
+
+
+def test_annotation_literals_keep_language_and_datatype(empty_tbox_cache):
+    g = Graph()
+    g.add((EX_B, RDFS.label, Literal("b", lang="en")))
+    g.add((EX_B, REG.status, EX_C))
+    g.add((EX_C, RDFS.label, Literal("1", datatype=XSD.token)))
+    store = Store()
+    store.load(g.serialize(format="nt", encoding="utf-8"), "application/n-triples")
+
+    graph = Graph()
+    graph.add((EX_A, EX_P, EX_B))
+    annotated = asyncio.run(
+        return_annotated_rdf(graph, None, QueryRecordingRepo(store))
+    )
+
+    assert (EX_B, RDFS.label, Literal("b", lang="en")) in annotated
+    assert (EX_C, RDFS.label, Literal("1", datatype=XSD.token)) in annotated
+
+
+def test_annotation_labels_in_requested_language(empty_tbox_cache):
+    g = Graph()
+    g.add((EX_B, RDFS.label, Literal("b", lang="en")))
+    g.add((EX_B, RDFS.label, Literal("b-fr", lang="fr")))
+    g.add((EX_B, RDFS.label, Literal("b-de", lang="de")))
+    store = Store()
+    store.load(g.serialize(format="nt", encoding="utf-8"), "application/n-triples")
+
+    graph = Graph()
+    graph.add((EX_A, EX_P, EX_B))
+    annotated = asyncio.run(
+        return_annotated_rdf(graph, None, QueryRecordingRepo(store), ("fr", "en"))
+    )
+
+    assert list(annotated.objects(EX_B, RDFS.label)) == [Literal("b-fr", lang="fr")]
+
+
+def test_etag_of_annotated_response_changes_with_annotations(empty_tbox_cache):
+    def label_store(label):
+        g = Graph()
+        g.add((EX_B, RDFS.label, Literal(label)))
+        store = Store()
+        store.load(g.serialize(format="nt", encoding="utf-8"), "application/n-triples")
+        return store
+
+    def etag(store):
+        tbox_cache.clear()
+        graph = Graph()
+        graph.add((EX_A, EX_P, EX_B))
+        response = asyncio.run(
+            return_from_graph(
+                graph, "text/anot+turtle", None, {}, None, QueryRecordingRepo(store)
+            )
+        )
+        return response.headers["etag"]
+
+    assert etag(label_store("b")) == etag(label_store("b"))
+    # the response graph is the same, but the annotations rendered with it differ
+    assert etag(label_store("b")) != etag(label_store("b, relabelled"))
@@ -0,0 +1,40 @@
+from rdflib import URIRef, Literal
+
+from prez.reference_data.prez_ns import PREZ
+from prez.services.bounded_cache import BoundedLRUCache, estimate_triples_size
+
+
+def test_lru_evicts_least_recently_used():
+    cache = BoundedLRUCache(max_entries=2, max_bytes=10_000, sizeof=lambda v: 1)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_lru_respects_byte_limit():
+    cache = BoundedLRUCache(max_entries=100, max_bytes=10, sizeof=lambda v: v)
+    cache.set("a", 4)
+    cache.set("b", 4)
+    cache.set("c", 4)
+    assert list(cache.keys()) == ["b", "c"]
+    assert cache.current_bytes == 8
+    cache.set("too-big", 11)
+    assert "too-big" not in cache
+    assert cache.current_bytes == 8
+
+
+def test_estimate_triples_size():
+    uri = URIRef("https://example.com/object")
+    triples = ((uri, PREZ.link, Literal("/v/vocab/ex:object")),)
+    assert estimate_triples_size(triples) > len(uri) + len("/v/vocab/ex:object")
+    assert estimate_triples_size(()) < estimate_triples_size(triples)
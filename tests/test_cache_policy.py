@@ -0,0 +1,114 @@
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from pyoxigraph.pyoxigraph import Store
+from starlette.datastructures import MutableHeaders
+
+from prez.app import app
+from prez.config import settings
+from prez.dependencies import get_repo
+from prez.services.cache_policy import surrogate_keys
+from prez.services.compression import add_vary
+from prez.sparql.methods import Repo, PyoxigraphRepo
+
+
+@pytest.fixture(scope="session")
+def test_store() -> Store:
+    # Create a new pyoxigraph Store
+    store = Store()
+
+    for file in Path(__file__).parent.glob("../tests/data/*/input/*.ttl"):
+        store.load(file.read_bytes(), "text/turtle")
+
+    return store
+
+
+@pytest.fixture(scope="session")
+def test_repo(test_store: Store) -> Repo:
+    # Create a PyoxigraphQuerySender using the test_store
+    return PyoxigraphRepo(test_store)
+
+
+@pytest.fixture(scope="session")
+def test_client(test_repo: Repo) -> TestClient:
+    # Override the dependency to use the test_repo
+    def override_get_repo():
+        return test_repo
+
+    app.dependency_overrides[get_repo] = override_get_repo
+
+    with TestClient(app) as c:
+        yield c
+
+    # Remove the override to ensure subsequent tests are unaffected
+    app.dependency_overrides.clear()
+
+
+def _route(name: str):
+    return next(route for route in app.routes if route.name == name)
+
+
+def test_listing_policy(test_client):
+    response = test_client.get("/v/vocab?_mediatype=text/turtle")
+    assert response.headers["cache-control"] == "public, max-age=60"
+    vary = [name.strip() for name in response.headers["vary"].split(",")]
+    assert vary == ["Accept", "Accept-Profile", "Accept-Language", "Accept-Encoding"]
+    assert (
+        response.headers["surrogate-key"]
+        == "https://prez.dev/endpoint/vocprez/vocabs-listing"
+    )
+
+
+def test_profiles_policy(test_client):
+    response = test_client.get("/profiles?_mediatype=text/turtle")
+    assert response.headers["cache-control"] == "public, max-age=86400"
+
+
+def test_search_not_cached(test_client):
+    response = test_client.get("/search?term=contact&method=default")
+    assert response.headers["cache-control"] == "no-store"
+    assert "surrogate-key" not in response.headers
+    assert "Accept-Profile" not in response.headers.get("vary", "")
+
+
+def test_configured_policy(test_client, monkeypatch):
+    monkeypatch.setattr(
+        settings,
+        "cache_control_policies",
+        {**settings.cache_control_policies, "ListingEndpoint": "public, max-age=5"},
+    )
+    response = test_client.get("/v/collection?_mediatype=text/turtle")
+    assert response.headers["cache-control"] == "public, max-age=5"
+
+
+def test_not_modified_keeps_policy(test_client):
+    url = "/v/collection?_mediatype=text/anot+turtle"
+    etag = test_client.get(url).headers["etag"]
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == "public, max-age=60"
+    assert "Accept-Profile" in response.headers["vary"]
+
+
+def test_surrogate_keys_of_focus_and_parents():
+    scope = {
+        "route": _route("https://prez.dev/endpoint/spaceprez/feature"),
+        "path_params": {
+            "dataset_curie": "ex:ds1",
+            "collection_curie": "ex:fc1",
+            "feature_curie": "ex:f1",
+        },
+    }
+    assert surrogate_keys(scope) == [
+        "https://prez.dev/endpoint/spaceprez/feature",
+        "ex:ds1",
+        "ex:fc1",
+        "ex:f1",
+    ]
+
+
+def test_add_vary_does_not_repeat_names():
+    headers = MutableHeaders({"Vary": "Accept-Encoding"})
+    add_vary(headers, "Accept", "accept-encoding")
+    assert headers["vary"] == "Accept-Encoding, Accept"
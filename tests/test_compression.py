@@ -0,0 +1,152 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from prez.config import settings
+from prez.services.compression import (
+    ENCODERS,
+    CompressionMiddleware,
+    PrecompressedResponse,
+    compress_variants,
+    negotiate_encoding,
+)
+
+TURTLE = b"".join(
+    b"<https://example.com/concept-%d> a <http://www.w3.org/2004/02/skos/core#Concept> .\n"
+    % i
+    for i in range(200)
+)
+
+
+def _chunks():
+    for i in range(0, len(TURTLE), 1000):
+        yield TURTLE[i : i + 1000]
+
+
+# as a response cache would hold them
+VARIANTS = {"gzip": gzip.compress(TURTLE)}
+
+
+app = Starlette(
+    routes=[
+        Route("/small", lambda request: PlainTextResponse("small")),
+        Route(
+            "/large",
+            lambda request: Response(TURTLE, media_type="text/turtle"),
+        ),
+        Route(
+            "/stream",
+            lambda request: StreamingResponse(_chunks(), media_type="text/turtle"),
+        ),
+        Route(
+            "/image",
+            lambda request: Response(TURTLE, media_type="image/png"),
+        ),
+        Route(
+            "/precompressed",
+            lambda request: PrecompressedResponse(
+                TURTLE, VARIANTS, media_type="text/turtle"
+            ),
+        ),
+    ]
+)
+app.add_middleware(CompressionMiddleware)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "compression_encodings", ["gzip"])
+    return TestClient(app)
+
+
+def _raw_get(client, path, accept_encoding="gzip"):
+    # the test client decodes gzip itself unless streamed
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as r:
+        return r, b"".join(r.iter_raw())
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, None),
+        ("gzip", "gzip"),
+        ("gzip;q=0.5, br", "br"),
+        ("br;q=0, gzip;q=0.1", "gzip"),
+        ("zstd, br, gzip", "zstd"),
+        ("*", "zstd"),
+        ("*, zstd;q=0", "br"),
+        ("identity", None),
+        ("identity, gzip;q=0.5", None),
+        ("deflate", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding, ["zstd", "br", "gzip"]) == expected
+
+
+def test_large_response_compressed(client):
+    response, body = _raw_get(client, "/large")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(body) == TURTLE
+
+
+def test_streamed_response_compressed_in_chunks(client):
+    response, body = _raw_get(client, "/stream")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == TURTLE
+
+
+def test_small_response_not_compressed(client):
+    response, body = _raw_get(client, "/small")
+    assert "content-encoding" not in response.headers
+    assert body == b"small"
+
+
+def test_not_compressed_unless_accepted(client):
+    response, body = _raw_get(client, "/large", "identity")
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert body == TURTLE
+
+
+def test_incompressible_mediatype_not_compressed(client):
+    response, body = _raw_get(client, "/image")
+    assert "content-encoding" not in response.headers
+    assert body == TURTLE
+
+
+def test_precompressed_variant_sent(client, monkeypatch):
+    def fail(*args):
+        raise AssertionError("compressed again")
+
+    monkeypatch.setattr(ENCODERS["gzip"], "compress", fail)
+    response, body = _raw_get(client, "/precompressed")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-length"] == str(len(body))
+    assert body == VARIANTS["gzip"]
+
+
+def test_compress_variants(client):
+    assert compress_variants(b"small") == {}
+    assert gzip.decompress(compress_variants(TURTLE)["gzip"]) == TURTLE
+
+
+@pytest.mark.parametrize("encoding", sorted(set(ENCODERS) - {"gzip"}))
+def test_optional_encodings(client, monkeypatch, encoding):
+    monkeypatch.setattr(settings, "compression_encodings", [encoding, "gzip"])
+    response, body = _raw_get(client, "/stream", f"gzip;q=0.5, {encoding}")
+    assert response.headers["content-encoding"] == encoding
+    if encoding == "br":
+        import brotli
+
+        assert brotli.decompress(body) == TURTLE
+    else:
+        import zstandard
+
+        assert zstandard.ZstdDecompressor().decompressobj().decompress(body) == TURTLE
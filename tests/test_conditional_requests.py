@@ -0,0 +1,185 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from pyoxigraph.pyoxigraph import Store
+from rdflib import BNode, Graph, Literal, Namespace, SKOS
+
+from prez.app import app
+from prez.cache import validator_cache
+from prez.config import settings
+from prez.dependencies import get_repo
+from prez.services.conditional_requests import (
+    conditional_counts,
+    graph_etag,
+    matching_etag,
+)
+from prez.services.system_reload import reload_system_definitions
+from prez.sparql.methods import Repo, PyoxigraphRepo
+
+EX = Namespace("https://example.com/")
+
+
+@pytest.fixture(scope="session")
+def test_store() -> Store:
+    # Create a new pyoxigraph Store
+    store = Store()
+
+    for file in Path(__file__).parent.glob("../tests/data/*/input/*.ttl"):
+        store.load(file.read_bytes(), "text/turtle")
+
+    return store
+
+
+@pytest.fixture(scope="session")
+def test_repo(test_store: Store) -> Repo:
+    # Create a PyoxigraphQuerySender using the test_store
+    return PyoxigraphRepo(test_store)
+
+
+@pytest.fixture(scope="session")
+def test_client(test_repo: Repo) -> TestClient:
+    # Override the dependency to use the test_repo
+    def override_get_repo():
+        return test_repo
+
+    app.dependency_overrides[get_repo] = override_get_repo
+
+    with TestClient(app) as c:
+        yield c
+
+    # Remove the override to ensure subsequent tests are unaffected
+    app.dependency_overrides.clear()
+
+
+def test_graph_etag_independent_of_order_and_blank_node_labels():
+    graph = Graph()
+    graph.add((EX.a, SKOS.prefLabel, Literal("a")))
+    graph.add((EX.a, SKOS.note, BNode("x")))
+    reordered = Graph()
+    reordered.add((EX.a, SKOS.note, BNode("y")))
+    reordered.add((EX.a, SKOS.prefLabel, Literal("a")))
+    assert graph_etag(graph, "text/turtle") == graph_etag(reordered, "text/turtle")
+    assert graph_etag(graph, "text/turtle") != graph_etag(graph, "application/ld+json")
+    reordered.add((EX.b, SKOS.prefLabel, Literal("b")))
+    assert graph_etag(graph, "text/turtle") != graph_etag(reordered, "text/turtle")
+
+
+def test_graph_etag_distinguishes_blank_node_structure():
+    distinct = Graph()
+    distinct.add((BNode("a"), SKOS.note, Literal("1")))
+    distinct.add((BNode("b"), SKOS.note, Literal("2")))
+    shared = Graph()
+    shared.add((BNode("a"), SKOS.note, Literal("1")))
+    shared.add((BNode("a"), SKOS.note, Literal("2")))
+    assert graph_etag(distinct, "text/turtle") != graph_etag(shared, "text/turtle")
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [
+        ('"abc"', '"abc"'),
+        ('W/"abc"', 'W/"abc"'),
+        ('"abc-gzip"', '"abc-gzip"'),
+        ('"def", "abc"', '"abc"'),
+        ("*", '"abc"'),
+        ('"def"', None),
+        (None, None),
+    ],
+)
+def test_matching_etag(if_none_match, expected):
+    assert matching_etag(if_none_match, '"abc"') == expected
+
+
+def test_conditional_get_short_circuited(test_client):
+    url = "/v/vocab?_mediatype=text/turtle"
+    response = test_client.get(url)
+    etag = response.headers["etag"]
+    assert test_client.get(url).headers["etag"] == etag
+
+    short_circuited = conditional_counts["short_circuited"]
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert conditional_counts["short_circuited"] == short_circuited + 1
+
+
+def test_conditional_get_answered_by_renderer(test_client, monkeypatch):
+    url = "/v/collection?_mediatype=application/ld+json"
+    etag = test_client.get(url).headers["etag"]
+    validator_cache.clear()
+
+    not_modified = conditional_counts["not_modified"]
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert conditional_counts["not_modified"] == not_modified + 1
+
+
+def test_validator_not_shared_between_profiles(test_client):
+    dd = {"Accept-Profile": "<https://w3id.org/profile/dd>"}
+    dd_response = test_client.get("/v/vocab", headers=dd)
+    assert dd_response.headers["content-type"] == "application/json"
+    etag = dd_response.headers["etag"]
+    assert (
+        test_client.get("/v/vocab", headers={**dd, "If-None-Match": etag}).status_code
+        == 304
+    )
+
+    # the default profile's representation, which the dd profile's ETag does not validate
+    response = test_client.get("/v/vocab", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["content-type"] != "application/json"
+    assert response.headers["etag"] != etag
+
+
+CONTACT_TYPE = "http://resource.geosciml.org/classifierscheme/cgi/2016.01/contacttype"
+
+
+@pytest.mark.parametrize("reset", ["reload", "purge"])
+def test_validators_cleared_by_reload_and_purge(
+    test_client, test_repo, test_store, reset
+):
+    url = "/v/vocab?_mediatype=text/turtle"
+    etag = test_client.get(url).headers["etag"]
+    relabel = f'<{CONTACT_TYPE}> <{SKOS.prefLabel}> "Contact Types"@en .'
+    test_store.update(f"INSERT DATA {{ {relabel} }}")
+    try:
+        # the cached validator is still trusted
+        assert test_client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+        if reset == "reload":
+            asyncio.run(reload_system_definitions(test_repo, force=True))
+        else:
+            test_client.get("/purge-response-cache")
+        response = test_client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert "Contact Types" in response.text
+    finally:
+        test_store.update(f"DELETE DATA {{ {relabel} }}")
+        validator_cache.clear()
+
+
+def test_modified_representation_sent_in_full(test_client):
+    url = "/v/vocab?_mediatype=text/turtle"
+    response = test_client.get(url, headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert response.text
+
+
+def test_data_version_etags(test_client, monkeypatch):
+    monkeypatch.setattr(settings, "data_version", "2023-10-01")
+    url = "/v/collection?_mediatype=text/anot+turtle"
+    etag = test_client.get(url).headers["etag"]
+    validator_cache.clear()
+
+    short_circuited = conditional_counts["short_circuited"]
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert conditional_counts["short_circuited"] == short_circuited + 1
+
+    monkeypatch.setattr(settings, "data_version", "2023-10-02")
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
@@ -0,0 +1,92 @@
+from pathlib import Path
+
+import pytest
+from rdflib import ConjunctiveGraph, URIRef
+
+from prez.cache import conneg_table
+from prez.models.model_exceptions import NoProfilesException
+from prez.reference_data.prez_ns import ALTREXT
+from prez.services.conneg_table import build_conneg_table, decide_profile_and_mediatype
+from prez.sparql.objects_listings import select_profile_mediatype
+
+PROFILES_DIR = Path(__file__).parent.parent / "prez/reference_data/profiles"
+
+REQUESTS = [
+    (None, None),
+    (URIRef("https://w3id.org/profile/mem"), None),
+    (None, frozenset([(1, "text/turtle")])),
+    (None, frozenset([(0.9, "application/ld+json"), (0.5, "text/anot+turtle")])),
+]
+
+
+@pytest.fixture(scope="module")
+def profiles_graph() -> ConjunctiveGraph:
+    g = ConjunctiveGraph()
+    for f in PROFILES_DIR.glob("*.ttl"):
+        g.parse(f)
+    return g
+
+
+@pytest.fixture()
+def compiled_table(profiles_graph):
+    original = dict(conneg_table)
+    conneg_table.clear()
+    conneg_table.update(build_conneg_table(profiles_graph))
+    decide_profile_and_mediatype.cache_clear()
+    yield conneg_table
+    conneg_table.clear()
+    conneg_table.update(original)
+    decide_profile_and_mediatype.cache_clear()
+
+
+def _sort_key(row) -> tuple:
+    """the values select_profile_mediatype orders its results by"""
+    return tuple(
+        row.get(var).toPython() if row.get(var) is not None else None
+        for var in (
+            "req_profile",
+            "distance",
+            "def_profile",
+            "req_format",
+            "def_format",
+        )
+    )
+
+
+@pytest.mark.parametrize("requested_profile,requested_mediatypes", REQUESTS)
+def test_conneg_table_matches_sparql(
+    profiles_graph, compiled_table, requested_profile, requested_mediatypes
+):
+    for klass in set(profiles_graph.objects(None, ALTREXT.constrainsClass)):
+        rows = profiles_graph.query(
+            select_profile_mediatype(
+                [klass], requested_profile, None, requested_mediatypes
+            )
+        ).bindings
+        if not rows or not rows[0]:
+            # not a subclass of any class delivered by an endpoint
+            with pytest.raises(NoProfilesException):
+                decide_profile_and_mediatype(
+                    frozenset([klass]), requested_profile, requested_mediatypes
+                )
+            continue
+        decision = decide_profile_and_mediatype(
+            frozenset([klass]), requested_profile, requested_mediatypes
+        )
+        top_rows = [row for row in rows if _sort_key(row) == _sort_key(rows[0])]
+        assert (decision.profile, decision.mediatype, decision.selected_class) in [
+            (row["profile"], row["format"], row["class"]) for row in top_rows
+        ], klass
+        assert set(decision.avail_profile_uris) == {row["profile"] for row in rows}
+
+
+def test_conneg_decision_headers(compiled_table):
+    decision = decide_profile_and_mediatype(
+        frozenset([URIRef("http://www.w3.org/2004/02/skos/core#ConceptScheme")]),
+        None,
+        None,
+    )
+    assert decision.profile_headers["Link"].startswith(
+        f'<{decision.profile}>; rel="profile"'
+    )
+    assert f'type="{decision.mediatype}"' in decision.profile_headers["Link"]
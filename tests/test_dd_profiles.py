@@ -1,5 +1,6 @@
 import csv
 import io
+import json
 from pathlib import Path
 
 import pytest
@@ -369,3 +370,24 @@ def test_vocab_object(
         assert expected_data_reader == actual_data_reader
     else:
         assert response.text == expected_data
+
+
+def test_vocab_listing_ndjson(test_client: TestClient):
+    response = test_client.get(
+        "/v/collection?_profile=prfl:dd&_mediatype=application/x-ndjson"
+    )
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["prefLabel"] for row in rows] == [
+        "PGGD selection",
+        "Absolute",
+        "Contact Type - All Concepts",
+    ]
+
+
+def test_vocab_object_unsorted(test_client: TestClient):
+    iri = "http://linked.data.gov.au/def2/borehole-purpose"
+    url = f"/object?uri={iri}&_profile=prfl:dd&_mediatype=application/json"
+    sorted_rows = test_client.get(url).json()["@graph"]
+    unsorted_rows = test_client.get(f"{url}&_sort=false").json()["@graph"]
+    assert sorted(unsorted_rows, key=lambda row: row["iri"]) == sorted_rows
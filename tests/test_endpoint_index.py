@@ -0,0 +1,102 @@
+from pathlib import Path
+
+import pytest
+from pyoxigraph import Store
+from rdflib import ConjunctiveGraph, Literal, URIRef
+
+from prez.cache import endpoints_graph_cache
+from prez.reference_data.prez_ns import ONT
+from prez.services.endpoint_index import (
+    build_endpoint_index,
+    get_endpoint_templates_for_classes,
+)
+from prez.services.system_indexes import rebuild_system_indexes
+from prez.sparql.objects_listings import get_endpoint_template_queries
+
+ENDPOINTS_DIR = Path(__file__).parent.parent / "prez/reference_data/endpoints"
+
+
+@pytest.fixture(scope="module")
+def endpoints_graph() -> ConjunctiveGraph:
+    g = ConjunctiveGraph()
+    for f in ENDPOINTS_DIR.glob("*.ttl"):
+        g.parse(f)
+    return g
+
+
+@pytest.fixture(scope="module")
+def endpoints_store(endpoints_graph) -> Store:
+    store = Store()
+    store.load(
+        endpoints_graph.serialize(format="nt", encoding="utf-8"),
+        "application/n-triples",
+    )
+    return store
+
+
+def _sparql_endpoint_info(store: Store, klass: URIRef) -> dict:
+    endpoint_to_relations = {}
+    for result in store.query(get_endpoint_template_queries(frozenset([klass]))):
+        relation = result["relation_predicate"]
+        direction = result["relation_direction"]
+        endpoint_to_relations.setdefault(result["endpoint_template"].value, []).append(
+            (
+                URIRef(relation.value) if relation else None,
+                URIRef(direction.value) if direction else None,
+            )
+        )
+    return endpoint_to_relations
+
+
+def test_endpoint_index_matches_sparql(endpoints_graph, endpoints_store):
+    index = build_endpoint_index(endpoints_graph)
+    for klass in set(endpoints_graph.objects(None, ONT.deliversClasses)):
+        indexed = {}
+        for _, template, relation, direction in index.get(klass, []):
+            indexed.setdefault(template, []).append((relation, direction))
+        assert indexed == _sparql_endpoint_info(endpoints_store, klass), klass
+
+
+def test_endpoint_index_orders_relations_by_distance(endpoints_graph):
+    index = build_endpoint_index(endpoints_graph)
+    rows = index[URIRef("http://www.opengis.net/ont/geosparql#Feature")]
+    assert [row[0] for row in rows] == [2, 1, 0]
+    assert {row[1] for row in rows} == {
+        "/s/datasets/$parent_2/collections/$parent_1/items/$object"
+    }
+
+
+def test_endpoint_templates_for_classes_are_read_only():
+    classes = frozenset([URIRef("http://www.opengis.net/ont/geosparql#Feature")])
+    endpoint_to_relations = get_endpoint_templates_for_classes(classes)
+    with pytest.raises(TypeError):
+        endpoint_to_relations["/injected"] = ()
+    assert all(isinstance(r, tuple) for r in endpoint_to_relations.values())
+    assert get_endpoint_templates_for_classes(classes) == endpoint_to_relations
+
+
+def test_endpoint_template_replaced_in_endpoints_graph():
+    if not len(endpoints_graph_cache):
+        for f in ENDPOINTS_DIR.glob("*.ttl"):
+            endpoints_graph_cache.parse(f)
+    rebuild_system_indexes()
+    endpoint = URIRef("https://prez.dev/endpoint/vocprez/collection")
+    template = endpoints_graph_cache.value(endpoint, ONT.endpointTemplate)
+    replacement = Literal("/v/collections/$object")
+    classes = frozenset(endpoints_graph_cache.objects(endpoint, ONT.deliversClasses))
+    assert str(template) in get_endpoint_templates_for_classes(classes)
+
+    # the same number of triples, so only an explicit rebuild notices the change
+    length = len(endpoints_graph_cache)
+    endpoints_graph_cache.remove((endpoint, ONT.endpointTemplate, template))
+    endpoints_graph_cache.add((endpoint, ONT.endpointTemplate, replacement))
+    assert len(endpoints_graph_cache) == length
+    try:
+        rebuild_system_indexes()
+        templates = get_endpoint_templates_for_classes(classes)
+        assert str(replacement) in templates
+        assert str(template) not in templates
+    finally:
+        endpoints_graph_cache.remove((endpoint, ONT.endpointTemplate, replacement))
+        endpoints_graph_cache.add((endpoint, ONT.endpointTemplate, template))
+        rebuild_system_indexes()
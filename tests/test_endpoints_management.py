@@ -6,6 +6,7 @@ from pyoxigraph.pyoxigraph import Store
 from rdflib import Graph
 
 from prez.app import app
+from prez.config import settings
 from prez.dependencies import get_repo
 from prez.reference_data.prez_ns import PREZ
 from prez.sparql.methods import Repo, PyoxigraphRepo
@@ -64,3 +65,23 @@ def test_annotation_predicates(client):
         )
     )
     assert len(provList) == 1
+
+
+def test_purge_links_cache(client):
+    client.get("/s/datasets?_mediatype=text/anot+turtle")
+    assert client.get("/cache-stats").json()["links_cache"]["entries"] > 0
+    r = client.get("/purge-links-cache")
+    assert r.status_code == 200
+    assert client.get("/cache-stats").json()["links_cache"]["entries"] == 0
+
+
+def test_cache_stats_report_worker_pool_and_event_loop(client):
+    stats = client.get("/cache-stats").json()
+    assert stats["worker_pool"]["executor"] == "thread"
+    assert "max_lag_seconds" in stats["event_loop"]
+
+
+def test_cache_stats_report_rdf_term_cache(client):
+    stats = client.get("/cache-stats").json()["rdf_term_cache"]
+    assert stats["max_entries"] == settings.rdf_term_cache_max_entries
+    assert stats["entries"] <= stats["max_entries"]
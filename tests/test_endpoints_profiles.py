@@ -1,3 +1,4 @@
+import logging
 from pathlib import Path
 
 import pytest
@@ -76,3 +77,33 @@ def test_pp_profile(client):
     r = client.get("/profiles/prez:profiles")
     g = Graph().parse(data=r.text)
     assert (URIRef("https://prez.dev/profiles"), RDF.type, PROF.Profile) in g
+
+
+def test_profile_server_timing(client):
+    r = client.get("/profiles/prez:VocPrezProfile")
+    timings = [
+        timing.split(";")[0] for timing in r.headers["Server-Timing"].split(", ")
+    ]
+    assert "system-query" in timings
+    assert "response-start" in timings
+
+
+def test_profile_timings_logged_after_body(client, caplog):
+    # the prez logger does not propagate, so records are captured from the module's logger
+    logger = logging.getLogger("prez.services.request_timing")
+    logger.addHandler(caplog.handler)
+    try:
+        with caplog.at_level(logging.DEBUG, logger=logger.name):
+            client.get(
+                "/profiles/prez:VocPrezProfile", headers={"Accept": "text/turtle"}
+            )
+    finally:
+        logger.removeHandler(caplog.handler)
+    [message] = [
+        record.getMessage()
+        for record in caplog.records
+        if record.name == "prez.services.request_timing"
+    ]
+    assert message.startswith("GET /profiles/prez:VocPrezProfile: ")
+    timings = [timing.split(";")[0] for timing in message.split(": ", 1)[1].split(", ")]
+    assert {"system-query", "response-start", "serialize", "total"} <= set(timings)
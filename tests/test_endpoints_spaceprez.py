@@ -144,3 +144,27 @@ def test_feature_listing_anot(client, an_fc_link):
     assert response_graph.isomorphic(expected_graph), print(
         f"Graph delta:{(expected_graph - response_graph).serialize()}"
     )
+
+
+def test_feature_geojson(client, a_feature_link):
+    r = client.get(a_feature_link, headers={"Accept": "application/geo+json"})
+    assert r.headers["content-type"] == "application/geo+json"
+    feature = r.json()
+    assert feature["type"] == "Feature"
+    assert feature["id"] == "http://example.com/datasets/sandgate/cc12109444"
+    assert feature["geometry"]["type"] == "Polygon"
+    assert feature["properties"]["label"] == "Contracted Catchment 12109444"
+
+
+def test_feature_listing_geojson(client, an_fc_link):
+    r = client.get(
+        f"{an_fc_link}/items",
+        params={"_mediatype": "application/geo+json", "per_page": 1},
+    )
+    assert r.headers["content-type"] == "application/geo+json"
+    collection = r.json()
+    assert collection["type"] == "FeatureCollection"
+    assert collection["numberMatched"] == 2
+    assert collection["numberReturned"] == 1
+    # listings do not include geometries, which are added for GeoJSON
+    assert collection["features"][0]["geometry"]["type"] == "Polygon"
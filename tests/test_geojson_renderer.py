@@ -0,0 +1,169 @@
+import asyncio
+import json
+
+import pytest
+from pyoxigraph import Store
+from rdflib import BNode, Graph, Literal, Namespace, RDF, RDFS
+
+from prez.reference_data.prez_ns import PREZ
+from prez.renderers.geojson_renderer import (
+    GEO,
+    features_without_geometries,
+    geojson_feature,
+    stream_geojson,
+    wkt_to_geojson,
+)
+from prez.renderers.renderer import return_from_graph
+from prez.sparql.methods import PyoxigraphRepo
+
+EX = Namespace("https://example.com/")
+
+SQUARE = [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]]
+
+
+@pytest.mark.parametrize(
+    "wkt, geometry",
+    [
+        ("POINT (153.1 -27.3)", {"type": "Point", "coordinates": [153.1, -27.3]}),
+        (
+            "<http://www.opengis.net/def/crs/OGC/1.3/CRS84> POINT Z (1 2 3)",
+            {"type": "Point", "coordinates": [1.0, 2.0, 3.0]},
+        ),
+        ("POINT M (1 2 3)", {"type": "Point", "coordinates": [1.0, 2.0]}),
+        (
+            "LINESTRING (0 0, 1 1)",
+            {"type": "LineString", "coordinates": [[0.0, 0.0], [1.0, 1.0]]},
+        ),
+        (
+            "MULTIPOINT ((0 0), (1 1))",
+            {"type": "MultiPoint", "coordinates": [[0.0, 0.0], [1.0, 1.0]]},
+        ),
+        (
+            "MULTIPOINT (0 0, 1 1)",
+            {"type": "MultiPoint", "coordinates": [[0.0, 0.0], [1.0, 1.0]]},
+        ),
+        (
+            "multipolygon (((0 0, 1 0, 1 1, 0 1, 0 0)))",
+            {"type": "MultiPolygon", "coordinates": [[SQUARE]]},
+        ),
+        (
+            "GEOMETRYCOLLECTION (POINT (1 2), LINESTRING EMPTY)",
+            {
+                "type": "GeometryCollection",
+                "geometries": [{"type": "Point", "coordinates": [1.0, 2.0]}],
+            },
+        ),
+        ("POLYGON EMPTY", None),
+    ],
+)
+def test_wkt_to_geojson(wkt, geometry):
+    assert wkt_to_geojson(wkt) == geometry
+
+
+@pytest.mark.parametrize("wkt", ["POINT (1 2", "CIRCLE (1 2)", "POINT (1 2) 3"])
+def test_invalid_wkt(wkt):
+    with pytest.raises(ValueError):
+        wkt_to_geojson(wkt)
+
+
+def _feature(graph: Graph, name: str, predicate=None, value=None):
+    feature = EX[name]
+    graph.add((feature, RDF.type, GEO.Feature))
+    graph.add((feature, RDFS.label, Literal(f"Feature {name}")))
+    if predicate is not None:
+        geometry = BNode()
+        graph.add((feature, GEO.hasGeometry, geometry))
+        graph.add((geometry, predicate, value))
+    return feature
+
+
+def test_feature_from_wkt_literal_with_rewound_polygon():
+    graph = Graph()
+    # the exterior ring is clockwise, which RFC 7946 asks to be written counterclockwise
+    feature = _feature(
+        graph,
+        "a",
+        GEO.asWKT,
+        Literal("POLYGON ((0 0, 0 1, 1 1, 1 0, 0 0))", datatype=GEO.wktLiteral),
+    )
+    graph.add((feature, EX.height, Literal(3)))
+    assert geojson_feature(graph, feature) == {
+        "type": "Feature",
+        "id": str(feature),
+        "geometry": {"type": "Polygon", "coordinates": [SQUARE]},
+        "properties": {"height": 3, "label": "Feature a"},
+    }
+
+
+def test_geojson_literal_preferred_over_wkt():
+    graph = Graph()
+    feature = _feature(
+        graph,
+        "a",
+        GEO.asGeoJSON,
+        Literal('{"type": "Point", "coordinates": [1, 2]}'),
+    )
+    geometry = graph.value(feature, GEO.hasGeometry)
+    graph.add((geometry, GEO.asWKT, Literal("POINT (3 4)")))
+    assert geojson_feature(graph, feature)["geometry"] == {
+        "type": "Point",
+        "coordinates": [1, 2],
+    }
+
+
+def test_feature_collection_streamed_from_listing_graph():
+    graph = Graph()
+    for i in range(10):
+        feature = _feature(graph, f"f{i}", GEO.asWKT, Literal(f"POINT ({i} {i})"))
+        graph.add((EX.collection, RDFS.member, feature))
+    graph.add((EX.collection, PREZ["count"], Literal(25)))
+    chunks = list(stream_geojson(graph, PREZ.FeatureList, chunk_size=100))
+    assert len(chunks) > 1
+    collection = json.loads(b"".join(chunks))
+    assert collection["type"] == "FeatureCollection"
+    assert [f["id"] for f in collection["features"]] == [
+        str(EX[f"f{i}"]) for i in range(10)
+    ]
+    assert collection["features"][3]["geometry"] == {
+        "type": "Point",
+        "coordinates": [3.0, 3.0],
+    }
+    assert collection["numberMatched"] == 25
+    assert collection["numberReturned"] == 10
+
+
+def test_features_without_geometries():
+    graph = Graph()
+    with_geometry = _feature(graph, "a", GEO.asWKT, Literal("POINT (1 2)"))
+    without_geometry = _feature(graph, "b")
+    graph.add((EX.collection, RDFS.member, with_geometry))
+    graph.add((EX.collection, RDFS.member, without_geometry))
+    assert features_without_geometries(graph) == [without_geometry]
+
+
+def test_etag_of_listing_changes_with_geometries():
+    def etag(wkt):
+        geometries = Graph()
+        _feature(geometries, "a", GEO.asWKT, Literal(wkt, datatype=GEO.wktLiteral))
+        store = Store()
+        store.load(
+            geometries.serialize(format="nt", encoding="utf-8"),
+            "application/n-triples",
+        )
+        listing = Graph()
+        listing.add((EX.collection, RDFS.member, EX.a))
+        response = asyncio.run(
+            return_from_graph(
+                listing,
+                "application/geo+json",
+                None,
+                {},
+                PREZ.FeatureList,
+                PyoxigraphRepo(store),
+            )
+        )
+        return response.headers["etag"]
+
+    # the listing is the same, but the geometries added to it for GeoJSON differ
+    assert etag("POINT (1 2)") == etag("POINT (1 2)")
+    assert etag("POINT (1 2)") != etag("POINT (3 4)")
@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+
+from rdflib import Graph, Literal, Namespace, RDF, SKOS
+
+from prez.renderers.json_renderer import (
+    DropdownTable,
+    dropdown_context,
+    dropdown_rows,
+    stream_dropdown,
+)
+
+EX = Namespace("https://example.com/")
+
+
+def _graph() -> Graph:
+    graph = Graph()
+    for i in range(20):
+        concept = EX[f"concept-{i:02}"]
+        graph.add((concept, SKOS.prefLabel, Literal(f"Concept {i}")))
+        graph.add((concept, SKOS.prefLabel, Literal(f"Begriff {i}", lang="de")))
+        graph.add((EX.scheme, SKOS.hasTopConcept, concept))
+        if i % 2:
+            graph.add((concept, SKOS.broader, EX["concept-00"]))
+    return graph
+
+
+def _table(**kwargs) -> DropdownTable:
+    return DropdownTable(
+        {"broader": SKOS.broader, "prefLabel": SKOS.prefLabel},
+        focus=EX.scheme,
+        focus_to_child=(SKOS.hasTopConcept,),
+        **kwargs,
+    )
+
+
+def test_rows_have_first_value_of_each_column():
+    rows = list(dropdown_rows(_graph(), _table()))
+    assert rows[:2] == [
+        {"iri": str(EX["concept-00"]), "broader": None, "prefLabel": "Concept 0"},
+        {
+            "iri": str(EX["concept-01"]),
+            "broader": str(EX["concept-00"]),
+            "prefLabel": "Concept 1",
+        },
+    ]
+
+
+def test_rows_sorted_only_when_requested():
+    graph = _graph()
+    unsorted = [row["iri"] for row in dropdown_rows(graph, _table(sort_rows=False))]
+    assert unsorted == [str(iri) for iri in graph.objects(EX.scheme, None)]
+    assert [row["iri"] for row in dropdown_rows(graph, _table())] == sorted(unsorted)
+
+
+def test_listing_rows_from_container_class():
+    graph = _graph()
+    graph.add((EX.scheme, RDF.type, SKOS.ConceptScheme))
+    graph.add((EX.scheme, SKOS.prefLabel, Literal("Scheme")))
+    table = DropdownTable(
+        {"prefLabel": SKOS.prefLabel}, container_class=SKOS.ConceptScheme
+    )
+    assert list(dropdown_rows(graph, table)) == [
+        {"iri": str(EX.scheme), "prefLabel": "Scheme"}
+    ]
+
+
+def test_streamed_json_matches_whole_response():
+    graph = _graph()
+    table = _table()
+    streamed = b"".join(stream_dropdown(graph, table, chunk_size=256))
+    assert streamed.decode() == json.dumps(
+        {
+            "@context": dropdown_context(table),
+            "@graph": list(dropdown_rows(graph, table)),
+        }
+    )
+
+
+def test_streamed_ndjson():
+    graph = _graph()
+    lines = b"".join(
+        stream_dropdown(graph, _table(), "application/x-ndjson", 256)
+    ).splitlines()
+    assert [json.loads(line) for line in lines] == list(dropdown_rows(graph, _table()))
+
+
+def test_streamed_csv():
+    graph = _graph()
+    streamed = b"".join(stream_dropdown(graph, _table(), "text/csv", 256)).decode()
+    reader = csv.DictReader(io.StringIO(streamed))
+    assert reader.fieldnames == ["iri", "broader", "prefLabel"]
+    assert list(reader) == [
+        {key: value or "" for key, value in row.items()}
+        for row in dropdown_rows(graph, _table())
+    ]
+
+
+def test_empty_dropdown():
+    table = DropdownTable({"prefLabel": SKOS.prefLabel}, container_class=SKOS.Concept)
+    assert json.loads(b"".join(stream_dropdown(Graph(), table))) == {
+        "@context": {"iri": "@id"},
+        "@graph": [],
+    }
+    assert b"".join(stream_dropdown(Graph(), table, "text/csv")) == b"iri,prefLabel\r\n"
@@ -0,0 +1,115 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from pyoxigraph import Store
+from rdflib import Graph, URIRef, RDF, SKOS
+
+from prez.cache import endpoints_graph_cache, links_ids_graph_cache, links_store
+from prez.config import settings
+from prez.reference_data.prez_ns import PREZ
+from prez.services.endpoint_index import rebuild_endpoint_index
+from prez.services.link_generation import _add_prez_links, get_materialized_links
+from prez.services.link_materialization import materialize_links
+from prez.sparql.methods import PyoxigraphRepo
+
+SCHEME = URIRef("https://example.com/vocab")
+CONCEPTS = [URIRef(f"https://example.com/vocab/concept-{i}") for i in range(30)]
+
+
+class InFlightCountingRepo(PyoxigraphRepo):
+    def __init__(self, pyoxi_store: Store):
+        super().__init__(pyoxi_store)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def tabular_query_to_table(self, query: str, context: URIRef = None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        try:
+            return await super().tabular_query_to_table(query, context)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture(scope="module")
+def repo() -> InFlightCountingRepo:
+    if len(endpoints_graph_cache) == 0:
+        for f in (Path(__file__).parent.parent / "prez/reference_data/endpoints").glob(
+            "*.ttl"
+        ):
+            endpoints_graph_cache.parse(f)
+    rebuild_endpoint_index()
+    g = Graph()
+    for concept in CONCEPTS:
+        g.add((concept, RDF.type, SKOS.Concept))
+        g.add((concept, SKOS.inScheme, SCHEME))
+    store = Store()
+    store.load(g.serialize(format="nt", encoding="utf-8"), "application/n-triples")
+    return InFlightCountingRepo(store)
+
+
+def test_link_generation_is_bounded(repo, monkeypatch):
+    monkeypatch.setattr(settings, "link_generation_concurrency", 4)
+    links_ids_graph_cache.clear()
+    graph = Graph()
+    for concept in CONCEPTS:
+        graph.add((SCHEME, SKOS.hasTopConcept, concept))
+    asyncio.run(_add_prez_links(graph, repo, repo))
+    assert 1 < repo.max_in_flight <= 4
+    for concept in CONCEPTS:
+        assert graph.value(concept, PREZ.link) is not None
+
+
+def test_materialize_links(repo):
+    links_ids_graph_cache.clear()
+    try:
+        assert asyncio.run(materialize_links(repo)) == len(CONCEPTS)
+        materialized = get_materialized_links(CONCEPTS[0])
+        links = [o for s, p, o in materialized if p == PREZ.link]
+        assert len(links) == 1 and links[0].startswith("/v/vocab/")
+
+        graph = Graph()
+        graph.add((SCHEME, SKOS.hasTopConcept, CONCEPTS[0]))
+        asyncio.run(_add_prez_links(graph, repo, repo))
+        assert set(materialized) <= set(graph)
+        # only the scheme, which is not materialized, is generated on request
+        assert list(links_ids_graph_cache.keys()) == [SCHEME]
+
+        assert asyncio.run(materialize_links(repo, [CONCEPTS[1]])) == 1
+        assert get_materialized_links(SCHEME) is None
+    finally:
+        links_store.clear()
+
+
+class RecordingRepo(PyoxigraphRepo):
+    """Records the objects queried for, and answers without querying, as Oxigraph would reject their IRIs."""
+
+    def __init__(self, pyoxi_store: Store):
+        super().__init__(pyoxi_store)
+        self.contexts = []
+
+    async def tabular_query_to_table(self, query: str, context: URIRef = None):
+        self.contexts.append(context)
+        return context, []
+
+
+def test_iris_oxigraph_rejects_are_generated_not_materialized():
+    # valid to RDFLib, but not to Oxigraph
+    iri = URIRef("https://example.com/vocab/a concept")
+    repo = RecordingRepo(Store())
+    assert get_materialized_links(iri) is None
+    links_ids_graph_cache.clear()
+    graph = Graph()
+    graph.add((SCHEME, SKOS.hasTopConcept, iri))
+    asyncio.run(_add_prez_links(graph, repo, repo))
+    assert iri in repo.contexts
+
+    repo.contexts.clear()
+    try:
+        assert asyncio.run(materialize_links(repo, [iri])) == 1
+        assert iri not in repo.contexts
+        assert len(links_store) == 0
+    finally:
+        links_store.clear()
@@ -0,0 +1,44 @@
+import asyncio
+
+from rdflib import Graph, Literal, Namespace, SKOS
+
+from prez.services.request_timing import request_timings
+from prez.sparql.methods import OxrdflibRepo
+
+EX = Namespace("https://example.com/")
+
+
+def _repo() -> OxrdflibRepo:
+    graph = Graph(store="Oxigraph")
+    for i in range(3):
+        graph.add((EX[f"concept-{i}"], SKOS.prefLabel, Literal(f"Concept {i}")))
+    return OxrdflibRepo(graph)
+
+
+def test_queries_timed():
+    repo = _repo()
+    timings = {}
+    token = request_timings.set(timings)
+    try:
+        graph, tabular_results = asyncio.run(
+            repo.send_queries(
+                ["CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }"],
+                [(EX.context, "SELECT ?s WHERE { ?s ?p ?o }")],
+            )
+        )
+    finally:
+        request_timings.reset(token)
+    assert len(graph) == 3
+    context, rows = tabular_results[0]
+    assert context == EX.context and len(rows) == 3
+    assert timings["oxrdflib-query"] > 0
+
+
+def test_sparql():
+    repo = _repo()
+    select = asyncio.run(repo.sparql("SELECT ?s WHERE { ?s ?p ?o }", []))
+    assert len(select["results"]["bindings"]) == 3
+    construct = asyncio.run(repo.sparql("CONSTRUCT WHERE { ?s ?p ?o }", []))
+    assert len(construct) == 3
+    ask = asyncio.run(repo.sparql("ASK { ?s ?p ?o }", []))
+    assert ask == {"head": {}, "boolean": True}
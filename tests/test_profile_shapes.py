@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+from rdflib import BNode, ConjunctiveGraph, SH, SKOS, URIRef
+
+from prez.cache import profiles_graph_cache
+from prez.reference_data.prez_ns import ALTREXT
+from prez.services.profile_shapes import (
+    compile_profile_shape,
+    get_profile_cbd,
+    get_profile_shape,
+)
+from prez.services.system_indexes import rebuild_system_indexes
+
+PROFILES_DIR = Path(__file__).parent.parent / "prez/reference_data/profiles"
+VOCPUB = URIRef("https://w3id.org/profile/vocpub")
+
+
+@pytest.fixture(scope="module")
+def profiles_graph() -> ConjunctiveGraph:
+    g = ConjunctiveGraph()
+    for f in PROFILES_DIR.glob("*.ttl"):
+        g.parse(f)
+    return g
+
+
+def test_compiled_shapes_match_profiles(profiles_graph):
+    for profile, shape_bn in profiles_graph.subject_objects(ALTREXT.hasNodeShape):
+        for klass in profiles_graph.objects(shape_bn, SH.targetClass):
+            shape = compile_profile_shape(profiles_graph, profile, klass)
+            assert shape_bn in shape.shape_bns
+            assert set(shape.include_predicates) >= set(
+                profiles_graph.objects(shape_bn, SH.path)
+            )
+            assert set(shape.child_to_focus) >= set(
+                profiles_graph.objects(shape_bn, ALTREXT.childToFocus)
+            )
+            assert set(shape.relative_properties) >= set(
+                profiles_graph.objects(shape_bn, ALTREXT.relativeProperties)
+            )
+
+
+def test_profile_without_shape_for_class(profiles_graph):
+    shape = compile_profile_shape(
+        profiles_graph, VOCPUB, URIRef("https://example.com/NotAClass")
+    )
+    assert shape.include_predicates is None
+    assert shape.child_to_focus == ()
+    assert shape.bnode_depth == 2
+
+
+def test_profile_shapes_invalidated_with_profiles_graph():
+    shape = get_profile_shape(VOCPUB, SKOS.ConceptScheme)
+    assert get_profile_shape(VOCPUB, SKOS.ConceptScheme) is shape
+    triple = (BNode(), SH.targetClass, SKOS.ConceptScheme)
+    profiles_graph_cache.add(triple)
+    try:
+        rebuild_system_indexes()
+        assert get_profile_shape(VOCPUB, SKOS.ConceptScheme) is not shape
+    finally:
+        profiles_graph_cache.remove(triple)
+        rebuild_system_indexes()
+
+
+def test_profile_cbd_cached_until_profiles_graph_changes():
+    cbd = get_profile_cbd(VOCPUB)
+    assert get_profile_cbd(VOCPUB) is cbd
+    triple = (VOCPUB, ALTREXT.hasLabelPredicate, SKOS.altLabel)
+    profiles_graph_cache.add(triple)
+    try:
+        rebuild_system_indexes()
+        assert triple in get_profile_cbd(VOCPUB)
+    finally:
+        profiles_graph_cache.remove(triple)
+        rebuild_system_indexes()
@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import pytest
+from rdflib import BNode, SH, SKOS, URIRef
+
+from prez.cache import profiles_graph_cache
+from prez.models.model_exceptions import InvalidIRIException
+from prez.models.object_item import ObjectItem
+from prez.services.system_indexes import rebuild_system_indexes
+from prez.sparql.objects_listings import (
+    generate_item_construct,
+    generate_listing_construct,
+    item_construct_template,
+)
+from prez.sparql.query_templates import QueryTemplate, iri, slot
+
+PROFILES_DIR = Path(__file__).parent.parent / "prez/reference_data/profiles"
+VOCPUB = URIRef("https://w3id.org/profile/vocpub")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def profiles():
+    if not len(profiles_graph_cache):
+        for f in PROFILES_DIR.glob("*.ttl"):
+            profiles_graph_cache.parse(f)
+
+
+def concept_scheme(uri: str) -> ObjectItem:
+    return ObjectItem.construct(uri=URIRef(uri), selected_class=SKOS.ConceptScheme)
+
+
+def test_query_template_render():
+    template = QueryTemplate(f"SELECT * {{ {slot('focus')} ?p {slot('focus')} }}")
+    assert template.slots == {"focus"}
+    assert (
+        template.render(focus=iri("https://example.com/a"))
+        == "SELECT * { <https://example.com/a> ?p <https://example.com/a> }"
+    )
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["", "https://example.com/a b", "https://example.com/a> ?p ?o . <b", "a{b}"],
+)
+def test_invalid_iris_rejected(value):
+    with pytest.raises(InvalidIRIException):
+        iri(value)
+
+
+def test_item_template_shared_across_focus_items():
+    item_construct_template.cache_clear()
+    query_a = generate_item_construct(concept_scheme("https://example.com/a"), VOCPUB)
+    query_b = generate_item_construct(concept_scheme("https://example.com/b"), VOCPUB)
+    assert item_construct_template.cache_info().misses == 1
+    assert "<https://example.com/a> ?p ?o1" in query_a
+    assert query_b == query_a.replace("https://example.com/a", "https://example.com/b")
+
+
+def test_listing_template_substitutes_pagination():
+    first = generate_listing_construct(
+        concept_scheme("https://example.com/a"), VOCPUB, 1, 20
+    )
+    third = generate_listing_construct(
+        concept_scheme("https://example.com/a"), VOCPUB, 3, 10
+    )
+    assert "LIMIT 20\nOFFSET 0" in first
+    assert "LIMIT 10\nOFFSET 20" in third
+
+
+def test_invalid_focus_iri_rejected():
+    with pytest.raises(InvalidIRIException):
+        generate_item_construct(concept_scheme("https://example.com/a>"), VOCPUB)
+
+
+def test_templates_invalidated_with_profiles_graph():
+    generate_item_construct(concept_scheme("https://example.com/a"), VOCPUB)
+    template = item_construct_template(VOCPUB, SKOS.ConceptScheme, False)
+    triple = (BNode(), SH.targetClass, SKOS.ConceptScheme)
+    profiles_graph_cache.add(triple)
+    try:
+        rebuild_system_indexes()
+        generate_item_construct(concept_scheme("https://example.com/a"), VOCPUB)
+        assert (
+            item_construct_template(VOCPUB, SKOS.ConceptScheme, False) is not template
+        )
+    finally:
+        profiles_graph_cache.remove(triple)
+        rebuild_system_indexes()
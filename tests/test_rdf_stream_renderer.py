@@ -0,0 +1,100 @@
+import json
+
+import pytest
+from rdflib import BNode, Graph, Literal, Namespace, RDF, RDFS, SKOS, XSD, DCAT
+from rdflib.collection import Collection
+from rdflib.compare import isomorphic
+
+from prez.renderers.rdf_stream_renderer import nt_term, stream_rdf
+
+EX = Namespace("https://example.com/")
+
+
+@pytest.fixture
+def graph() -> Graph:
+    graph = Graph()
+    graph.bind("ex", EX)
+    for i in range(50):
+        concept = EX[f"concept-{i}"]
+        graph.add((concept, RDF.type, SKOS.Concept))
+        graph.add((concept, SKOS.prefLabel, Literal(f"Concept {i}", lang="en")))
+        graph.add((concept, SKOS.notation, Literal(i)))
+        graph.add((concept, SKOS.definition, Literal('A "quoted"\ndefinition')))
+        graph.add((concept, SKOS.broader, EX["concept-0"]))
+        graph.add(
+            (concept, EX["unbound/path"], Literal("2023-01-01", datatype=XSD.date))
+        )
+    shape = BNode()
+    graph.add((EX.scheme, EX.shape, shape))
+    graph.add((shape, EX["item.with.dots."], Literal("x")))
+    graph.add((shape, EX.nested, BNode()))
+    members = BNode()
+    Collection(graph, members, [EX["concept-1"], Literal(2), Literal(2.0)])
+    graph.add((EX.scheme, EX.members, members))
+    graph.add((EX.scheme, EX.notes, Literal(1)))
+    graph.add((EX.scheme, EX.notes, Literal(1.0)))
+    graph.add((EX.scheme, EX.none, RDF.nil))
+    graph.add((EX.Thing, RDF.type, RDFS.Class))
+    graph.add((BNode(), RDFS.label, Literal("unreferenced")))
+    return graph
+
+
+@pytest.mark.parametrize(
+    "format, mediatype",
+    [
+        ("nt", "application/n-triples"),
+        ("turtle", "text/turtle"),
+        ("json-ld", "application/ld+json"),
+        ("xml", "application/rdf+xml"),
+    ],
+)
+def test_stream_round_trips(graph, format, mediatype):
+    data = b"".join(stream_rdf(graph, mediatype))
+    assert isomorphic(Graph().parse(data=data, format=format), graph)
+
+
+@pytest.mark.parametrize("format", ["nt", "turtle", "json-ld"])
+def test_streamed_in_chunks(graph, format):
+    chunks = list(stream_rdf(graph, format, chunk_size=1024))
+    assert len(chunks) > 1
+    assert all(len(chunk) < 4 * 1024 for chunk in chunks)
+
+
+@pytest.mark.parametrize("format", ["nt", "turtle"])
+def test_match_rdflib(graph, format):
+    assert b"".join(stream_rdf(graph, format, chunk_size=256)) == graph.serialize(
+        format=format, encoding="utf-8"
+    )
+
+
+@pytest.mark.parametrize(
+    "namespaces",
+    [{}, {str(EX): "ex", str(SKOS): "skos", str(XSD): "xsd", str(DCAT): "dcat"}],
+)
+def test_jsonld_matches_rdflib(graph, namespaces):
+    streamed = b"".join(stream_rdf(graph, "json-ld", 256, namespaces))
+    context = json.loads(streamed)["@context"] if namespaces else {}
+    assert streamed == graph.serialize(
+        format="json-ld", context=context, encoding="utf-8"
+    )
+
+
+def test_jsonld_context_has_prefixes_used():
+    graph = Graph()
+    graph.add((EX.concept, RDF.type, SKOS.Concept))
+    namespaces = {str(EX): "ex", str(SKOS): "skos", str(DCAT): "dcat"}
+    streamed = json.loads(b"".join(stream_rdf(graph, "json-ld", None, namespaces)))
+    assert streamed == {
+        "@context": {"ex": str(EX), "skos": str(SKOS)},
+        "@id": "ex:concept",
+        "@type": "skos:Concept",
+    }
+
+
+def test_nt_terms_differing_in_language_case():
+    assert nt_term(Literal("colour", lang="en-AU")) == '"colour"@en-AU'
+    assert nt_term(Literal("colour", lang="en-au")) == '"colour"@en-au'
+
+
+def test_jsonld_empty_graph():
+    assert json.loads(b"".join(stream_rdf(Graph(), "json-ld"))) == []
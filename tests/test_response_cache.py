@@ -0,0 +1,261 @@
+import asyncio
+import pickle
+import time
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from pyoxigraph.pyoxigraph import Store
+from rdflib import Graph
+from starlette.responses import Response, StreamingResponse
+
+from prez.app import app
+from prez.config import settings
+from prez.dependencies import get_repo
+from prez.services.conditional_requests import (
+    ConditionalRequest,
+    conditional_request,
+    data_version_etag,
+    response_etag,
+)
+from prez.services.response_cache import (
+    CachedResponse,
+    ResponseCache,
+    cached_response,
+    response_cache,
+)
+from prez.sparql.methods import Repo, PyoxigraphRepo
+
+
+@pytest.fixture(scope="session")
+def test_store() -> Store:
+    # Create a new pyoxigraph Store
+    store = Store()
+
+    for file in Path(__file__).parent.glob("../tests/data/*/input/*.ttl"):
+        store.load(file.read_bytes(), "text/turtle")
+
+    return store
+
+
+@pytest.fixture(scope="session")
+def test_repo(test_store: Store) -> Repo:
+    # Create a PyoxigraphQuerySender using the test_store
+    return PyoxigraphRepo(test_store)
+
+
+@pytest.fixture(scope="session")
+def test_client(test_repo: Repo) -> TestClient:
+    # Override the dependency to use the test_repo
+    def override_get_repo():
+        return test_repo
+
+    app.dependency_overrides[get_repo] = override_get_repo
+
+    with TestClient(app) as c:
+        yield c
+
+    # Remove the override to ensure subsequent tests are unaffected
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def cache(monkeypatch) -> Iterator[ResponseCache]:
+    monkeypatch.setattr(settings, "response_cache_ttl", 60.0)
+    monkeypatch.setattr(settings, "response_cache_stale_ttl", 0.0)
+    monkeypatch.setattr(
+        response_cache, "counts", dict.fromkeys(response_cache.counts, 0)
+    )
+    response_cache.clear()
+    yield response_cache
+    response_cache.clear()
+
+
+def _entry(key, tags=(), body=b"body", fresh_for=60.0) -> CachedResponse:
+    now = time.time()
+    return CachedResponse(
+        key,
+        200,
+        (("content-type", "text/turtle"),),
+        body,
+        {},
+        frozenset(tags),
+        now + fresh_for,
+        now + fresh_for,
+    )
+
+
+def test_cached_response_hit(test_client, cache):
+    url = "/v/vocab?_mediatype=text/anot+turtle"
+    first = test_client.get(url)
+    assert first.status_code == 200
+    assert cache.stats()["entries"] == 1
+
+    # the same profile and mediatype, negotiated from the Accept header rather than a query parameter
+    second = test_client.get("/v/vocab", headers={"Accept": "text/anot+turtle"})
+    assert second.status_code == 200
+    assert second.text == first.text
+    assert second.headers["etag"] == first.headers["etag"]
+    assert cache.counts["fresh_hits"] == 1
+
+    test_client.get("/v/vocab?_mediatype=text/turtle")
+    assert cache.stats()["entries"] == 2
+
+
+def test_purge_response_cache_by_tag(test_client, cache):
+    test_client.get("/v/vocab?_mediatype=text/anot+turtle")
+    test_client.get("/v/collection?_mediatype=text/anot+turtle")
+    assert cache.stats()["entries"] == 2
+
+    response = test_client.get("/purge-response-cache?tag=/v/vocab")
+    assert response.text == "Purged 1 cached responses"
+    assert cache.stats()["entries"] == 1
+
+    test_client.get("/purge-response-cache")
+    assert cache.stats()["entries"] == 0
+    assert "response_cache" in test_client.get("/cache-stats").json()
+
+
+def test_response_cache_disabled(test_client, cache, monkeypatch):
+    monkeypatch.setattr(settings, "response_cache_ttl", None)
+    test_client.get("/v/vocab?_mediatype=text/anot+turtle")
+    assert cache.stats()["entries"] == 0
+
+
+def test_stale_response_served_while_revalidated(cache, monkeypatch):
+    monkeypatch.setattr(settings, "response_cache_ttl", 0.0)
+    monkeypatch.setattr(settings, "response_cache_stale_ttl", 60.0)
+    renders = []
+
+    async def render():
+        renders.append(None)
+        return Response(f"render {len(renders)}", media_type="text/plain")
+
+    async def requests():
+        first = await cached_response(("key",), render, frozenset())
+        stale = await cached_response(("key",), render, frozenset())
+        await asyncio.gather(*cache.tasks)
+        fresher = await cached_response(("key",), render, frozenset())
+        return first, stale, fresher
+
+    first, stale, fresher = asyncio.run(requests())
+    assert first.body == b"render 1"
+    assert stale.body == b"render 1"
+    assert fresher.body == b"render 2"
+    assert cache.counts["stale_hits"] == 2
+
+
+def test_revalidated_response_keeps_data_version_etag(cache, monkeypatch):
+    monkeypatch.setattr(settings, "response_cache_ttl", 0.0)
+    monkeypatch.setattr(settings, "response_cache_stale_ttl", 60.0)
+    monkeypatch.setattr(settings, "data_version", "v1")
+    if_none_match = []
+
+    async def render():
+        if_none_match.append(conditional_request.get().if_none_match)
+        etag = await response_etag(Graph(), "text/turtle")
+        return Response("render", headers={"ETag": etag})
+
+    async def requests():
+        conditional_request.set(ConditionalRequest(("/v/vocab",), '"stale"'))
+        await cached_response(("key",), render, frozenset())
+        await cached_response(("key",), render, frozenset())
+        await asyncio.gather(*cache.tasks)
+        return await cached_response(("key",), render, frozenset())
+
+    refreshed = asyncio.run(requests())
+    # rendered without the If-None-Match header of the request which found the response stale
+    assert if_none_match[:2] == ['"stale"', None]
+    assert refreshed.headers["etag"] == data_version_etag(("/v/vocab",))
+
+
+def test_large_streamed_response_not_cached(cache, monkeypatch):
+    monkeypatch.setattr(settings, "response_cache_max_entry_bytes", 10)
+
+    async def render():
+        return StreamingResponse(iter([b"12345", b"67890", b"12345"]))
+
+    async def request():
+        response = await cached_response(("key",), render, frozenset())
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    assert asyncio.run(request()) == b"123456789012345"
+    assert cache.stats()["entries"] == 0
+
+
+def test_purge_by_tag():
+    cache = ResponseCache(max_entries=10, max_bytes=10_000)
+    asyncio.run(cache.set(_entry(("a",), tags={"/s/datasets/ds1", "x"})))
+    asyncio.run(cache.set(_entry(("b",), tags={"/s/datasets/ds2"})))
+    assert asyncio.run(cache.purge(["/s/datasets/ds1"])) == 1
+    assert asyncio.run(cache.get(("a",))) is None
+    assert asyncio.run(cache.get(("b",))) is not None
+
+
+def test_disk_tier(tmp_path):
+    cache = ResponseCache(
+        max_entries=10, max_bytes=10_000, disk_path=tmp_path, disk_max_bytes=10_000
+    )
+    asyncio.run(cache.set(_entry(("a",), tags={"x"})))
+
+    # a new cache, as after a restart, reads the entry from disk
+    restarted = ResponseCache(
+        max_entries=10, max_bytes=10_000, disk_path=tmp_path, disk_max_bytes=10_000
+    )
+    entry = asyncio.run(restarted.get(("a",)))
+    assert entry.body == b"body"
+    assert restarted.counts["disk_hits"] == 1
+
+    assert asyncio.run(restarted.purge(["x"])) == 1
+    assert restarted.stats()["disk_entries"] == 0
+    assert not list(tmp_path.glob("*.pickle"))
+
+
+def test_disk_tier_size_limit(tmp_path):
+    entry_size = len(pickle.dumps(_entry(("a",), body=b"x" * 1000)))
+    cache = ResponseCache(
+        max_entries=10,
+        max_bytes=10_000,
+        disk_path=tmp_path,
+        disk_max_bytes=entry_size * 2 + 100,
+    )
+    for key in "abc":
+        asyncio.run(cache.set(_entry((key,), body=b"x" * 1000)))
+    assert cache.stats()["disk_entries"] == 2
+    assert cache._file_name(("a",)) not in cache.disk_index
+
+
+def test_disk_tier_concurrent_writes(tmp_path):
+    entry_size = len(pickle.dumps(_entry(("a",), body=b"x" * 1000)))
+    cache = ResponseCache(
+        max_entries=100,
+        max_bytes=1_000_000,
+        disk_path=tmp_path,
+        disk_max_bytes=entry_size * 5 + 100,
+    )
+
+    async def writes():
+        await asyncio.gather(
+            *[cache.set(_entry((i % 20,), body=b"x" * 1000)) for i in range(100)]
+        )
+
+    asyncio.run(writes())
+    files = {file.name: file.stat().st_size for file in tmp_path.glob("*.pickle")}
+    assert files == {name: entry.size for name, entry in cache.disk_index.items()}
+    assert cache.stats()["disk_bytes"] == sum(files.values()) <= entry_size * 5 + 100
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_disk_tier_purged_by_indexed_tags(tmp_path, monkeypatch):
+    cache = ResponseCache(
+        max_entries=10, max_bytes=10_000, disk_path=tmp_path, disk_max_bytes=10_000
+    )
+    asyncio.run(cache.set(_entry(("a",), tags={"x"})))
+    asyncio.run(cache.set(_entry(("b",), tags={"y"})))
+    cache.memory.clear()
+
+    # entries written since startup are purged without reading them from disk
+    monkeypatch.setattr(cache, "_read", None)
+    assert asyncio.run(cache.purge(["x"])) == 1
+    assert [entry.key for entry in cache.disk_index.values()] == [("b",)]
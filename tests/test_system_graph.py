@@ -0,0 +1,101 @@
+from pyoxigraph.pyoxigraph import NamedNode, Quad, Store
+from rdflib import Graph, Literal, RDF, SKOS, URIRef
+
+from prez.services.system_graph import SystemGraph
+
+EX = "https://example.com/"
+GRAPH = URIRef(f"{EX}graph")
+
+DATA = f"""
+PREFIX ex: <{EX}>
+PREFIX skos: <{SKOS}>
+ex:scheme a skos:ConceptScheme ;
+    skos:prefLabel "Scheme" ;
+    ex:columns skos:definition , skos:prefLabel , skos:notation ;
+    ex:shape [ ex:depth 2 ] .
+"""
+
+
+def system_graph(store: Store = None) -> SystemGraph:
+    return SystemGraph(Store() if store is None else store, GRAPH).parse(
+        data=DATA, format="turtle"
+    )
+
+
+def test_lookups_match_rdflib():
+    graph = system_graph()
+    rdflib_graph = Graph().parse(data=DATA, format="turtle")
+    scheme = URIRef(f"{EX}scheme")
+    assert len(graph) == len(rdflib_graph)
+    assert graph.value(scheme, SKOS.prefLabel) == Literal("Scheme")
+    assert list(graph.subjects(RDF.type, SKOS.ConceptScheme)) == [scheme]
+    assert len(graph.cbd(scheme)) == len(rdflib_graph.cbd(scheme))
+
+
+def test_objects_in_parsed_order():
+    graph = system_graph()
+    assert list(graph.objects(URIRef(f"{EX}scheme"), URIRef(f"{EX}columns"))) == [
+        SKOS.definition,
+        SKOS.prefLabel,
+        SKOS.notation,
+    ]
+
+
+def test_writes_tracked():
+    graph = system_graph()
+    triple = (URIRef(f"{EX}scheme"), SKOS.notation, Literal("s"))
+    length = len(graph)
+    graph.add(triple)
+    graph.add(triple)
+    assert len(graph) == length + 1
+    graph.remove(triple)
+    assert len(graph) == length
+    assert triple not in graph
+
+
+def test_replace_and_query():
+    store = Store()
+    graph = system_graph(store)
+    other = SystemGraph(store, URIRef(f"{EX}other"))
+    other.add((URIRef(f"{EX}other"), RDF.type, SKOS.Collection))
+    new = graph.staging()
+    new.add((URIRef(f"{EX}new"), RDF.type, SKOS.ConceptScheme))
+    graph.replace(new)
+    assert len(graph) == 1
+    assert len(other) == 1
+    result = graph.query("SELECT ?s { ?s a ?class }")
+    assert [row.s for row in result] == [URIRef(f"{EX}new")]
+
+
+def test_triples_written_to_store_directly():
+    store = Store()
+    graph = system_graph(store)
+    scheme = URIRef(f"{EX}scheme")
+    columns = URIRef(f"{EX}columns")
+    length = len(graph)
+    store.add(
+        Quad(
+            NamedNode(scheme),
+            NamedNode(columns),
+            NamedNode(SKOS.altLabel),
+            NamedNode(GRAPH),
+        )
+    )
+    store.load(
+        f"<{EX}direct> <{RDF.type}> <{SKOS.Collection}> .".encode(),
+        "application/n-triples",
+        to_graph=NamedNode(GRAPH),
+    )
+    assert len(graph) == length + 2
+    assert list(graph.objects(scheme, columns)) == [
+        SKOS.definition,
+        SKOS.prefLabel,
+        SKOS.notation,
+        SKOS.altLabel,
+    ]
+    assert graph.value(URIRef(f"{EX}direct"), RDF.type) == SKOS.Collection
+    graph.remove((scheme, columns, SKOS.altLabel))
+    assert len(graph) == length + 1
+
+    graph.replace(graph.staging())
+    assert len(graph) == 0
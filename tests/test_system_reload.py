@@ -0,0 +1,75 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from pyoxigraph.pyoxigraph import Store
+from rdflib import DCTERMS, Literal, PROF, RDF, URIRef
+
+from prez.cache import (
+    endpoints_graph_cache,
+    links_ids_graph_cache,
+    profiles_graph_cache,
+    search_methods,
+    system_store,
+)
+from prez.services.conneg_table import get_conneg_decision
+from prez.services.system_reload import reload_system_definitions
+from prez.sparql.methods import PyoxigraphRepo
+
+NEW_PROFILE = URIRef("https://example.com/profile/new")
+
+
+@pytest.fixture(scope="module")
+def store() -> Store:
+    store = Store()
+    for file in Path(__file__).parent.glob("../tests/data/*/input/*.ttl"):
+        store.load(file.read_bytes(), "text/turtle")
+    return store
+
+
+@pytest.fixture(scope="module")
+def repo(store: Store) -> PyoxigraphRepo:
+    repo = PyoxigraphRepo(store)
+    yield repo
+    # leave the system definitions as they were loaded from the test data
+    asyncio.run(reload_system_definitions(repo, force=True))
+
+
+def test_forced_reload_rebuilds_system_definitions(repo):
+    links_ids_graph_cache.set(URIRef("https://example.com/object"), ())
+    reloaded = asyncio.run(reload_system_definitions(repo, force=True))
+    assert reloaded == ["profiles", "endpoints", "search_methods"]
+    assert (URIRef("https://prez.dev/profile/prez"), RDF.type, PROF.Profile) in (
+        profiles_graph_cache
+    )
+    assert len(endpoints_graph_cache) > 0
+    assert search_methods
+    assert links_ids_graph_cache.peek(URIRef("https://example.com/object")) is None
+    assert system_store.query(
+        "ASK { <https://prez.dev/profile/prez> a <http://www.w3.org/ns/dx/prof/Profile> }",
+        use_default_graph_as_union=True,
+    )
+
+
+def test_reload_only_when_changed(repo, store):
+    asyncio.run(reload_system_definitions(repo, force=True))
+    endpoints_before = len(endpoints_graph_cache)
+    assert asyncio.run(reload_system_definitions(repo)) == []
+
+    store.update(
+        f"""INSERT DATA {{
+            <{NEW_PROFILE}> a <{PROF.Profile}> ;
+                <{DCTERMS.title}> "New" ;
+                <http://www.w3.org/ns/dx/conneg/altr-ext#constrainsClass> <{PROF.Profile}> ;
+                <http://www.w3.org/ns/dx/conneg/altr-ext#hasResourceFormat> "text/turtle" .
+        }}"""
+    )
+    try:
+        assert asyncio.run(reload_system_definitions(repo)) == ["profiles"]
+        assert (NEW_PROFILE, DCTERMS.title, Literal("New")) in profiles_graph_cache
+        assert len(endpoints_graph_cache) == endpoints_before
+        # the conneg table is rebuilt with the new profile
+        decision = get_conneg_decision(frozenset([PROF.Profile]), NEW_PROFILE)
+        assert decision.profile == NEW_PROFILE
+    finally:
+        store.update(f"DELETE WHERE {{ <{NEW_PROFILE}> ?p ?o }}")
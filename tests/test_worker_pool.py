@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from rdflib import Graph, Literal, Namespace, SKOS
+
+from prez.config import settings
+from prez.renderers.rdf_stream_renderer import stream_rdf
+from prez.services.event_loop_lag import EventLoopLagMonitor
+from prez.services.worker_pool import (
+    iterate_offloaded,
+    offload,
+    offload_counts,
+    shutdown_executors,
+)
+from prez.sparql.methods import parse_graph
+
+EX = Namespace("https://example.com/")
+
+
+@pytest.fixture
+def graph() -> Graph:
+    graph = Graph()
+    for i in range(100):
+        graph.add((EX[f"concept-{i}"], SKOS.prefLabel, Literal(f"Concept {i}")))
+    return graph
+
+
+@pytest.fixture(params=["thread", "process"])
+def executor(request, monkeypatch):
+    monkeypatch.setattr(settings, "offload_executor", request.param)
+    yield request.param
+    shutdown_executors()
+
+
+def test_small_jobs_run_inline():
+    inline = offload_counts["inline"]
+    thread = asyncio.run(offload(10, 100, threading.current_thread))
+    assert thread is threading.current_thread()
+    assert offload_counts["inline"] == inline + 1
+
+
+def test_large_jobs_offloaded_to_threads():
+    offloaded = offload_counts["offloaded"]
+    thread = asyncio.run(offload(100, 100, threading.current_thread))
+    assert thread.name.startswith("prez-worker")
+    assert offload_counts["offloaded"] == offloaded + 1
+    shutdown_executors()
+
+
+def test_parse_offloaded(executor, graph):
+    data = graph.serialize(format="turtle", encoding="utf-8")
+    parsed = asyncio.run(offload(len(data), 0, parse_graph, data, "turtle"))
+    assert parsed.isomorphic(graph)
+
+
+def test_serialization_offloaded(executor, graph):
+    async def collect(threshold):
+        return b"".join(
+            [
+                chunk
+                async for chunk in iterate_offloaded(
+                    len(graph), threshold, stream_rdf, graph, "nt", 256
+                )
+            ]
+        )
+
+    # a graph pickled to a worker process may iterate in a different order
+    assert sorted(asyncio.run(collect(0)).splitlines()) == sorted(
+        asyncio.run(collect(len(graph) + 1)).splitlines()
+    )
+
+
+def test_event_loop_lag_measured():
+    monitor = EventLoopLagMonitor(stall_threshold=0.05)
+
+    async def stall():
+        task = asyncio.create_task(monitor.run(0.01))
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # blocks the event loop
+        await asyncio.sleep(0.02)
+        task.cancel()
+
+    asyncio.run(stall())
+    assert monitor.stalls == 1
+    assert monitor.stats()["max_lag_seconds"] >= 0.05